@@ -1,43 +1,195 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+import asyncio
+import json
+import logging
+from typing import List, Optional
 
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+
+from app.api.v1.errors import raise_busy
+from app.api.v1.uploads import receive_audio_upload, upload_openapi
+from app.core.config import settings
 from app.schemas.stt import STTResponse
+from app.services.audio.decode import MODEL_SAMPLE_RATE, StreamingResampler
+from app.services.scheduler import SchedulerSaturatedError
+from app.services.stt.streaming import StreamingTranscriber
 from app.services.stt_service import stt_service
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Raw PCM layouts accepted on the streaming socket
+PCM_ENCODINGS = {"pcm_s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+
+# Largest single audio frame accepted (about 10 s of 48 kHz float32)
+MAX_STREAM_FRAME_BYTES = 2 * 1024 * 1024
 
-@router.post("/transcribe", response_model=STTResponse)
-async def transcribe_audio(file: UploadFile = File(...)):
+@router.get("/stats")
+async def stt_stats():
+    """STT engine selection, queue (depth, wait times, rejections) and worker process counters."""
+    return stt_service.stats()
+
+ENGINE_FIELDS = {
+    "backend": {"type": "string", "description": "STT backend (faster-whisper, whisper, mock); defaults to the deployment's"},
+    "model": {"type": "string", "description": "Model size, one of the deployment's STT_REQUEST_MODELS"},
+    "language": {"type": "string", "description": "Language code (e.g. en); skips language detection"},
+}
+
+@router.post("/transcribe", response_model=STTResponse, openapi_extra=upload_openapi(ENGINE_FIELDS))
+async def transcribe_audio(
+    request: Request,
+    backend: Optional[str] = None,
+    model: Optional[str] = None,
+    language: Optional[str] = None,
+):
     """
-    Upload an audio file (WAV, MP3, M4A) to transcribe.
+    Upload an audio file (WAV, MP3, M4A, OGG, FLAC) to transcribe.
+    The upload is decoded while it streams in; oversized files are rejected
+    with 413 as soon as the limit is crossed. backend, model and language may
+    be given as query parameters or form fields. Audio transcribed before
+    with the same settings is answered from cache; the queue check on the
+    header comes first, so a busy server answers 503 even for such audio.
     """
-    if not file:
-        raise HTTPException(status_code=400, detail="No file uploaded")
+    # The clip holds its place in the STT cost model from its header until its speech is queued
+    with stt_service.admission() as admission:
+        try:
+            # Size limit, extension check and decoding happen as the body arrives; the
+            # header is vetted (length, queue capacity) before decoding starts
+            upload = await receive_audio_upload(request, on_probe=admission.check)
+        except SchedulerSaturatedError as busy:
+            raise_busy(busy)
+
+        try:
+            result = await stt_service.transcribe_audio(
+                upload.audio,
+                upload.filename,
+                backend=backend or upload.fields.get("backend"),
+                model_size=model or upload.fields.get("model"),
+                language=language or upload.fields.get("language"),
+                admission=admission,
+            )
         
-    # Basic extension check
-    allowed_exts = {".wav", ".mp3", ".m4a", ".ogg", ".flac"}
-    import os
-    ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in allowed_exts:
-        raise HTTPException(status_code=400, detail=f"Unsupported file format. Allowed: {allowed_exts}")
+            return STTResponse(
+                text=result["text"],
+                language=result["language"],
+                confidence=result.get("confidence", 0.0),
+                duration=round(upload.duration, 3),
+                segments=result.get("segments"),
+                cached=result.get("cached", False),
+                message="Transcription successful"
+            )
 
+        except SchedulerSaturatedError as busy:
+            raise_busy(busy)
+        except ValueError as val_err:
+            raise HTTPException(status_code=400, detail=str(val_err))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def _pcm_to_model_audio(frame: bytes, dtype: np.dtype, resampler: StreamingResampler) -> np.ndarray:
+    samples = np.frombuffer(frame[:len(frame) - len(frame) % dtype.itemsize], dtype=dtype)
+    if dtype.kind == "i":
+        samples = samples.astype(np.float32) / 32768.0
+    return resampler.feed(samples.astype(np.float32, copy=False))
+
+
+@router.websocket("/stream")
+async def transcribe_stream(
+    websocket: WebSocket,
+    sample_rate: int = MODEL_SAMPLE_RATE,
+    encoding: str = "pcm_s16le",
+    backend: Optional[str] = None,
+    model: Optional[str] = None,
+    language: Optional[str] = None,
+):
+    """
+    Live transcription. Send mono PCM as binary messages (pcm_s16le or f32le
+    at sample_rate; 16 kHz avoids resampling) and {"type": "end"} when done.
+    Receives JSON events: "partial" (text plus a stable prefix that never
+    changes), "final" per utterance, then "done" with the full transcript,
+    or "error".
+    """
+    await websocket.accept()
     try:
-        content = await file.read()
-        
-        # Determine duration (mock for now, or use audioread/pydub if strictly needed)
-        # For real duration, we'd inspect the file header.
-        duration = 0.0 
+        backend, model = stt_service.resolve(backend, model)
+        if encoding not in PCM_ENCODINGS:
+            raise ValueError(f"Unsupported encoding '{encoding}'. Allowed: {sorted(PCM_ENCODINGS)}")
+        if not 8000 <= sample_rate <= 48000:
+            raise ValueError("sample_rate must be between 8000 and 48000")
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
+        return
 
-        result = await stt_service.transcribe(content, file.filename)
-        
-        return STTResponse(
-            text=result["text"],
-            language=result["language"],
-            confidence=result.get("confidence", 0.0),
-            duration=duration, # Placeholder
-            segments=result.get("segments"),
-            message="Transcription successful"
-        )
+    options = {"language": language} if language else {}
+
+    async def decode(audio: np.ndarray, prompt: str):
+        return await stt_service.decode(audio, backend, model, initial_prompt=prompt or None, **options)
+
+    transcriber = StreamingTranscriber(
+        decode,
+        step_seconds=settings.STT_STREAM_STEP_MS / 1000,
+        max_window_seconds=settings.STT_STREAM_WINDOW_SECONDS,
+        pause_ms=settings.STT_STREAM_PAUSE_MS,
+        threshold_db=settings.STT_VAD_THRESHOLD_DB,
+    )
+    dtype = PCM_ENCODINGS[encoding]
+    # One resampler for the whole connection, so frame edges are filtered with
+    # their neighbours instead of being zero-padded
+    resampler = StreamingResampler(sample_rate, MODEL_SAMPLE_RATE)
+
+    async def run_step():
+        for event in await transcriber.step():
+            await websocket.send_json(event)
+
+    # Decoding runs beside the receive loop, one step at a time; audio that arrives
+    # meanwhile simply joins the next step's window
+    decoding: Optional[asyncio.Task] = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                if len(message["bytes"]) > MAX_STREAM_FRAME_BYTES:
+                    raise ValueError("Audio frame too large")
+                transcriber.add_audio(_pcm_to_model_audio(message["bytes"], dtype, resampler))
+                if transcriber.duration > settings.STT_MAX_AUDIO_SECONDS:
+                    raise ValueError(f"Stream too long. Maximum: {settings.STT_MAX_AUDIO_SECONDS:.0f}s")
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    raise ValueError("Text messages must be JSON")
+                if isinstance(control, dict) and control.get("type") == "end":
+                    break
+
+            if decoding is not None and decoding.done():
+                decoding.result()  # surface a failed step
+                decoding = None
+            if decoding is None and transcriber.ready():
+                decoding = asyncio.ensure_future(run_step())
+
+        if decoding is not None:
+            await decoding
+        transcriber.add_audio(resampler.flush())
+        for event in await transcriber.finish():
+            await websocket.send_json(event)
+        await websocket.close()
 
+    except WebSocketDisconnect:
+        pass
+    except SchedulerSaturatedError as busy:
+        await websocket.send_json({"type": "error", "detail": str(busy), "retry_after": busy.retry_after})
+        await websocket.close(code=1013)  # try again later
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"Streaming transcription failed: {e}")
+        await websocket.send_json({"type": "error", "detail": "Transcription failed"})
+        await websocket.close(code=1011)
+    finally:
+        if decoding is not None and not decoding.done():
+            decoding.cancel()
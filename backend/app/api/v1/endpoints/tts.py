@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
 import os
+import shutil
+import uuid
+import zipfile
 
-from app.schemas.tts import TTSRequest, TTSResponse
+from app.api.v1.errors import raise_busy
+from app.schemas.tts import TTSRequest, TTSResponse, TTSBatchRequest, TTSBatchResponse, TTSBatchItemResult
+from app.services.audio.delivery import audio_delivery
+from app.services.audio.encode import MEDIA_TYPES, SUPPORTED_SAMPLE_RATES, available_formats
+from app.services.scheduler import SchedulerSaturatedError
+from app.services.tts.cache import SynthesisCache
 from app.services.tts_service import tts_service
 
 router = APIRouter()
@@ -13,6 +24,21 @@ async def list_voices():
     """List all available voices installed on the server."""
     return tts_service.get_available_voices()
 
+@router.get("/formats")
+async def list_formats():
+    """Output formats and sample rates this server can produce."""
+    return {"formats": available_formats(), "sample_rates": list(SUPPORTED_SAMPLE_RATES)}
+
+@router.get("/stats")
+async def tts_stats():
+    """Scheduler queue, synthesis cache, engine pool and delivery counters."""
+    return {
+        "scheduler": tts_service.scheduler.stats(),
+        "cache": tts_service.cache.stats() if tts_service.cache else None,
+        "engine_pool": tts_service.engine_pool.stats() if tts_service.engine_pool else None,
+        "delivery": audio_delivery.stats()
+    }
+
 @router.get("/voice/{voice_id}")
 async def get_voice(voice_id: str):
     """Get details for a specific voice."""
@@ -28,13 +54,18 @@ async def synthesize_speech(request: TTSRequest):
         result = await tts_service.generate_audio(
             text=request.text,
             voice_id=request.voice_id,
-            speed=request.speed
+            speed=request.speed,
+            audio_format=request.format,
+            sample_rate=request.sample_rate
         )
         return TTSResponse(
             audio_url=result["url"],
             duration=result["duration"],
-            message="Synthesis successful"
+            message="Synthesis successful",
+            cached=result.get("cached", False)
         )
+    except SchedulerSaturatedError as busy:
+        raise_busy(busy)
     except ValueError as val_err:
         raise HTTPException(status_code=400, detail=str(val_err))
     except RuntimeError as run_err:
@@ -42,15 +73,179 @@ async def synthesize_speech(request: TTSRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-@router.get("/audio/{filename}")
-async def get_audio_file(filename: str, background_tasks: BackgroundTasks):
-    """Serve the generated audio file."""
+class _BatchArchive:
+    """
+    ZIP of a batch, filled while the batch renders. Each finished item's file
+    is held in the synthesis cache the moment it is ready (so a later item
+    can't evict it) and opened and copied into the archive off the event
+    loop, in completion order.
+    """
+
+    def __init__(self, path: Path, archive: zipfile.ZipFile, cache: Optional[SynthesisCache]):
+        self.path = path
+        self._archive = archive
+        self._cache = cache
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._aborted = False
+        self._writer = asyncio.ensure_future(self._write_members())
+
+    @classmethod
+    async def create(cls, path: Path, cache: Optional[SynthesisCache]) -> "_BatchArchive":
+        archive = await asyncio.to_thread(zipfile.ZipFile, path, "w", compression=zipfile.ZIP_STORED)
+        return cls(path, archive, cache)
+
+    def add(self, result: Dict[str, Any]):
+        """generate_batch's on_result hook: runs right after the item is rendered."""
+        if result.get("error"):
+            return
+        path = Path(result["path"])
+        if self._cache:
+            self._cache.hold(path)
+        self._pending.put_nowait((path, f"{result['index']:04d}{path.suffix}"))
+
+    def _release(self, path: Path):
+        if self._cache:
+            self._cache.release(path)
+
+    async def _write_members(self):
+        while True:
+            entry = await self._pending.get()
+            if entry is None:
+                return
+            path, name = entry
+            try:
+                if not self._aborted:
+                    await asyncio.to_thread(self._copy, path, name)
+            finally:
+                self._release(path)
+
+    def _copy(self, path: Path, name: str):
+        with open(path, "rb") as handle, self._archive.open(name, "w") as member:
+            shutil.copyfileobj(handle, member)
+
+    def _close(self, manifest: Optional[str]):
+        if manifest is not None:
+            self._archive.writestr("manifest.json", manifest)
+        self._archive.close()
+
+    async def finish(self, manifest: str):
+        """Wait for every member to be written, then add the manifest and close the ZIP."""
+        self._pending.put_nowait(None)
+        await self._writer
+        await asyncio.to_thread(self._close, manifest)
+
+    async def abort(self):
+        """Stop writing, release held files and delete the partial archive."""
+        self._aborted = True
+        self._pending.put_nowait(None)
+        try:
+            await self._writer
+        except BaseException:
+            pass
+        while not self._pending.empty():
+            entry = self._pending.get_nowait()
+            if entry is not None:
+                self._release(entry[0])
+        await asyncio.to_thread(self._close, None)
+        self.path.unlink(missing_ok=True)
+
+def _batch_item_result(r: Dict[str, Any]) -> TTSBatchItemResult:
+    return TTSBatchItemResult(
+        index=r["index"],
+        voice_id=r["voice_id"],
+        audio_url=r.get("url"),
+        duration=r.get("duration"),
+        cached=r.get("cached", False),
+        error=r.get("error")
+    )
+
+@router.post("/synthesize-batch", response_model=TTSBatchResponse)
+async def synthesize_speech_batch(request: TTSBatchRequest, background_tasks: BackgroundTasks):
+    """
+    Generate speech for many items in one call.
+    Returns per-item URLs, or a ZIP of the rendered files plus a manifest when archive=true.
+    A full synthesis queue fails the whole batch with 429/503 and Retry-After.
+    """
+    items = [item.model_dump() for item in request.items]
+
+    if request.archive:
+        archive = await _BatchArchive.create(tts_service.output_dir / f"batch_{uuid.uuid4()}.zip", tts_service.cache)
+        try:
+            results = [_batch_item_result(r) for r in await tts_service.generate_batch(items, on_result=archive.add)]
+            if all(r.error for r in results):
+                raise HTTPException(status_code=500, detail="Batch synthesis failed for every item")
+            await archive.finish(json.dumps([r.model_dump() for r in results], indent=2))
+        except SchedulerSaturatedError as busy:
+            await archive.abort()
+            raise_busy(busy)
+        except HTTPException:
+            await archive.abort()
+            raise
+        except Exception as e:
+            await archive.abort()
+            raise HTTPException(status_code=500, detail=f"Failed to build batch archive: {str(e)}")
+        except BaseException:
+            # Cancelled (client gone, shutdown): clean up even though this task is being torn down
+            await asyncio.shield(archive.abort())
+            raise
+        background_tasks.add_task(os.remove, archive.path)
+        return FileResponse(path=archive.path, media_type="application/zip", filename="batch.zip")
+
+    try:
+        results = [_batch_item_result(r) for r in await tts_service.generate_batch(items)]
+    except SchedulerSaturatedError as busy:
+        raise_busy(busy)
+    failed = sum(1 for r in results if r.error)
+    return TTSBatchResponse(
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed,
+        message="Batch synthesis complete" if not failed else f"Batch completed with {failed} failed item(s)"
+    )
+
+@router.post("/synthesize-stream")
+async def synthesize_speech_stream(request: TTSRequest):
+    """
+    Generate speech and stream it back as a chunked WAV, one sentence at a time.
+    Playback can start as soon as the first sentence is ready.
+    """
+    stream = tts_service.stream_audio(
+        text=request.text,
+        voice_id=request.voice_id,
+        speed=request.speed
+    )
+    # Pull the first chunk before responding so bad input still maps to a proper status code
+    try:
+        first_chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="Text contains nothing to synthesize")
+    except SchedulerSaturatedError as busy:
+        raise_busy(busy)
+    except ValueError as val_err:
+        raise HTTPException(status_code=400, detail=str(val_err))
+    except RuntimeError as run_err:
+        raise HTTPException(status_code=500, detail=str(run_err))
+
+    async def body():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="audio/wav")
+
+@router.api_route("/audio/{filename}", methods=["GET", "HEAD"])
+def get_audio_file(filename: str, request: Request):
+    """
+    Serve a generated audio file.
+    Supports byte ranges, ETag revalidation (304) and long-lived caching.
+    """
     # Sanitize filename to prevent directory traversal
     safe_filename = os.path.basename(filename)
     file_path = tts_service.output_dir / safe_filename
     
-    if not file_path.exists():
+    if not file_path.is_file():
         raise HTTPException(status_code=404, detail="Audio file not found")
         
-    return FileResponse(path=file_path, media_type="audio/wav", filename=safe_filename)
+    media_type = MEDIA_TYPES.get(file_path.suffix, "application/octet-stream")
+    return audio_delivery.response(request, file_path, media_type, safe_filename)
 
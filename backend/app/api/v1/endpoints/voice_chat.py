@@ -1,7 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, HTTPException, Request
 from typing import Optional
 import logging
 
+from app.api.v1.errors import cancel_on_disconnect, raise_busy
+from app.api.v1.uploads import receive_audio_upload, upload_openapi
+from app.services.conversation import conversation_store
+from app.services.scheduler import SchedulerSaturatedError
 from app.services.stt_service import stt_service
 from app.services.tts_service import tts_service
 from app.services.llm_service import llm_service
@@ -10,52 +14,87 @@ from app.schemas.stt import STTResponse
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("", response_model=dict)
-async def voice_chat(
-    file: UploadFile = File(...),
-    llm_provider: str = Form("ollama"), # Default to ollama, can be 'gemini'
-    voice_id: str = Form(None)
-):
+VOICE_CHAT_FIELDS = {
+    "llm_provider": {"type": "string", "default": "ollama"},
+    "voice_id": {"type": "string"},
+    "session_id": {"type": "string", "description": "Continue this conversation; omit (or pass an expired id) to start one"},
+}
+
+@router.post("", response_model=dict, openapi_extra=upload_openapi(VOICE_CHAT_FIELDS))
+async def voice_chat(request: Request):
     """
     Full pipeline: Audio Input -> STT -> LLM -> TTS -> Audio Output
+    Each reply carries a session_id; send it back to continue the conversation.
     """
-    try:
-        # 1. Speech to Text
-        transcript_result = await stt_service.transcribe_audio(file)
-        user_text = transcript_result["text"]
+    # Audio is streamed and decoded as it arrives; form fields come along with it.
+    # Browser recordings arrive as an unnamed WebM blob, so any filename is accepted.
+    with stt_service.admission() as admission:
+        try:
+            upload = await receive_audio_upload(request, extensions=None, on_probe=admission.check)
+        except SchedulerSaturatedError as busy:
+            raise_busy(busy)
+        llm_provider: str = upload.fields.get("llm_provider") or "ollama" # Default to ollama, can be 'gemini'
+        voice_id: Optional[str] = upload.fields.get("voice_id") or None
+        session = conversation_store.get_or_create(upload.fields.get("session_id") or None)
+
+        try:
+            # 1. Speech to Text
+            transcript_result = await stt_service.transcribe_audio(upload.audio, upload.filename, admission=admission)
+            user_text = transcript_result["text"]
         
-        if not user_text:
-            return {
-                "user_text": "",
-                "ai_text": "I didn't hear anything.",
-                "audio_url": None,
-                "provider": llm_provider
-            }
+            if not user_text:
+                return {
+                    "user_text": "",
+                    "ai_text": "I didn't hear anything.",
+                    "audio_url": None,
+                    "provider": llm_provider,
+                    "session_id": session.id
+                }
 
-        # 2. LLM Generation
-        # Use simple prompt for now, or maintain history context in frontend
-        ai_text = await llm_service.generate_response(user_text, provider=llm_provider)
+            # 2. LLM Generation
+            # The session supplies the history (and the provider's state for it).
+            # The call is dropped if the caller hangs up, freeing the provider's slot.
+            llm = llm_service.get_provider(llm_provider)
+            ai_text = await cancel_on_disconnect(request, conversation_store.reply(session, llm, user_text))
 
-        # 3. Text to Speech
-        if not voice_id:
-             voices = tts_service.get_available_voices()
-             voice_id = voices[0]["id"] if voices else "default"
+            # 3. Text to Speech
+            if not voice_id:
+                 voices = tts_service.get_available_voices()
+                 voice_id = voices[0]["id"] if voices else "default"
             
-        # Generate audio
-        tts_result = await tts_service.generate_audio(
-            text=ai_text,
-            voice_id=voice_id,
-            speed=1.0
-        )
+            # Generate audio
+            tts_result = await tts_service.generate_audio(
+                text=ai_text,
+                voice_id=voice_id,
+                speed=1.0
+            )
         
-        return {
-            "user_text": user_text,
-            "ai_text": ai_text,
-            "audio_url": tts_result["url"],
-            "duration": tts_result["duration"],
-            "provider": llm_provider
-        }
-
-    except Exception as e:
-        logger.error(f"Voice chat error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Voice chat processing failed: {str(e)}")
+            return {
+                "user_text": user_text,
+                "ai_text": ai_text,
+                "audio_url": tts_result["url"],
+                "duration": tts_result["duration"],
+                "provider": llm_provider,
+                "session_id": session.id
+            }
+
+        except SchedulerSaturatedError as busy:
+            raise_busy(busy)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Voice chat error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Voice chat processing failed: {str(e)}")
+
+
+@router.delete("/sessions/{session_id}")
+async def end_session(session_id: str):
+    """Forget a conversation's server-side history."""
+    if not conversation_store.end(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "ended": True}
+
+@router.get("/sessions/stats")
+async def session_stats():
+    """Live sessions, expirations and history compactions."""
+    return conversation_store.stats()
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.services.scheduler import SchedulerSaturatedError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# How often a long call checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Non-standard (nginx) status for a request the client abandoned; never seen by that client
+CLIENT_CLOSED_REQUEST = 499
+
+
+def raise_busy(busy: SchedulerSaturatedError):
+    """Map scheduler load shedding to 429/503 with a Retry-After hint."""
+    raise HTTPException(
+        status_code=busy.status_code,
+        detail=str(busy),
+        headers={"Retry-After": str(busy.retry_after)}
+    )
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects meanwhile so
+    an abandoned request stops holding upstream capacity. Raises
+    HTTPException(499) in that case.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}; cancelling its work")
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
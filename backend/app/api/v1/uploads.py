@@ -0,0 +1,306 @@
+"""
+Audio Uploads
+Reads audio uploads straight from the request stream. The size limit is
+enforced from Content-Length before anything is read and again as bytes
+arrive, and the audio is decoded while it is being received, so an upload
+never sits in memory (or on disk) in its encoded form.
+
+Accepts multipart/form-data (the audio in one file field, plus small text
+fields) or a raw audio body (audio/* or application/octet-stream).
+
+The first bytes of the audio are held back until the container header has
+been probed, so over-long clips (and work the STT queue can't take) are
+turned away before any decoding starts.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass, field, replace
+from typing import Callable, Collection, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.services.audio.decode import MODEL_SAMPLE_RATE, AudioDecodeError, StreamingAudioDecoder
+from app.services.audio.probe import AudioInfo, probe_audio_bytes
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+ALLOWED_AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".ogg", ".flac"}
+
+# Room for multipart boundaries, part headers and text fields on top of the audio itself
+MULTIPART_OVERHEAD = 64 * 1024
+MAX_FIELD_BYTES = 16 * 1024
+
+# Audio held back for header probing; formats whose header isn't in here are probed after decoding
+PROBE_BYTES = 64 * 1024
+
+
+@dataclass
+class AudioUpload:
+    audio: np.ndarray  # mono float32 at the decoder's sample rate
+    filename: str
+    size: int  # encoded bytes received
+    fields: Dict[str, str] = field(default_factory=dict)
+    info: Optional[AudioInfo] = None  # from the container header, if it could be read
+    sample_rate: int = MODEL_SAMPLE_RATE
+
+    @property
+    def duration(self) -> float:
+        """Exact duration of the decoded audio in seconds."""
+        return len(self.audio) / self.sample_rate
+
+
+def upload_openapi(fields: Optional[Dict[str, Dict]] = None) -> Dict:
+    """OpenAPI request body for routes that read the upload themselves."""
+    properties = {"file": {"type": "string", "format": "binary"}}
+    properties.update(fields or {})
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {"schema": {"type": "object", "required": ["file"], "properties": properties}},
+                "audio/*": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    }
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large. Maximum size: {max_bytes // (1024 * 1024)}MB")
+
+
+def _too_long(duration: float, max_seconds: float) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Audio too long ({duration:.0f}s). Maximum: {max_seconds:.0f}s")
+
+
+class _HeaderProbe:
+    """
+    Holds back the start of the audio until its header has been read, then
+    vets the header (length limit, on_probe callback) before the bytes go on
+    to the decoder. When total_size is only an upper bound on the file size
+    (size_exact=False), durations worked out from it are dropped rather than
+    trusted, so a large form around the file can't get it turned away.
+    """
+
+    def __init__(
+        self,
+        total_size: Optional[int],
+        max_seconds: float,
+        on_probe: Optional[Callable[[AudioInfo], None]],
+        size_exact: bool = True,
+    ):
+        self.total_size = total_size
+        self.size_exact = size_exact
+        self.max_seconds = max_seconds
+        self.on_probe = on_probe
+        self.info: Optional[AudioInfo] = None
+        self.done = False
+        self._head = bytearray()
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Bytes that are ready for the decoder (empty while the header is still incomplete)."""
+        if self.done:
+            return chunk
+        self._head.extend(chunk)
+        self.info = probe_audio_bytes(bytes(self._head), self.total_size)
+        if self.info is None and len(self._head) < PROBE_BYTES:
+            return b""
+        return self.flush()
+
+    def flush(self) -> bytes:
+        if not self.done:
+            self.done = True
+            if self.info is None:
+                self.info = probe_audio_bytes(bytes(self._head), self.total_size)
+            if self.info and self.info.size_based and not self.size_exact:
+                # Checked against the decoded length instead
+                self.info = replace(self.info, duration=0.0, size_based=False)
+            if self.info:
+                if self.info.duration > self.max_seconds:
+                    raise _too_long(self.info.duration, self.max_seconds)
+                if self.on_probe:
+                    self.on_probe(self.info)
+        head, self._head = bytes(self._head), bytearray()
+        return head
+
+
+def _check_extension(filename: str, extensions: Optional[Collection[str]]):
+    if extensions is None:
+        return
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in extensions:
+        raise HTTPException(status_code=400, detail=f"Unsupported file format. Allowed: {set(extensions)}")
+
+
+async def _chunks(request: Request):
+    """Request body chunks; a client that stalls longer than the idle timeout gets a 408."""
+    stream = request.stream().__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(stream.__anext__(), timeout=settings.STT_UPLOAD_IDLE_TIMEOUT)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=408, detail="Upload timed out")
+        yield chunk
+
+
+class _MultipartAudioReader:
+    """Routes the audio field's bytes to the decoder and collects the text fields."""
+
+    def __init__(self, boundary: bytes, file_field: str, max_bytes: int, extensions: Optional[Collection[str]]):
+        self.file_field = file_field
+        self.extensions = extensions
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.file_bytes = 0
+        self.fields: Dict[str, str] = {}
+        self.pending: List[bytes] = []  # audio bytes parsed but not yet decoded
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._part: Optional[str] = None  # "file", a text field name, or None to skip
+        self._value = bytearray()
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._part = None
+        self._value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if name == self.file_field:
+            if self.filename is not None:
+                raise HTTPException(status_code=400, detail="Only one audio file per request")
+            self.filename = os.path.basename(options.get(b"filename", b"").decode("utf-8", errors="replace"))
+            # Reject by name before any audio is read
+            _check_extension(self.filename, self.extensions)
+            self._part = "file"
+        elif name:
+            self._part = name
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._part == "file":
+            self.file_bytes += end - start
+            if self.file_bytes > self.max_bytes:
+                raise _too_large(self.max_bytes)
+            self.pending.append(data[start:end])
+        elif self._part is not None:
+            self._value.extend(data[start:end])
+            if len(self._value) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Form field '{self._part}' is too large")
+
+    def _on_part_end(self):
+        if self._part not in (None, "file"):
+            self.fields[self._part] = self._value.decode("utf-8", errors="replace")
+        self._part = None
+
+
+async def receive_audio_upload(
+    request: Request,
+    max_bytes: Optional[int] = None,
+    file_field: str = "file",
+    extensions: Optional[Collection[str]] = ALLOWED_AUDIO_EXTENSIONS,
+    decoder: Optional[StreamingAudioDecoder] = None,
+    max_seconds: Optional[float] = None,
+    on_probe: Optional[Callable[[AudioInfo], None]] = None,
+) -> AudioUpload:
+    """
+    Stream and decode the audio in request. Multipart filenames must have one
+    of `extensions` (None accepts any name). Audio longer than max_seconds is
+    rejected from its header when the header states the duration, otherwise
+    once decoded. on_probe is called with the header info (duration 0.0 when
+    the header doesn't tell) before decoding starts and may raise to refuse
+    the upload. Raises HTTPException with
+    413 (too large or too long), 408 (stalled upload), 415 (unsupported
+    content type), or 400 (missing file, disallowed extension, undecodable audio).
+    """
+    max_bytes = max_bytes or settings.STT_MAX_UPLOAD_BYTES
+    max_seconds = max_seconds or settings.STT_MAX_AUDIO_SECONDS
+    decoder = decoder or StreamingAudioDecoder()
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    multipart = content_type == b"multipart/form-data"
+    if not multipart and not (content_type.startswith(b"audio/") or content_type == b"application/octet-stream"):
+        raise HTTPException(status_code=415, detail="Send audio as multipart/form-data or as a raw audio/* body")
+
+    # Reject declared oversize bodies without reading a byte
+    limit = max_bytes + MULTIPART_OVERHEAD if multipart else max_bytes
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise _too_large(max_bytes)
+    # For multipart this is only an upper bound on the file size (the form's other parts share it)
+    total_size = int(declared) if declared and declared.isdigit() else None
+    probe = _HeaderProbe(total_size, max_seconds, on_probe, size_exact=not multipart)
+
+    reader = None
+    if multipart:
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise HTTPException(status_code=400, detail="Missing multipart boundary")
+        reader = _MultipartAudioReader(boundary, file_field, max_bytes, extensions)
+
+    received = 0
+    try:
+        async for chunk in _chunks(request):
+            received += len(chunk)
+            if received > limit:
+                raise _too_large(max_bytes)
+            if reader is None:
+                await decoder.feed(probe.feed(chunk))
+                continue
+            reader.parser.write(chunk)
+            for piece in reader.pending:
+                await decoder.feed(probe.feed(piece))
+            reader.pending.clear()
+
+        if reader is not None:
+            reader.parser.finalize()
+            if reader.filename is None:
+                raise HTTPException(status_code=400, detail="No file uploaded")
+        await decoder.feed(probe.flush())
+        audio = await decoder.finish()
+    except AudioDecodeError as e:
+        await decoder.abort()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await decoder.abort()
+        raise
+
+    upload = AudioUpload(
+        audio=audio,
+        filename=reader.filename if reader else "upload",
+        size=reader.file_bytes if reader else received,
+        fields=reader.fields if reader else {},
+        info=probe.info,
+        sample_rate=decoder.sample_rate,
+    )
+    # Containers that don't state their length are checked once decoded
+    if upload.duration > max_seconds:
+        raise _too_long(upload.duration, max_seconds)
+    return upload
@@ -1,3 +1,4 @@
+import os
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -8,8 +9,111 @@ class Settings(BaseSettings):
     
     CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
     
+    # Startup: load models (and run one warm-up inference) before /health/ready reports ready
+    PRELOAD_MODELS: bool = False
+    PRELOAD_VOICES: str = ""  # comma-separated voice ids, "*" for all; empty = first installed voice
+    WARMUP_INFERENCE: bool = True
+    # Report ready even if an engine failed to warm up (the others serve; the failed one errors)
+    WARMUP_ALLOW_DEGRADED: bool = False
+    
     # Models
     MODEL_DIR: str = "../voice_assets"
+    # Seconds between background checks of manifests/model files for changes (0 = never)
+    VOICE_REGISTRY_REFRESH_INTERVAL: float = 5.0
+    
+    # TTS engine pool (warm piper processes per voice). Each worker holds its voice's model,
+    # so memory grows with voices x workers; raise this (with TTS_VOICE_CONCURRENCY) up to
+    # the core count for voices that need more throughput
+    PIPER_POOL_ENABLED: bool = True
+    PIPER_WORKERS_PER_VOICE: int = 2
+    PIPER_REQUEST_TIMEOUT: float = 120.0
+    PIPER_WORKER_IDLE_TIMEOUT: float = 600.0
+    
+    # TTS scheduling (synthesis runs off the event loop; excess load is rejected)
+    TTS_MAX_CONCURRENCY: int = os.cpu_count() or 2
+    TTS_VOICE_CONCURRENCY: int = 2
+    TTS_QUEUE_MAX_DEPTH: int = 32
+    TTS_QUEUE_MAX_WAIT: float = 30.0
+    
+    # Long-text synthesis (split at sentence boundaries, segments rendered in parallel).
+    # TTS_PARALLEL_SEGMENTS caps the segments per text; 0 uses min(CPU count, TTS_MAX_CONCURRENCY).
+    # One text's segments may exceed TTS_VOICE_CONCURRENCY and PIPER_WORKERS_PER_VOICE, so a
+    # long text can start that many piper processes for its voice, each holding the model:
+    # lower this to bound memory. Extra workers are reaped after PIPER_WORKER_IDLE_TIMEOUT
+    TTS_PARALLEL_SEGMENTS: int = 0
+    TTS_PARALLEL_MIN_CHARS: int = 300
+    TTS_SEGMENT_SILENCE_MS: int = 200
+    
+    # TTS synthesis cache (content-addressed, LRU within a byte budget)
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    
+    # Audio delivery (generated files are immutable, so clients may cache them indefinitely)
+    AUDIO_CACHE_MAX_AGE: int = 31536000
+    AUDIO_MEMORY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    AUDIO_MEMORY_CACHE_MAX_FILE_BYTES: int = 512 * 1024
+    
+    # STT uploads (streamed and decoded as they arrive; oversize bodies are rejected early)
+    STT_MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024
+    STT_UPLOAD_IDLE_TIMEOUT: float = 30.0
+    # Longest clip accepted; checked from the container header before decoding where possible
+    STT_MAX_AUDIO_SECONDS: float = 1200.0
+    
+    # STT engine ("auto" = faster-whisper if installed, else whisper, else mock)
+    STT_BACKEND: str = "auto"
+    STT_MODEL_SIZE: str = "base"
+    STT_COMPUTE_TYPE: str = "int8"  # faster-whisper weights: int8, int8_float32, float32
+    STT_BEAM_SIZE: int = 1
+    # Models a request may pick instead of the default (each runs in its own worker pool)
+    STT_REQUEST_MODELS: str = "tiny,base,small"
+    STT_EXTRA_POOL_WORKERS: int = 1
+    
+    # STT workers (model loaded once per process; 0 = size from CPU cores and available memory)
+    STT_WORKERS: int = 0
+    # Seconds one worker job may run; a hung worker is killed and its pool restarted
+    STT_REQUEST_TIMEOUT: float = 600.0
+    STT_QUEUE_MAX_DEPTH: int = 16
+    STT_QUEUE_MAX_WAIT: float = 60.0
+    # Initial guess of worker seconds per audio second, refined from measured runs
+    STT_ESTIMATED_RTF: float = 0.3
+    
+    # STT micro-batching (short clips arriving within the window share one forward pass; 0 disables).
+    # Both whisper backends batch, so the "auto" default uses it
+    STT_BATCH_WINDOW_MS: int = 30
+    STT_BATCH_MAX_SIZE: int = 8
+    STT_BATCH_MAX_SECONDS: float = 30.0
+    
+    # STT voice activity detection (trims silence, skips silent clips, splits long audio at pauses)
+    STT_VAD_ENABLED: bool = True
+    STT_VAD_THRESHOLD_DB: float = -45.0
+    STT_VAD_MIN_PAUSE_MS: int = 300
+    STT_VAD_PAD_MS: int = 200
+    STT_VAD_CHUNK_SECONDS: float = 30.0
+    
+    # Streaming STT over WebSocket (decode step, longest undecided window, pause that ends an utterance)
+    STT_STREAM_STEP_MS: int = 1000
+    STT_STREAM_WINDOW_SECONDS: float = 20.0
+    STT_STREAM_PAUSE_MS: int = 600
+    
+    # STT result cache keyed by a hash of the decoded audio, model and options;
+    # STT_CACHE_DIR adds an on-disk tier (JSON files, LRU within a byte budget)
+    STT_CACHE_ENABLED: bool = True
+    STT_CACHE_MAX_ENTRIES: int = 512
+    STT_CACHE_DIR: str = ""
+    STT_CACHE_DISK_MAX_BYTES: int = 64 * 1024 * 1024
+    
+    # Voice-chat sessions (server-side history within a token budget, expired after inactivity)
+    SESSION_TTL_SECONDS: float = 1800.0
+    SESSION_MAX_SESSIONS: int = 1000
+    SESSION_MAX_HISTORY_TOKENS: int = 2048
+    SESSION_SUMMARIZE: bool = False  # fold trimmed turns into an LLM-written summary
+    
+    # Translation memory for strict translations (LRU in front of a local SQLite store;
+    # an empty TRANSLATION_MEMORY_DB keeps it in memory only)
+    TRANSLATION_MEMORY_ENABLED: bool = True
+    TRANSLATION_MEMORY_DB: str = "translation_memory.sqlite3"
+    TRANSLATION_MEMORY_MAX_ENTRIES: int = 4096
+    TRANSLATION_MEMORY_SENTENCES: bool = True
     
     # LLM
     DEFAULT_LLM_PROVIDER: str = "ollama"
@@ -17,6 +121,17 @@ class Settings(BaseSettings):
     OLLAMA_DEFAULT_MODEL: str = "llama2"
     GEMINI_API_KEY: str = ""
     GEMINI_DEFAULT_MODEL: str = "gemini-pro"
+    # Gemini calls run on a bounded thread pool; deadline per call covers queueing + upstream
+    GEMINI_MAX_CONCURRENCY: int = 8
+    GEMINI_QUEUE_MAX_DEPTH: int = 32
+    GEMINI_QUEUE_MAX_WAIT: float = 10.0
+    GEMINI_REQUEST_TIMEOUT: float = 30.0
+    # Shared HTTP client per provider (keep-alive pool, reused across requests)
+    LLM_REQUEST_TIMEOUT: float = 60.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_MAX_CONNECTIONS: int = 32
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    LLM_KEEPALIVE_EXPIRY: float = 120.0
     
     class Config:
         env_file = ".env"
@@ -1,13 +1,38 @@
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.router import api_router
+from app.api.v1.endpoints import tts
+from app.services.llm import LLMFactory
+from app.services.stt_service import stt_service
+from app.services.tts_service import tts_service
+from app.services.warmup import readiness, warm_up
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so liveness answers while models load
+    warmup_task = asyncio.create_task(warm_up(readiness)) if settings.PRELOAD_MODELS else None
+    if warmup_task is None:
+        readiness.ready = True
+    yield
+    # Stop taking traffic before tearing engines down
+    readiness.ready = False
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    # Stop warm engine and model worker processes so they don't outlive the server
+    tts_service.shutdown()
+    stt_service.shutdown()
+    await LLMFactory.aclose_all()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
-    description="Professional AI Voice Platform API"
+    description="Professional AI Voice Platform API",
+    lifespan=lifespan
 )
 
 # CORS
@@ -22,9 +47,22 @@ app.add_middleware(
 # Router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Synthesis responses hand out /outputs/<file> URLs; serve them through the audio route
+app.add_api_route("/outputs/{filename}", tts.get_audio_file, methods=["GET", "HEAD"], include_in_schema=False)
+
 @app.get("/health", tags=["System"])
 async def health_check():
     return {"status": "healthy", "version": settings.PROJECT_VERSION}
 
+@app.get("/health/live", tags=["System"])
+async def liveness():
+    """The process is up and serving HTTP (restart it if this fails)."""
+    return {"status": "alive", "version": settings.PROJECT_VERSION}
+
+@app.get("/health/ready", tags=["System"])
+async def readiness_check():
+    """Models are loaded and warm (route traffic here only while this is 200)."""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -7,4 +7,5 @@ class STTResponse(BaseModel):
     confidence: Optional[float] = 0.0
     duration: float
     segments: Optional[List[dict]] = None
+    cached: bool = False
     message: str = "Transcription successful"
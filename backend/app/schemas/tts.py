@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 
 class TTSRequest(BaseModel):
     text: str = Field(
@@ -16,9 +16,44 @@ class TTSRequest(BaseModel):
         le=2.0,
         description="Speed multiplier (0.5-2.0)"
     )
+    format: Literal["wav", "mulaw", "flac", "ogg"] = Field(
+        default="wav",
+        description="Output encoding: 16-bit PCM WAV, G.711 mu-law WAV, FLAC or Ogg Opus"
+    )
+    sample_rate: Optional[Literal[8000, 16000, 22050, 24000, 44100, 48000]] = Field(
+        default=None,
+        description="Resample output to this rate (Hz); native voice rate when omitted"
+    )
 
 class TTSResponse(BaseModel):
     audio_url: str
     duration: float
     message: str
+    cached: bool = False
+
+
+class TTSBatchRequest(BaseModel):
+    items: List[TTSRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Synthesis requests; items sharing a voice_id are rendered together"
+    )
+    archive: bool = Field(
+        default=False,
+        description="Return a ZIP of the rendered WAVs instead of per-item URLs"
+    )
 
+class TTSBatchItemResult(BaseModel):
+    index: int
+    voice_id: str
+    audio_url: Optional[str] = None
+    duration: Optional[float] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+class TTSBatchResponse(BaseModel):
+    results: List[TTSBatchItemResult]
+    succeeded: int
+    failed: int
+    message: str
@@ -0,0 +1,14 @@
+from app.services.audio.decode import AudioDecodeError, decode_audio
+from app.services.audio.probe import AudioInfo, probe_audio, probe_audio_bytes, probe_duration
+from app.services.audio.vad import detect_speech, plan_chunks
+
+__all__ = [
+    "AudioDecodeError",
+    "AudioInfo",
+    "decode_audio",
+    "detect_speech",
+    "plan_chunks",
+    "probe_audio",
+    "probe_audio_bytes",
+    "probe_duration",
+]
@@ -0,0 +1,418 @@
+"""
+Audio Decoding
+Turns uploaded audio into the mono float32 array speech models consume,
+without writing the upload to disk. WAV is parsed directly; FLAC/OGG/MP3 go
+through libsndfile when soundfile is installed; anything else (M4A/AAC, WebM)
+is piped through ffmpeg. StreamingAudioDecoder does the same for uploads that
+are still arriving.
+"""
+
+import asyncio
+import io
+import os
+import struct
+import subprocess
+import tempfile
+import wave
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.audio.encode import ffmpeg_path
+
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except (ImportError, OSError):  # OSError: libsndfile itself is missing
+    SOUNDFILE_AVAILABLE = False
+
+# Whisper-family models expect 16 kHz mono
+MODEL_SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(ValueError):
+    """Raised when an upload can't be decoded as audio."""
+
+
+def _pcm_to_float(frames: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        value = np.where(value & 0x800000, value - 0x1000000, value)
+        return value.astype(np.float32) / 8388608.0
+    if sample_width == 4:
+        return np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise AudioDecodeError(f"Unsupported PCM sample width: {sample_width * 8}-bit")
+
+
+def _decode_wav(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Integer PCM WAV via the stdlib; None for other WAV encodings (float, mu-law, ...)."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as f:
+            channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+            frames = f.readframes(f.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    samples = _pcm_to_float(frames[:len(frames) - len(frames) % (width * channels)], width)
+    return samples.reshape(-1, channels), rate
+
+
+def _decode_soundfile(data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    if not SOUNDFILE_AVAILABLE:
+        return None
+    try:
+        samples, rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except RuntimeError:  # libsndfile errors, including unrecognized formats
+        return None
+    return samples, rate
+
+
+def _is_mp4(data: bytes) -> bool:
+    return data[4:8] == b"ftyp"
+
+
+def _decode_ffmpeg(data: bytes, sample_rate: int) -> np.ndarray:
+    """Decode anything ffmpeg understands, straight to mono float32 at sample_rate."""
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        raise AudioDecodeError("This audio format needs ffmpeg, which is not installed on the server.")
+    output_args = ["-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0", "-i", "pipe:0", *output_args]
+    result = subprocess.run(cmd, input=data, capture_output=True)
+    if result.returncode != 0 and _is_mp4(data):
+        # MP4/M4A files with the index (moov atom) at the end can't be read from a pipe
+        result = _decode_ffmpeg_seekable(ffmpeg, data, output_args)
+    if result.returncode != 0:
+        raise AudioDecodeError(f"Could not decode audio: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype="<f4")
+
+
+def _decode_ffmpeg_seekable(ffmpeg: str, data: bytes, output_args) -> subprocess.CompletedProcess:
+    fd, path = tempfile.mkstemp(suffix=".m4a")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0", "-i", path, *output_args]
+        return subprocess.run(cmd, capture_output=True)
+    finally:
+        os.remove(path)
+
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    """(frames, channels) -> (frames,) by averaging channels."""
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def _resampling_filter(up: int, down: int) -> np.ndarray:
+    """The FIR filter resample_poly designs by default for up/down."""
+    from scipy.signal import firwin
+
+    max_rate = max(up, down)
+    return firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+
+
+def resample_float(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Polyphase resampling of a float32 mono signal."""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    from scipy.signal import resample_poly
+
+    divisor = gcd(src_rate, dst_rate)
+    return resample_poly(samples, dst_rate // divisor, src_rate // divisor).astype(np.float32)
+
+
+def decode_audio(data: bytes, sample_rate: int = MODEL_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an encoded audio file held in memory to a mono float32 array
+    in [-1, 1] at sample_rate.
+    """
+    if not data:
+        raise AudioDecodeError("Audio file is empty")
+
+    decoded = _decode_wav(data) if data[:4] == b"RIFF" else None
+    if decoded is None and not _is_mp4(data):
+        decoded = _decode_soundfile(data)
+    if decoded is None:
+        return _decode_ffmpeg(data, sample_rate)
+
+    samples, rate = decoded
+    return np.ascontiguousarray(resample_float(to_mono(samples), rate, sample_rate), dtype=np.float32)
+
+
+class StreamingResampler:
+    """
+    resample_float() for a signal that arrives in pieces. Input is cut at whole
+    filter phase periods and each piece is resampled together with enough of
+    its neighbours that the output matches resampling the whole signal at
+    once, so memory stays proportional to a piece rather than the recording.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        divisor = gcd(src_rate, dst_rate)
+        self.up, self.down = dst_rate // divisor, src_rate // divisor
+        self._filter = _resampling_filter(self.up, self.down) if self.up != self.down else None
+        # Input samples the filter reaches on either side of an output, in whole phase periods
+        reach = -(-10 * max(self.up, self.down) // self.up) + 1
+        self.context = -(-reach // self.down) * self.down
+        self._history = np.zeros(0, dtype=np.float32)  # last `context` samples already resampled
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def _emit(self, count: int, window: np.ndarray) -> np.ndarray:
+        from scipy.signal import resample_poly
+
+        out = resample_poly(np.concatenate([self._history, window]), self.up, self.down, window=self._filter)
+        start = len(self._history) * self.up // self.down
+        out = out[start:start + -(-count * self.up // self.down)]
+        self._history = np.concatenate([self._history, self._pending[:count]])[-self.context:]
+        self._pending = self._pending[count:]
+        return out.astype(np.float32)
+
+    def feed(self, samples: np.ndarray) -> np.ndarray:
+        """Add samples; returns the output that is final so far (possibly empty)."""
+        if self._filter is None:
+            return samples
+        self._pending = np.concatenate([self._pending, samples])
+        # Whole phase periods that have the filter's full reach of input after them
+        ready = (len(self._pending) - self.context) // self.down * self.down
+        if ready <= 0:
+            return np.zeros(0, dtype=np.float32)
+        return self._emit(ready, self._pending[:ready + self.context])
+
+    def flush(self) -> np.ndarray:
+        """The remaining output, once the input has ended."""
+        if self._filter is None or not len(self._pending):
+            return np.zeros(0, dtype=np.float32)
+        return self._emit(len(self._pending), self._pending)
+
+
+# WAV headers larger than this (e.g. huge metadata chunks) are decoded in one go instead
+MAX_WAV_HEADER_BYTES = 1024 * 1024
+
+# WAVE_FORMAT_EXTENSIBLE stores the real format tag in its sub-format GUID
+WAVE_FORMAT_PCM, WAVE_FORMAT_FLOAT, WAVE_FORMAT_EXTENSIBLE = 1, 3, 0xFFFE
+
+
+class _WavStream:
+    """
+    Incremental RIFF/WAVE parser for PCM and float data; converts and resamples
+    frames to sample_rate as they arrive.
+    """
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.header = bytearray()  # bytes before the data chunk, kept for fallback
+        self.supported = True
+        self.rate = 0
+        self._resampler: Optional[StreamingResampler] = None
+        self._pending = bytearray()
+        self._format: Optional[Tuple[int, int, int]] = None  # (format tag, channels, bytes per sample)
+        self._remaining: Optional[int] = None
+        self._in_data = False
+        self._parts = []
+
+    def _parse_header(self):
+        data = bytes(self.header)
+        if len(data) < 12:
+            return
+        if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+            self.supported = False
+            return
+        offset = 12
+        while offset + 8 <= len(data):
+            chunk_id = data[offset:offset + 4]
+            size = struct.unpack("<I", data[offset + 4:offset + 8])[0]
+            body_start = offset + 8
+            if chunk_id == b"data":
+                if self._format is None:
+                    self.supported = False
+                    return
+                self._in_data = True
+                # 0 / 0xFFFFFFFF: length unknown when the file was written (streamed WAV)
+                self._remaining = None if size in (0, 0xFFFFFFFF) else size
+                self._consume(data[body_start:])
+                return
+            if body_start + size > len(data):
+                return  # wait for the rest of this chunk
+            if chunk_id == b"fmt ":
+                if size < 16:
+                    self.supported = False
+                    return
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", data[body_start:body_start + 16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    tag = struct.unpack("<H", data[body_start + 24:body_start + 26])[0]
+                width = bits // 8
+                pcm = tag == WAVE_FORMAT_PCM and width in (1, 2, 3, 4)
+                floating = tag == WAVE_FORMAT_FLOAT and width == 4
+                if not (pcm or floating) or channels < 1 or rate < 1:
+                    self.supported = False
+                    return
+                self._format = (tag, channels, width)
+                self.rate = rate
+                self._resampler = StreamingResampler(rate, self.sample_rate)
+            offset = body_start + size + (size % 2)
+
+    def _consume(self, chunk: bytes):
+        if self._remaining is not None:
+            chunk = chunk[:self._remaining]
+            self._remaining -= len(chunk)
+        self._pending.extend(chunk)
+        tag, channels, width = self._format
+        frame_bytes = channels * width
+        usable = len(self._pending) - len(self._pending) % frame_bytes
+        if not usable:
+            return
+        frames = bytes(self._pending[:usable])
+        del self._pending[:usable]
+        if tag == WAVE_FORMAT_FLOAT:
+            samples = np.frombuffer(frames, dtype="<f4")
+        else:
+            samples = _pcm_to_float(frames, width)
+        self._parts.append(self._resampler.feed(to_mono(samples.reshape(-1, channels))))
+
+    def feed(self, chunk: bytes):
+        if self._in_data:
+            self._consume(chunk)
+            return
+        self.header.extend(chunk)
+        self._parse_header()
+        if not self._in_data and len(self.header) > MAX_WAV_HEADER_BYTES:
+            self.supported = False
+
+    def finish(self) -> Optional[np.ndarray]:
+        """Samples at sample_rate, or None if the data chunk was never reached."""
+        if not self._in_data:
+            return None
+        self._parts.append(self._resampler.flush())
+        return np.ascontiguousarray(np.concatenate(self._parts), dtype=np.float32)
+
+
+class StreamingAudioDecoder:
+    """
+    Decodes an upload while it is still arriving. Feed encoded chunks in order,
+    then call finish() for the mono float32 array at sample_rate.
+
+    WAV is converted chunk by chunk and compressed formats are streamed through
+    an ffmpeg process, so the encoded file is never held in memory as a whole.
+    MP4/M4A (whose index may sit at the end of the file), unusual WAV encodings,
+    and servers without ffmpeg fall back to buffering and decode_audio().
+    """
+
+    SNIFF_BYTES = 12
+
+    def __init__(self, sample_rate: int = MODEL_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.bytes_fed = 0
+        self._mode: Optional[str] = None  # "wav", "ffmpeg" or "buffer"
+        self._head = bytearray()
+        self._buffer = bytearray()
+        self._wav: Optional[_WavStream] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._output = bytearray()
+        self._errors = bytearray()
+        self._readers = []
+
+    async def _start(self, head: bytes):
+        if head[:4] == b"RIFF":
+            self._mode = "wav"
+            self._wav = _WavStream(self.sample_rate)
+        elif ffmpeg_path() and not _is_mp4(head):
+            self._mode = "ffmpeg"
+            await self._start_ffmpeg()
+        else:
+            self._mode = "buffer"
+
+    async def _start_ffmpeg(self):
+        self._process = await asyncio.create_subprocess_exec(
+            ffmpeg_path(), "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+            "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        async def drain(stream, sink: bytearray):
+            while True:
+                data = await stream.read(64 * 1024)
+                if not data:
+                    return
+                sink.extend(data)
+
+        # Read output concurrently so ffmpeg never blocks on a full pipe
+        self._readers = [
+            asyncio.ensure_future(drain(self._process.stdout, self._output)),
+            asyncio.ensure_future(drain(self._process.stderr, self._errors)),
+        ]
+
+    async def _route(self, chunk: bytes):
+        if self._mode == "wav":
+            # Converting and resampling is CPU work; keep it off the event loop
+            await asyncio.to_thread(self._wav.feed, chunk)
+            if not self._wav.supported:
+                # Not a format we convert incrementally: keep what we have and decode at the end
+                self._mode = "buffer"
+                self._buffer.extend(self._wav.header)
+                self._wav = None
+        elif self._mode == "ffmpeg":
+            try:
+                self._process.stdin.write(chunk)
+                await self._process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg gave up; its error is reported by finish()
+        else:
+            self._buffer.extend(chunk)
+
+    async def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.bytes_fed += len(chunk)
+        if self._mode is None:
+            self._head.extend(chunk)
+            if len(self._head) < self.SNIFF_BYTES:
+                return
+            chunk = bytes(self._head)
+            self._head.clear()
+            await self._start(chunk)
+        await self._route(chunk)
+
+    async def finish(self) -> np.ndarray:
+        if self._mode is None:
+            if not self._head:
+                raise AudioDecodeError("Audio file is empty")
+            await self._start(bytes(self._head))
+            await self._route(bytes(self._head))
+
+        if self._mode == "ffmpeg":
+            try:
+                self._process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            await asyncio.gather(*self._readers)
+            if await self._process.wait() != 0:
+                raise AudioDecodeError(f"Could not decode audio: {self._errors.decode(errors='replace').strip()}")
+            return np.frombuffer(bytes(self._output[:len(self._output) - len(self._output) % 4]), dtype="<f4")
+
+        if self._mode == "wav":
+            samples = await asyncio.to_thread(self._wav.finish)
+            if samples is None:
+                raise AudioDecodeError("Could not decode audio: WAV file has no audio data")
+            return samples
+
+        return await asyncio.to_thread(decode_audio, bytes(self._buffer), self.sample_rate)
+
+    async def abort(self):
+        """Stop decoding early (upload rejected or failed)."""
+        if self._process and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        for reader in self._readers:
+            reader.cancel()
+        self._buffer.clear()
@@ -0,0 +1,204 @@
+"""
+Audio Delivery
+HTTP delivery of generated audio: strong content ETags, immutable caching,
+conditional 304s, single byte-range requests, and an in-memory fast path
+for small clips.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.core.config import settings
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+CHUNK_SIZE = 64 * 1024
+
+# Metadata (size, ETag) is remembered for this many files
+MAX_TRACKED_FILES = 4096
+
+
+@dataclass
+class _Entry:
+    size: int
+    mtime_ns: int
+    etag: str
+    last_modified: str
+    content: Optional[bytes] = None
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end).
+    Returns None when the header should be ignored (malformed or multi-range)
+    and (-1, -1) when the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.group(1), match.group(2)
+    if first == "":
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return (-1, -1)
+        return (max(0, size - suffix), size - 1)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return (-1, -1)
+    if end < start:
+        return None
+    return (start, end)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [c.strip() for c in header.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class AudioDelivery:
+    """
+    Serves files whose content never changes after they are written.
+    ETags are a hash of the bytes, computed once per file version; files at
+    or under `memory_file_limit` bytes are kept in memory within `memory_budget`.
+    """
+
+    def __init__(self, memory_budget: int, memory_file_limit: int, max_age: int):
+        self.memory_budget = memory_budget
+        self.memory_file_limit = memory_file_limit
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.not_modified = 0
+        self.partial = 0
+
+    def _entry(self, path: Path) -> _Entry:
+        stat = path.stat()
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._entries.move_to_end(key)
+                return entry
+
+        digest = hashlib.sha256()
+        content = None
+        if stat.st_size <= self.memory_file_limit:
+            content = path.read_bytes()
+            digest.update(content)
+        else:
+            with open(path, "rb") as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+        entry = _Entry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            etag=f'"{digest.hexdigest()[:32]}"',
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            content=content,
+        )
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous and previous.content is not None:
+                self._memory_bytes -= previous.size
+            self._entries[key] = entry
+            if content is not None:
+                self._memory_bytes += entry.size
+            self._trim()
+        return entry
+
+    def _trim(self):
+        """Drop cached bytes (then whole entries) oldest first. Caller holds the lock."""
+        for key, entry in list(self._entries.items()):
+            if self._memory_bytes <= self.memory_budget:
+                break
+            if entry.content is not None and key != next(reversed(self._entries)):
+                entry.content = None
+                self._memory_bytes -= entry.size
+        while len(self._entries) > MAX_TRACKED_FILES:
+            _, entry = self._entries.popitem(last=False)
+            if entry.content is not None:
+                self._memory_bytes -= entry.size
+
+    def _read_range(self, path: Path, start: int, end: int) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def response(self, request: Request, path: Path, media_type: str, filename: str) -> Response:
+        entry = self._entry(path)
+        headers = {
+            "ETag": entry.etag,
+            "Last-Modified": entry.last_modified,
+            "Cache-Control": f"public, max-age={self.max_age}, immutable",
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        start, end, status = 0, entry.size - 1, 200
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        # A stale If-Range means the client's partial copy is outdated: send everything
+        if range_header and (not if_range or if_range == entry.etag):
+            byte_range = parse_range(range_header, entry.size)
+            if byte_range == (-1, -1):
+                headers["Content-Range"] = f"bytes */{entry.size}"
+                return Response(status_code=416, headers=headers)
+            if byte_range:
+                start, end = byte_range
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{entry.size}"
+                self.partial += 1
+
+        length = max(0, end - start + 1)
+        headers["Content-Length"] = str(length)
+        if request.method == "HEAD":
+            return Response(status_code=status, headers=headers, media_type=media_type)
+        if entry.content is not None:
+            self.memory_hits += 1
+            return Response(content=entry.content[start:end + 1], status_code=status, headers=headers, media_type=media_type)
+        return StreamingResponse(
+            self._read_range(path, start, end), status_code=status, headers=headers, media_type=media_type
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked_files": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget": self.memory_budget,
+                "memory_hits": self.memory_hits,
+                "not_modified": self.not_modified,
+                "partial": self.partial,
+            }
+
+
+audio_delivery = AudioDelivery(
+    memory_budget=settings.AUDIO_MEMORY_CACHE_MAX_BYTES,
+    memory_file_limit=settings.AUDIO_MEMORY_CACHE_MAX_FILE_BYTES,
+    max_age=settings.AUDIO_CACHE_MAX_AGE,
+)
@@ -0,0 +1,131 @@
+"""
+Audio Encoding
+Converts rendered WAVs into compact delivery formats: resampled PCM,
+G.711 mu-law, and FLAC / Ogg Opus when ffmpeg is available.
+"""
+
+import shutil
+import struct
+import subprocess
+import wave
+from math import gcd
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+
+# format name -> file extension, media type, ffmpeg codec arguments (None = encoded in-process)
+FORMATS: Dict[str, Dict[str, object]] = {
+    "wav": {"ext": "wav", "media_type": "audio/wav", "ffmpeg": None},
+    "mulaw": {"ext": "wav", "media_type": "audio/wav", "ffmpeg": None},
+    "flac": {"ext": "flac", "media_type": "audio/flac", "ffmpeg": ["-c:a", "flac", "-f", "flac"]},
+    "ogg": {"ext": "ogg", "media_type": "audio/ogg", "ffmpeg": ["-c:a", "libopus", "-b:a", "24k", "-f", "ogg"]},
+}
+
+MEDIA_TYPES = {f".{spec['ext']}": spec["media_type"] for spec in FORMATS.values()}
+
+WAVE_FORMAT_MULAW = 7
+
+
+def ffmpeg_path() -> Optional[str]:
+    return shutil.which("ffmpeg")
+
+
+def available_formats() -> List[str]:
+    """Formats this server can produce right now."""
+    has_ffmpeg = ffmpeg_path() is not None
+    return [name for name, spec in FORMATS.items() if spec["ffmpeg"] is None or has_ffmpeg]
+
+
+def read_wav(path: Path) -> Tuple[np.ndarray, int]:
+    """Load a 16-bit PCM WAV as an int16 array of shape (frames, channels)."""
+    with wave.open(str(path), "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM, got {f.getsampwidth() * 8}-bit")
+        channels, rate = f.getnchannels(), f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    return samples.reshape(-1, channels), rate
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Polyphase resampling with anti-aliasing; int16 in, int16 out."""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    from scipy.signal import resample_poly
+
+    divisor = gcd(src_rate, dst_rate)
+    resampled = resample_poly(samples.astype(np.float32), dst_rate // divisor, src_rate // divisor, axis=0)
+    return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+
+
+MULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def mulaw_encode(samples: np.ndarray) -> np.ndarray:
+    """G.711 mu-law companding of int16 samples to bytes, vectorized (bit-exact with the reference codec)."""
+    value = samples.astype(np.int32) >> 2  # 14-bit linear
+    negative = value < 0
+    magnitude = np.minimum(np.where(negative, -value, value), 8159) + 33
+    segment = np.searchsorted(MULAW_SEGMENT_ENDS, magnitude)
+    mask = np.where(negative, 0x7F, 0xFF)
+    code = (np.minimum(segment, 7) << 4) | ((magnitude >> (np.minimum(segment, 7) + 1)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def write_wav(path: Path, samples: np.ndarray, rate: int):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+
+
+def write_mulaw_wav(path: Path, samples: np.ndarray, rate: int):
+    """WAV container with WAVE_FORMAT_MULAW (8 bits/sample); the stdlib wave module only writes PCM."""
+    channels = samples.shape[1]
+    payload = mulaw_encode(samples).tobytes()
+    frames = samples.shape[0]
+    fmt = struct.pack("<HHIIHHH", WAVE_FORMAT_MULAW, channels, rate, rate * channels, channels, 8, 0)
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", 4 + (8 + len(fmt)) + 12 + (8 + len(payload) + len(payload) % 2)) + b"WAVE")
+        f.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        f.write(b"fact" + struct.pack("<II", 4, frames))
+        f.write(b"data" + struct.pack("<I", len(payload)) + payload)
+        if len(payload) % 2:
+            f.write(b"\0")
+
+
+def encode_with_ffmpeg(path: Path, samples: np.ndarray, rate: int, codec_args: List[str]):
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        raise ValueError("This format needs ffmpeg, which is not installed on the server.")
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "s16le", "-ar", str(rate), "-ac", str(samples.shape[1]), "-i", "pipe:0",
+        *codec_args, str(path),
+    ]
+    result = subprocess.run(cmd, input=samples.astype("<i2").tobytes(), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg encoding failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def transcode(src: Path, dst: Path, fmt: str, sample_rate: Optional[int] = None):
+    """Convert a 16-bit PCM WAV to `fmt`, optionally resampling to `sample_rate` first."""
+    spec = FORMATS.get(fmt)
+    if spec is None:
+        raise ValueError(f"Unsupported audio format '{fmt}'. Supported: {list(FORMATS)}")
+
+    samples, rate = read_wav(src)
+    if sample_rate and sample_rate != rate:
+        samples = resample(samples, rate, sample_rate)
+        rate = sample_rate
+
+    if fmt == "wav":
+        write_wav(dst, samples, rate)
+    elif fmt == "mulaw":
+        write_mulaw_wav(dst, samples, rate)
+    else:
+        encode_with_ffmpeg(dst, samples, rate, spec["ffmpeg"])
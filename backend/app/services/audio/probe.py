@@ -0,0 +1,315 @@
+"""
+Audio Probe
+Reads duration, sample rate and channel count from container headers
+without decoding any audio: WAV, FLAC, OGG (Vorbis/Opus), MP3 and MP4/M4A.
+
+Works on files and on the first bytes of an upload that is still arriving.
+A duration of 0.0 means the header alone doesn't tell (e.g. an OGG stream
+without its last page, or an MP4 whose index sits after the audio).
+Durations worked out from the file size (CBR MP3, streamed WAV) are flagged
+size_based: they are only as good as the size they were given.
+"""
+
+import io
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+PathLike = Union[str, Path]
+
+
+@dataclass
+class AudioInfo:
+    format: str
+    duration: float
+    sample_rate: int
+    channels: int
+    codec: str = ""
+    size_based: bool = False  # duration derived from the file size, not stated in the header
+
+
+def _probe_wav(f: BinaryIO, file_size: Optional[int]) -> Optional[AudioInfo]:
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            body = f.read(chunk_size)
+            audio_format, channels, rate, byte_rate = struct.unpack("<HHII", body[:12])
+            fmt = (audio_format, channels, rate, byte_rate)
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            audio_format, channels, rate, byte_rate = fmt
+            # Streamed WAVs carry a placeholder size; fall back to what is actually on disk
+            size_based = False
+            if file_size is not None:
+                data_size = min(chunk_size, file_size - f.tell())
+                size_based = data_size < chunk_size
+            elif chunk_size in (0, 0xFFFFFFFF):
+                data_size = 0
+            else:
+                data_size = chunk_size
+            codec = {1: "pcm", 3: "float", 6: "alaw", 7: "mulaw", 0xFFFE: "extensible"}.get(audio_format, str(audio_format))
+            duration = data_size / byte_rate if byte_rate else 0.0
+            return AudioInfo("wav", duration, rate, channels, codec, size_based)
+        else:
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def _probe_flac(f: BinaryIO) -> Optional[AudioInfo]:
+    if f.read(4) != b"fLaC":
+        return None
+    block_header = f.read(4)
+    # STREAMINFO is always the first metadata block
+    if len(block_header) < 4 or block_header[0] & 0x7F != 0:
+        return None
+    info = f.read(34)
+    if len(info) < 18:
+        return None
+    packed = int.from_bytes(info[10:18], "big")
+    rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    duration = total_samples / rate if rate else 0.0
+    return AudioInfo("flac", duration, rate, channels, "flac")
+
+
+def _probe_ogg(f: BinaryIO, file_size: Optional[int]) -> Optional[AudioInfo]:
+    page = f.read(27)
+    if len(page) < 27 or page[:4] != b"OggS":
+        return None
+    segments = f.read(page[26])
+    packet = f.read(min(sum(segments), 64))
+
+    if packet.startswith(b"OpusHead"):
+        channels = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        rate = struct.unpack("<I", packet[12:16])[0] or 48000
+        granule_rate, codec = 48000, "opus"
+    elif packet.startswith(b"\x01vorbis"):
+        channels = packet[11]
+        rate = struct.unpack("<I", packet[12:16])[0]
+        pre_skip, granule_rate, codec = 0, rate, "vorbis"
+    else:
+        return None
+
+    if file_size is None:
+        return AudioInfo("ogg", 0.0, rate, channels, codec)
+
+    # The last page's granule position is the stream's total sample count
+    tail = min(file_size, 65536)
+    f.seek(file_size - tail)
+    data = f.read(tail)
+    last = data.rfind(b"OggS")
+    duration = 0.0
+    # A partial upload doesn't have the last page yet
+    if len(data) == tail and last >= 0 and last + 14 <= len(data):
+        granule = struct.unpack("<q", data[last + 6:last + 14])[0]
+        if granule > 0 and granule_rate:
+            duration = max(0, granule - pre_skip) / granule_rate
+    return AudioInfo("ogg", duration, rate, channels, codec)
+
+
+# MPEG audio: bitrates (kbit/s) by (version is MPEG-1, layer) and sample rates by version
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# How far past the ID3 tag to look for the first frame
+_MP3_SYNC_SEARCH = 4096
+
+
+def _probe_mp3(f: BinaryIO, file_size: Optional[int]) -> Optional[AudioInfo]:
+    start = 0
+    tag = f.read(10)
+    if tag[:3] == b"ID3" and len(tag) == 10:
+        size = (tag[6] << 21) | (tag[7] << 14) | (tag[8] << 7) | tag[9]
+        start = 10 + size + (10 if tag[5] & 0x10 else 0)
+    f.seek(start)
+    data = f.read(_MP3_SYNC_SEARCH)
+
+    for i in range(len(data) - 3):
+        b1, b2, b3, b4 = data[i:i + 4]
+        if b1 != 0xFF or b2 & 0xE0 != 0xE0:
+            continue
+        version, layer_bits = (b2 >> 3) & 0x03, (b2 >> 1) & 0x03
+        bitrate_index, rate_index = b3 >> 4, (b3 >> 2) & 0x03
+        if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        mpeg1, layer = version == 3, 4 - layer_bits
+        bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        rate = _MP3_SAMPLE_RATES[version][rate_index]
+        channels = 1 if b4 >> 6 == 3 else 2
+        samples_per_frame = 384 if layer == 1 else (1152 if mpeg1 or layer == 2 else 576)
+        frame_start = start + i
+        break
+    else:
+        return None
+
+    # VBR files carry a frame count in a Xing/Info or VBRI header inside the first frame
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    frame = data[i:i + 4 + max(side_info, 32) + 18]
+    xing = frame[4 + side_info:4 + side_info + 12]
+    frames = 0
+    if xing[:4] in (b"Xing", b"Info") and len(xing) == 12 and struct.unpack(">I", xing[4:8])[0] & 0x01:
+        frames = struct.unpack(">I", xing[8:12])[0]
+    elif frame[36:40] == b"VBRI" and len(frame) >= 54:
+        frames = struct.unpack(">I", frame[50:54])[0]
+
+    size_based = False
+    if frames:
+        duration = frames * samples_per_frame / rate
+    elif file_size is not None:
+        # Constant bitrate: the size gives the duration
+        duration = (file_size - frame_start) * 8 / bitrate
+        size_based = True
+    else:
+        duration = 0.0
+    return AudioInfo("mp3", duration, rate, channels, "mp3" if layer == 3 else f"mp{layer}", size_based)
+
+
+def _mp4_boxes(f: BinaryIO, start: int, end: Optional[int]):
+    """(type, payload_start, payload_end) of the boxes between start and end (None = until data runs out)."""
+    position = start
+    while end is None or position + 8 <= end:
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        payload = position + 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack(">Q", large)[0]
+            payload += 8
+        elif size == 0:
+            if end is None:
+                return
+            size = end - position
+        if size < payload - position:
+            return
+        yield box_type, payload, position + size
+        position += size
+
+
+def _mp4_find(f: BinaryIO, start: int, end: int, path: list) -> Optional[tuple]:
+    """Payload range of the first box along path (e.g. [b"trak", b"mdia"]) inside [start, end)."""
+    for box_type, payload, box_end in _mp4_boxes(f, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload, box_end
+            found = _mp4_find(f, payload, box_end, path[1:])
+            if found:
+                return found
+    return None
+
+
+def _probe_mp4(f: BinaryIO, file_size: Optional[int]) -> Optional[AudioInfo]:
+    f.seek(4)
+    if f.read(4) != b"ftyp":
+        return None
+    moov = next(((p, e) for t, p, e in _mp4_boxes(f, 0, file_size) if t == b"moov"), None)
+    if moov is None:
+        return None
+
+    mvhd = _mp4_find(f, moov[0], moov[1], [b"mvhd"])
+    if mvhd is None:
+        return None
+    f.seek(mvhd[0])
+    version = f.read(1)
+    if not version:
+        return None
+    if version[0] == 1:
+        f.seek(mvhd[0] + 20)
+        timescale, length = struct.unpack(">IQ", f.read(12))
+    else:
+        f.seek(mvhd[0] + 12)
+        timescale, length = struct.unpack(">II", f.read(8))
+    duration = length / timescale if timescale else 0.0
+
+    # Sample rate and channels come from the first audio track's sample description
+    rate, channels, codec = 0, 0, "unknown"
+    for box_type, payload, box_end in _mp4_boxes(f, moov[0], moov[1]):
+        if box_type != b"trak":
+            continue
+        hdlr = _mp4_find(f, payload, box_end, [b"mdia", b"hdlr"])
+        if hdlr is None:
+            continue
+        f.seek(hdlr[0] + 8)
+        if f.read(4) != b"soun":
+            continue
+        stsd = _mp4_find(f, payload, box_end, [b"mdia", b"minf", b"stbl", b"stsd"])
+        if stsd is None:
+            break
+        f.seek(stsd[0] + 8)
+        entry = f.read(36)
+        if len(entry) == 36:
+            codec = entry[4:8].decode("latin-1").strip()
+            channels = struct.unpack(">H", entry[24:26])[0]
+            rate = struct.unpack(">I", entry[32:36])[0] >> 16
+        break
+    codec = {"mp4a": "aac"}.get(codec, codec)
+    return AudioInfo("mp4", duration, rate, channels, codec)
+
+
+def _probe(f: BinaryIO, file_size: Optional[int]) -> Optional[AudioInfo]:
+    magic = f.read(12)
+    f.seek(0)
+    if magic[:4] == b"RIFF":
+        return _probe_wav(f, file_size)
+    if magic[:4] == b"fLaC":
+        return _probe_flac(f)
+    if magic[:4] == b"OggS":
+        return _probe_ogg(f, file_size)
+    if magic[4:8] == b"ftyp":
+        return _probe_mp4(f, file_size)
+    if magic[:3] == b"ID3" or (len(magic) >= 2 and magic[0] == 0xFF and magic[1] & 0xE0 == 0xE0):
+        return _probe_mp3(f, file_size)
+    return None
+
+
+def probe_audio(path: PathLike) -> Optional[AudioInfo]:
+    """Identify a file by its magic bytes and read its stream info. Returns None if unrecognized."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        return _probe(f, file_size)
+
+
+def probe_audio_bytes(data: bytes, total_size: Optional[int] = None) -> Optional[AudioInfo]:
+    """
+    Probe the start of an encoded file held in memory. total_size is the size
+    of the whole file when known; without it, durations that depend on the
+    file size (CBR MP3, streamed WAV) or on its end (OGG) come back as 0.0.
+    Returns None if the format isn't recognized or the headers aren't all in data yet.
+    """
+    try:
+        return _probe(io.BytesIO(data), total_size)
+    except struct.error:
+        return None
+
+
+def probe_duration(path: PathLike) -> float:
+    """Duration in seconds, or 0.0 if the file can't be identified."""
+    try:
+        info = probe_audio(path)
+    except (OSError, struct.error):
+        return 0.0
+    return info.duration if info else 0.0
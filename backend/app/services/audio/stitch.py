@@ -0,0 +1,55 @@
+"""
+Audio Stitching
+Joins separately rendered segments of one utterance into a single gapless
+PCM stream, with a fixed pause at every joint.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+# Samples quieter than this (about -54 dBFS) count as silence at segment edges
+SILENCE_THRESHOLD = 64
+
+# Audio kept on either side of the detected speech so soft onsets/decays aren't clipped
+EDGE_PAD_MS = 15
+
+
+def speech_bounds(samples: np.ndarray, rate: int, threshold: int = SILENCE_THRESHOLD) -> Tuple[int, int]:
+    """[start, end) frame range of int16 samples (frames, channels) without leading/trailing near-silence."""
+    loud = np.flatnonzero(np.abs(samples.astype(np.int32)).max(axis=1) > threshold) if len(samples) else []
+    if len(loud) == 0:
+        return 0, 0
+    pad = int(rate * EDGE_PAD_MS / 1000)
+    return max(0, int(loud[0]) - pad), min(len(samples), int(loud[-1]) + 1 + pad)
+
+
+def stitch_segments(segments: List[np.ndarray], rate: int, gap_ms: int) -> np.ndarray:
+    """
+    Concatenate segments in order. Edge silence at every joint is trimmed and
+    replaced by exactly gap_ms of silence, so joints sound the same however the
+    engine padded each piece. The lead-in of the first segment and the tail of
+    the last one are kept as rendered.
+    """
+    if not segments:
+        raise ValueError("Nothing to stitch")
+    channels = segments[0].shape[1]
+    gap = np.zeros((int(rate * gap_ms / 1000), channels), dtype=np.int16)
+    pieces: List[np.ndarray] = []
+    last = len(segments) - 1
+    for index, segment in enumerate(segments):
+        if segment.shape[1] != channels:
+            raise ValueError("Segments have different channel counts")
+        start, end = speech_bounds(segment, rate)
+        if start == end:
+            continue  # nothing audible in this segment
+        if index == 0:
+            start = 0
+        if index == last:
+            end = len(segment)
+        if pieces:
+            pieces.append(gap)
+        pieces.append(segment[start:end])
+    if not pieces:
+        return segments[0][:0]
+    return np.concatenate(pieces)
@@ -0,0 +1,114 @@
+"""
+Voice Activity Detection
+Frame-energy VAD over mono float32 audio, fully vectorized with numpy. Used
+before STT to drop leading/trailing silence, skip silent clips entirely and
+cut long recordings at pauses into chunks that can be transcribed in parallel.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+FRAME_MS = 30
+
+# Frames quieter than this are never speech
+DEFAULT_THRESHOLD_DB = -45.0
+
+# ...nor are frames this far below the loudest frame (adapts to background noise)
+DYNAMIC_RANGE_DB = 35.0
+
+# Voiced runs shorter than this are clicks, not speech
+MIN_SPEECH_MS = 90
+
+# When a chunk must be cut inside speech, look this far back for the quietest frame
+CUT_SEARCH_SECONDS = 5.0
+
+
+def frame_energy_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS level in dBFS of consecutive frames of `frame` samples (the last one zero-padded)."""
+    if len(audio) == 0:
+        return np.zeros(0)
+    padded = np.pad(audio, (0, -len(audio) % frame))
+    frames = padded.reshape(-1, frame).astype(np.float64)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def detect_speech(
+    audio: np.ndarray,
+    rate: int,
+    threshold_db: float = DEFAULT_THRESHOLD_DB,
+    min_pause_ms: int = 300,
+    pad_ms: int = 200,
+) -> List[Tuple[int, int]]:
+    """
+    [start, end) sample ranges that contain speech, in order. Pauses shorter
+    than min_pause_ms stay inside a range; each range is widened by pad_ms so
+    soft onsets and endings aren't clipped. Empty for silent audio.
+    """
+    frame = max(1, rate * FRAME_MS // 1000)
+    db = frame_energy_db(audio, frame)
+    if len(db) == 0:
+        return []
+    voiced = db > max(threshold_db, db.max() - DYNAMIC_RANGE_DB)
+
+    # Runs of voiced frames
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return []
+
+    # Bridge short pauses
+    keep_gap = (starts[1:] - ends[:-1]) * FRAME_MS >= min_pause_ms
+    starts = np.concatenate((starts[:1], starts[1:][keep_gap]))
+    ends = np.concatenate((ends[:-1][keep_gap], ends[-1:]))
+
+    # Drop clicks
+    long_enough = (ends - starts) * FRAME_MS >= MIN_SPEECH_MS
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    pad = rate * pad_ms // 1000
+    regions: List[Tuple[int, int]] = []
+    for start, end in zip(starts * frame - pad, ends * frame + pad):
+        start, end = max(0, int(start)), min(len(audio), int(end))
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def _quietest_cut(audio: np.ndarray, rate: int, start: int, limit: int) -> int:
+    """Sample position in (start, limit] at the quietest frame of the last few seconds before limit."""
+    frame = max(1, rate * FRAME_MS // 1000)
+    window_start = max(start + frame, limit - int(rate * CUT_SEARCH_SECONDS))
+    db = frame_energy_db(audio[window_start:limit], frame)
+    if len(db) < 2:
+        return limit
+    return min(limit, window_start + int(np.argmin(db[:-1])) * frame + frame)
+
+
+def plan_chunks(
+    audio: np.ndarray,
+    regions: List[Tuple[int, int]],
+    rate: int,
+    max_seconds: float,
+) -> List[Tuple[int, int]]:
+    """
+    Group speech regions into chunks of at most max_seconds, cutting at the
+    pauses between regions. A region longer than that on its own is cut at
+    its quietest moments.
+    """
+    max_samples = max(1, int(rate * max_seconds))
+    chunks: List[Tuple[int, int]] = []
+    for start, end in regions:
+        if chunks and end - chunks[-1][0] <= max_samples:
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        while end - start > max_samples:
+            cut = _quietest_cut(audio, rate, start, start + max_samples)
+            chunks.append((start, cut))
+            start = cut
+        chunks.append((start, end))
+    return chunks
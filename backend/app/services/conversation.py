@@ -0,0 +1,181 @@
+"""
+Conversation Sessions
+Server-side history for multi-turn voice chat. Each session keeps its recent
+turns within a token budget plus the provider's own state for the
+conversation (Ollama's context), so a new turn only evaluates the new
+prompt instead of the whole history. Sessions expire after a period of
+inactivity.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.services.llm.base import BaseLLM, LLMMessage, is_error_reply
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token in characters; the API process has no tokenizer
+CHARS_PER_TOKEN = 4
+
+# An over-budget history is cut to this share of the budget, so the cut (which
+# discards the provider's state and costs one full re-evaluation) is rare
+TRIM_TARGET = 0.5
+
+SUMMARY_PROMPT = """
+Summarize the conversation below in a few sentences. Keep names, facts,
+decisions and open questions; drop greetings and filler.
+Return only the summary.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class Conversation:
+    """One session: summary of trimmed turns, recent turns and provider state."""
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.summary = ""
+        self.turns: List[LLMMessage] = []
+        # Trimmed turns waiting to be folded into the summary, and the task doing it
+        self.unsummarized: List[LLMMessage] = []
+        self.summarizing: Optional[asyncio.Task] = None
+        self.state: Any = None
+        self.state_provider: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.turn_count = 0
+        self.lock = asyncio.Lock()
+
+    def history(self) -> List[LLMMessage]:
+        messages = [LLMMessage(role="system", content=self.summary)] if self.summary else []
+        return messages + self.turns
+
+    def tokens(self) -> int:
+        return sum(estimate_tokens(m.content) for m in self.history())
+
+
+class ConversationStore:
+    """
+    Sessions by id, least recently used first. Expired sessions are dropped
+    on access; beyond max_sessions the least recently used one goes.
+    """
+
+    def __init__(self, ttl: float, max_sessions: int, max_history_tokens: int, summarize: bool):
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_history_tokens = max_history_tokens
+        self.summarize = summarize
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._summaries: Set[asyncio.Task] = set()
+        self.expired = 0
+        self.compactions = 0
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            del self._sessions[session.id]
+            self.expired += 1
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Conversation:
+        """The live session with session_id, or a new one (unknown and expired ids start over)."""
+        self._expire()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session = Conversation(uuid.uuid4().hex)
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session.id)
+        return session
+
+    def end(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    async def reply(self, session: Conversation, llm: BaseLLM, text: str) -> str:
+        """Run one turn of the conversation on llm and record it. Turns of one session run in order."""
+        async with session.lock:
+            if session.summarizing is not None:
+                # The last turn's summary lands before this turn reads the history (a failure doesn't raise)
+                await asyncio.wait([session.summarizing])
+            # Provider state only means something to the provider that produced it
+            state = session.state if session.state_provider == llm.provider_name else None
+            reply, state = await llm.converse(text, session.history(), state)
+            if is_error_reply(reply):
+                return reply
+            session.turns.append(LLMMessage(role="user", content=text))
+            session.turns.append(LLMMessage(role="assistant", content=reply))
+            session.state, session.state_provider = state, llm.provider_name
+            session.turn_count += 1
+            session.last_used = time.monotonic()
+            if session.tokens() > self.max_history_tokens:
+                self._trim(session)
+                if self.summarize and session.unsummarized:
+                    # Summarize once the reply is out; the session's next turn waits for it
+                    session.summarizing = asyncio.ensure_future(self._summarize(session, llm))
+                    self._summaries.add(session.summarizing)
+                    session.summarizing.add_done_callback(self._summaries.discard)
+            return reply
+
+    def _trim(self, session: Conversation):
+        """
+        Drop the oldest turns to get back under budget. Synchronous, so a
+        cancelled request can't leave turns dropped but the state kept.
+        """
+        target = self.max_history_tokens * TRIM_TARGET
+        # Keep at least the latest exchange
+        while len(session.turns) > 2 and session.tokens() > target:
+            if self.summarize:
+                session.unsummarized.extend(session.turns[:2])
+            del session.turns[:2]
+        # The provider's state covers the dropped turns; rebuild it from the trimmed history
+        session.state = None
+        self.compactions += 1
+        logger.info(f"Session {session.id}: history compacted to ~{session.tokens()} tokens")
+
+    async def _summarize(self, session: Conversation, llm: BaseLLM):
+        """
+        Fold trimmed turns into the summary. If this fails they stay queued
+        for the next attempt. Runs between turns: the next one waits for it.
+        """
+        dropped = list(session.unsummarized)
+        previous = [LLMMessage(role="system", content=session.summary)] if session.summary else []
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in previous + dropped)
+        summary = await llm.generate(f"{SUMMARY_PROMPT}\n\nCONVERSATION:\n{transcript}")
+        if is_error_reply(summary):
+            return
+        session.summary = summary.strip()
+        del session.unsummarized[:len(dropped)]
+        # The history changed under the provider's state
+        session.state = None
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire()
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "max_history_tokens": self.max_history_tokens,
+            "expired": self.expired,
+            "compactions": self.compactions,
+            "summaries_pending": len(self._summaries),
+        }
+
+
+conversation_store = ConversationStore(
+    ttl=settings.SESSION_TTL_SECONDS,
+    max_sessions=settings.SESSION_MAX_SESSIONS,
+    max_history_tokens=settings.SESSION_MAX_HISTORY_TOKENS,
+    summarize=settings.SESSION_SUMMARIZE,
+)
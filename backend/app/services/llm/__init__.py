@@ -1,6 +1,6 @@
-from app.services.llm.base import BaseLLM
+from app.services.llm.base import BaseLLM, LLMMessage
 from app.services.llm.gemini import GeminiLLM
 from app.services.llm.ollama import OllamaLLM
 from app.services.llm.factory import LLMFactory
 
-__all__ = ["BaseLLM", "GeminiLLM", "OllamaLLM", "LLMFactory"]
+__all__ = ["BaseLLM", "LLMMessage", "GeminiLLM", "OllamaLLM", "LLMFactory"]
@@ -1,12 +1,36 @@
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel
 
 class LLMMessage(BaseModel):
     role: str
     content: str
+
+# Providers report failures as reply text; these mark a reply that isn't one
+ERROR_REPLY_PREFIXES = ("Error using", "Gemini is not configured")
+
+def is_error_reply(text: str) -> bool:
+    return text.startswith(ERROR_REPLY_PREFIXES)
+
+_SPEAKERS = {"system": "Context", "user": "User", "assistant": "Assistant"}
+
+def render_transcript(history: List[LLMMessage], prompt: str) -> str:
+    """Plain-text conversation ending with the new user turn, for providers without chat state."""
+    if not history:
+        return prompt
+    lines = [f"{_SPEAKERS.get(m.role, m.role.title())}: {m.content}" for m in history]
+    lines.append(f"User: {prompt}")
+    lines.append("Assistant:")
+    return "\n".join(lines)
     
 class BaseLLM(ABC):
+    def __init__(self):
+        # Rolling time-to-first-token samples (seconds) from generate_stream
+        self._ttft: Deque[float] = deque(maxlen=500)
+        self.streams = 0
+
     @property
     @abstractmethod
     def provider_name(self) -> str:
@@ -17,8 +41,60 @@ class BaseLLM(ABC):
     async def generate(self, prompt: str, **kwargs) -> str:
         """Generate text from a single prompt."""
         pass
+
+    async def converse(
+        self,
+        prompt: str,
+        history: List[LLMMessage],
+        state: Any = None,
+        **kwargs
+    ) -> Tuple[str, Any]:
+        """
+        Reply to prompt as the next turn after history. state is what the
+        previous turn returned (provider-specific, e.g. Ollama's context) or
+        None to start from history alone. Returns (reply, state for the next turn).
+        """
+        return await self.generate(render_transcript(history, prompt), **kwargs), None
+
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Generate text from a single prompt as it is produced, in chunks of one
+        or more tokens. Joining the chunks gives the full response.
+        """
+        started = time.monotonic()
+        first = True
+        self.streams += 1
+        async for chunk in self._stream(prompt, **kwargs):
+            if not chunk:
+                continue
+            if first:
+                first = False
+                self._ttft.append(time.monotonic() - started)
+            yield chunk
+
+    async def _stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Provider hook for generate_stream. Without native streaming, the whole response is one chunk."""
+        yield await self.generate(prompt, **kwargs)
     
     @abstractmethod
     async def is_available(self) -> bool:
         """Check if the provider is configured and reachable."""
         pass
+
+    async def aclose(self):
+        """Release connections and clients held by the provider (called at shutdown)."""
+        pass
+
+    def stream_stats(self) -> Dict[str, Any]:
+        samples = sorted(self._ttft)
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "streams": self.streams,
+            "ttft_ms_p50": percentile(0.50),
+            "ttft_ms_p95": percentile(0.95),
+        }
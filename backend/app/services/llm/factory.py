@@ -1,9 +1,13 @@
-from typing import Dict, Type
+import logging
+import threading
+from typing import Dict, List, Type
 from app.services.llm.base import BaseLLM
 from app.services.llm.ollama import OllamaLLM
 from app.services.llm.gemini import GeminiLLM
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Whitelist of allowed LLM providers - prevents injection attacks
 ALLOWED_PROVIDERS = frozenset(["ollama", "gemini"])
 
@@ -12,6 +16,13 @@ class LLMFactory:
         "ollama": OllamaLLM,
         "gemini": GeminiLLM
     }
+    # One instance per provider for the life of the process, so clients,
+    # connection pools and SDK setup are shared by every request
+    _instances: Dict[str, BaseLLM] = {}
+    # Instances replaced by register_provider(); requests may still be using them,
+    # so their clients are closed at shutdown rather than on replacement
+    _retired: List[BaseLLM] = []
+    _lock = threading.Lock()
     
     @classmethod
     def get_llm(cls, provider: str = None) -> BaseLLM:
@@ -26,10 +37,29 @@ class LLMFactory:
         provider_class = cls._providers.get(provider)
         if not provider_class:
             raise ValueError(f"Unknown LLM provider: {provider}")
-            
-        return provider_class()
+
+        with cls._lock:
+            if provider not in cls._instances:
+                cls._instances[provider] = provider_class()
+            return cls._instances[provider]
     
     @classmethod
     def register_provider(cls, name: str, provider_class: Type[BaseLLM]):
-        cls._providers[name] = provider_class
+        with cls._lock:
+            cls._providers[name] = provider_class
+            replaced = cls._instances.pop(name, None)
+            if replaced is not None:
+                cls._retired.append(replaced)
+
+    @classmethod
+    async def aclose_all(cls):
+        """Close every provider's clients and forget the instances (server shutdown)."""
+        with cls._lock:
+            instances, cls._instances = list(cls._instances.values()) + cls._retired, {}
+            cls._retired = []
+        for llm in instances:
+            try:
+                await llm.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close LLM provider {llm.provider_name}: {e}")
 
@@ -1,19 +1,36 @@
-from typing import Optional
-import google.generativeai as genai
+import asyncio
+import threading
+from typing import AsyncIterator, Optional
 from app.core.config import settings
 from app.services.llm.base import BaseLLM
+from app.services.scheduler import AdmissionScheduler, SchedulerSaturatedError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a streamed response in the chunk queue
+_DONE = object()
+
 class GeminiLLM(BaseLLM):
     def __init__(self):
+        super().__init__()
         self._model_instance = None
+        # The google-generativeai client is synchronous: every call runs on this
+        # bounded pool so a slow upstream never blocks the event loop, and excess
+        # calls queue briefly or are shed (429/503) instead of piling up
+        self.scheduler = AdmissionScheduler(
+            name="gemini",
+            max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+            max_queue_depth=settings.GEMINI_QUEUE_MAX_DEPTH,
+            max_wait=settings.GEMINI_QUEUE_MAX_WAIT,
+        )
         self._setup()
 
     def _setup(self):
         if settings.GEMINI_API_KEY:
             try:
+                # Imported here: the SDK is slow to import and only needed when Gemini is configured
+                import google.generativeai as genai
                 genai.configure(api_key=settings.GEMINI_API_KEY)
                 self._model_instance = genai.GenerativeModel(settings.GEMINI_DEFAULT_MODEL)
             except Exception as e:
@@ -28,16 +45,79 @@ class GeminiLLM(BaseLLM):
         # A real connectivity check would ideally try a lightweight call, but for now we check config.
         return bool(settings.GEMINI_API_KEY and self._model_instance)
 
+    @staticmethod
+    def _deadline(kwargs) -> float:
+        return float(kwargs.get("timeout") or settings.GEMINI_REQUEST_TIMEOUT)
+
     async def generate(self, prompt: str, **kwargs) -> str:
+        """timeout (default GEMINI_REQUEST_TIMEOUT) bounds queueing plus the upstream call."""
         if not await self.is_available():
             return "Gemini is not configured. Please check API Key."
-        
+
+        deadline = self._deadline(kwargs)
         try:
-            # Note: The google-generativeai client is synchronous. 
-            # In high-throughput async apps, run this in an executor. 
-            # For this simplified implementation, direct call is acceptable.
-            response = self._model_instance.generate_content(prompt)
+            # The SDK's own timeout ends the worker thread's call too, not just our wait
+            response = await asyncio.wait_for(
+                self.scheduler.run(
+                    "gemini", self._model_instance.generate_content, prompt, request_options={"timeout": deadline}
+                ),
+                timeout=deadline,
+            )
             return response.text
+        except SchedulerSaturatedError:
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini generation timed out after {deadline:.0f}s")
+            return f"Error using Gemini: no response within {deadline:.0f}s"
         except Exception as e:
             logger.error(f"Gemini generation error: {e}")
             return f"Error using Gemini: {str(e)}"
+
+    async def _stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Streamed on the same bounded pool; timeout bounds the wait for each chunk."""
+        if not await self.is_available():
+            yield "Gemini is not configured. Please check API Key."
+            return
+
+        deadline = self._deadline(kwargs)
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            response = self._model_instance.generate_content(
+                prompt, stream=True, request_options={"timeout": deadline}
+            )
+            for chunk in response:
+                if stop.is_set():
+                    # The consumer went away: stop reading and free the worker
+                    break
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+
+        job = asyncio.ensure_future(self.scheduler.run("gemini", produce))
+        job.add_done_callback(lambda _: chunks.put_nowait(_DONE))
+        sent = False
+        try:
+            while True:
+                chunk = await asyncio.wait_for(chunks.get(), timeout=deadline)
+                if chunk is _DONE:
+                    job.result()  # re-raise anything the worker hit
+                    break
+                sent = sent or bool(chunk)
+                yield chunk
+        except SchedulerSaturatedError:
+            raise
+        except Exception as e:
+            error = f"no response within {deadline:.0f}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            logger.error(f"Gemini streaming error: {error}")
+            if sent:
+                # Error text appended to a partial reply would read as part of it
+                raise RuntimeError(f"Gemini stream failed after partial output: {error}") from e
+            yield f"Error using Gemini: {error}"
+        finally:
+            stop.set()
+            if not job.done():
+                job.cancel()
+
+    async def aclose(self):
+        self.scheduler.shutdown()
@@ -1,25 +1,56 @@
+import asyncio
+import json
 import httpx
-from typing import Optional, Dict, Any
+from typing import Any, AsyncIterator, List, Dict, Tuple
 from app.core.config import settings
-from app.services.llm.base import BaseLLM
+from app.services.llm.base import BaseLLM, LLMMessage, render_transcript
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Availability probes shouldn't hold a request up for the full generation timeout
+AVAILABILITY_TIMEOUT = 5.0
+
 class OllamaLLM(BaseLLM):
     def __init__(self):
+        super().__init__()
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_DEFAULT_MODEL
+        # One keep-alive client per event loop; connections can't move between loops
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
 
     @property
     def provider_name(self) -> str:
         return "ollama"
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Shared keep-alive client for the running event loop, created on first
+        use. Connections belong to the loop that opened them, so each loop
+        gets its own client, and aclose() closes them all.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # A loop that has ended took its connections with it; its client can't be closed any more
+            for stale in [l for l in list(self._clients) if l.is_closed()]:
+                self._clients.pop(stale, None)
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return client
+
     async def is_available(self) -> bool:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            response = await self.client.get("/api/tags", timeout=AVAILABILITY_TIMEOUT)
+            return response.status_code == 200
         except Exception:
             return False
 
@@ -33,11 +64,83 @@ class OllamaLLM(BaseLLM):
         }
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(f"{self.base_url}/api/generate", json=payload)
-                response.raise_for_status()
-                data = response.json()
-                return data.get("response", "")
+            response = await self.client.post("/api/generate", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            return data.get("response", "")
         except Exception as e:
             logger.error(f"Ollama generation error: {e}")
             return f"Error using Ollama: {str(e)}"
+
+    async def converse(
+        self,
+        prompt: str,
+        history: List[LLMMessage],
+        state: Any = None,
+        **kwargs
+    ) -> Tuple[str, Any]:
+        """
+        state is the "context" Ollama returned for the previous turn: the
+        conversation's tokens so far. Sending it back means only the new
+        prompt is evaluated; without it the history is sent as text.
+        """
+        payload = {
+            "model": kwargs.get("model", self.model),
+            "prompt": prompt if state else render_transcript(history, prompt),
+            "stream": False
+        }
+        if state:
+            payload["context"] = state
+
+        try:
+            response = await self.client.post("/api/generate", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            logger.debug(
+                f"Ollama turn: {data.get('prompt_eval_count', 0)} prompt tokens evaluated, "
+                f"{len(data.get('context') or [])} in context"
+            )
+            return data.get("response", ""), data.get("context") or None
+        except Exception as e:
+            logger.error(f"Ollama generation error: {e}")
+            return f"Error using Ollama: {str(e)}", None
+
+    async def _stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        # Ollama streams newline-delimited JSON objects, each carrying the next piece of "response"
+        payload = {
+            "model": kwargs.get("model", self.model),
+            "prompt": prompt,
+            "stream": True
+        }
+
+        sent = False
+        try:
+            async with self.client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    if chunk.get("response"):
+                        sent = True
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama streaming error: {e}")
+            if sent:
+                # Error text appended to a partial reply would read as part of it
+                raise RuntimeError(f"Ollama stream failed after partial output: {e}") from e
+            yield f"Error using Ollama: {str(e)}"
+
+    async def aclose(self):
+        """Close this loop's client here and hand the others to their own (still running) loops."""
+        current = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            if loop is current:
+                await client.aclose()
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
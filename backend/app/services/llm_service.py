@@ -1,3 +1,4 @@
+from typing import AsyncIterator
 from app.services.llm import LLMFactory
 from app.services.llm.base import BaseLLM
 
@@ -15,4 +16,10 @@ class LLMServiceWrapper:
         llm = self.get_provider(provider)
         return await llm.generate(text, **kwargs)
 
+    async def stream_response(self, text: str, provider: str = None, **kwargs) -> AsyncIterator[str]:
+        """Like generate_response, but yields the reply in chunks as the model produces it."""
+        llm = self.get_provider(provider)
+        async for chunk in llm.generate_stream(text, **kwargs):
+            yield chunk
+
 llm_service = LLMServiceWrapper()
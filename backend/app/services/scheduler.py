@@ -0,0 +1,235 @@
+"""
+Admission Scheduler
+Runs blocking work on a bounded thread pool with global and per-key
+concurrency limits, a bounded wait queue and load shedding.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SchedulerSaturatedError(RuntimeError):
+    """
+    Raised instead of queueing when the scheduler cannot take more work.
+    status_code is 429 when the queue is full and 503 when the wait deadline passed.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("key", "key_limit", "future", "loop", "enqueued_at", "granted")
+
+    def __init__(self, key: str, key_limit: Optional[int], future: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.key_limit = key_limit
+        self.future = future
+        self.loop = loop
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionScheduler:
+    """
+    Admits at most `max_concurrency` jobs overall and `per_key_concurrency`
+    per key (e.g. per voice). Excess callers wait in a FIFO of at most
+    `max_queue_depth` entries for up to `max_wait` seconds; beyond that they
+    are rejected with SchedulerSaturatedError so load sheds instead of piling up.
+
+    Bookkeeping uses a thread lock rather than asyncio primitives so one
+    instance can serve callers from any event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        per_key_concurrency: Optional[int] = None,
+        max_queue_depth: int = 32,
+        max_wait: float = 30.0,
+    ):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_key_concurrency = per_key_concurrency or self.max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_wait = max_wait
+        self._executor = self._new_executor()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_key: Dict[str, int] = {}
+        self._waiters: Deque[_Waiter] = deque()
+        # Rolling samples for stats and Retry-After estimates
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._run_times: Deque[float] = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.max_queue_depth_seen = 0
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=self.name)
+
+    def _has_capacity(self, key: str, key_limit: Optional[int] = None) -> bool:
+        return (
+            self._active < self.max_concurrency
+            and self._active_by_key.get(key, 0) < (key_limit or self.per_key_concurrency)
+        )
+
+    def _take_slot(self, key: str):
+        self._active += 1
+        self._active_by_key[key] = self._active_by_key.get(key, 0) + 1
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a queued request would start. Caller holds the lock."""
+        avg_run = sum(self._run_times) / len(self._run_times) if self._run_times else 1.0
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(avg_run * backlog / self.max_concurrency))
+
+    async def _admit(self, key: str, key_limit: Optional[int] = None):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_capacity(key, key_limit):
+                self._take_slot(key)
+                self._wait_times.append(0.0)
+                return
+            if len(self._waiters) >= self.max_queue_depth:
+                self.rejected_queue_full += 1
+                logger.warning(f"{self.name}: rejecting request for '{key}', queue full")
+                raise SchedulerSaturatedError(
+                    f"{self.name} queue is full ({self.max_queue_depth} waiting)",
+                    status_code=429,
+                    retry_after=self._retry_after(),
+                )
+            waiter = _Waiter(key, key_limit, loop.create_future(), loop)
+            self._waiters.append(waiter)
+            self.max_queue_depth_seen = max(self.max_queue_depth_seen, len(self._waiters))
+
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked(key)
+                else:
+                    self._waiters.remove(waiter)
+            raise
+
+        with self._lock:
+            # The slot may have been handed over right as the deadline passed
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                self.rejected_timeout += 1
+                logger.warning(f"{self.name}: request for '{key}' timed out in queue after {self.max_wait}s")
+                raise SchedulerSaturatedError(
+                    f"{self.name} is busy; request waited {self.max_wait:.0f}s without starting",
+                    status_code=503,
+                    retry_after=self._retry_after(),
+                )
+            self._wait_times.append(time.monotonic() - waiter.enqueued_at)
+
+    def _release_locked(self, key: str):
+        self._active -= 1
+        self._active_by_key[key] -= 1
+        if not self._active_by_key[key]:
+            del self._active_by_key[key]
+        # Hand freed capacity to the oldest waiter that can use it
+        for waiter in list(self._waiters):
+            if not self._has_capacity(waiter.key, waiter.key_limit):
+                continue
+            self._waiters.remove(waiter)
+            self._take_slot(waiter.key)
+            waiter.granted = True
+            waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            if self._active >= self.max_concurrency:
+                break
+
+    def _execute(self, key: str, func: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        started = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Released from the worker thread so a cancelled caller can't free a slot that is still busy
+            with self._lock:
+                self._run_times.append(time.monotonic() - started)
+                self.completed += 1
+                self._release_locked(key)
+
+    async def run(self, key: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking callable off the event loop once admitted for `key`."""
+        return await self.run_with_limit(key, None, func, *args, **kwargs)
+
+    async def run_with_limit(
+        self, key: str, key_limit: Optional[int], func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        """
+        Like run(), but admitted while fewer than `key_limit` jobs run for `key`
+        instead of per_key_concurrency: wider for the segments of one long text,
+        or narrower for a key backed by fewer workers. The global limit and the
+        queue still apply.
+        """
+        await self._admit(key, key_limit)
+        try:
+            future = self._executor.submit(self._execute, key, func, args, kwargs)
+        except BaseException:
+            self._release(key)  # executor shut down
+            raise
+        # A job cancelled before a worker picked it up (caller gone, or shutdown) never
+        # reaches _execute, so its slot is released here instead
+        future.add_done_callback(lambda done: done.cancelled() and self._release(key))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, key: str):
+        with self._lock:
+            self._release_locked(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._wait_times)
+
+            def percentile(p: float) -> float:
+                if not waits:
+                    return 0.0
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4)
+
+            return {
+                "active": self._active,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth_seen": self.max_queue_depth_seen,
+                "max_concurrency": self.max_concurrency,
+                "per_key_concurrency": self.per_key_concurrency,
+                "max_queue_depth": self.max_queue_depth,
+                "max_wait": self.max_wait,
+                "completed": self.completed,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout,
+                "wait_p50": percentile(0.50),
+                "wait_p95": percentile(0.95),
+            }
+
+    def shutdown(self):
+        """
+        Cancel queued jobs and let the worker threads exit. The scheduler stays
+        usable: a fresh pool takes later jobs (its threads start on demand), so
+        a restarted app can keep the same instance.
+        """
+        executor = self._executor
+        self._executor = self._new_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,17 @@
+from app.services.stt.base import BaseSTTEngine, BatchingSTTEngine
+from app.services.stt.faster_whisper import FasterWhisperEngine
+from app.services.stt.mock import MockSTTEngine
+from app.services.stt.openai_whisper import WhisperEngine
+from app.services.stt.factory import STTEngineFactory
+from app.services.stt.pool import STTWorkerPool, default_worker_count
+
+__all__ = [
+    "BaseSTTEngine",
+    "BatchingSTTEngine",
+    "FasterWhisperEngine",
+    "MockSTTEngine",
+    "WhisperEngine",
+    "STTEngineFactory",
+    "STTWorkerPool",
+    "default_worker_count",
+]
@@ -0,0 +1,160 @@
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Seconds per Whisper timestamp token
+TIME_PRECISION = 0.02
+
+# transcribe()'s thresholds for distrusting a window decoded at temperature 0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def compression_ratio(text: str) -> float:
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+def timestamp_segments(
+    tokens: List[int], timestamp_begin: int, decode: Callable[[List[int]], str], duration: float
+) -> List[Dict[str, Any]]:
+    """
+    Split one window's tokens into segments at its timestamp tokens, the way
+    transcribe() does: text between an opening and a closing timestamp is a
+    segment; text left without a closing timestamp runs to the end of the clip.
+    """
+    segments = []
+    start = None
+    text_tokens: List[int] = []
+
+    def close(end: float):
+        begin = start if start is not None else (segments[-1]["end"] if segments else 0.0)
+        segments.append({"start": begin, "end": end, "text": decode(text_tokens), "tokens": list(text_tokens)})
+
+    for token in tokens:
+        if token < timestamp_begin:
+            text_tokens.append(token)
+            continue
+        time = round((token - timestamp_begin) * TIME_PRECISION, 2)
+        if text_tokens:
+            close(time)
+            text_tokens = []
+            start = None
+        else:
+            start = time
+    if text_tokens:
+        close(round(duration, 2))
+    return segments
+
+
+@dataclass
+class DecodedWindow:
+    """One clip's result from a batched pass: temperature 0, timestamps on."""
+
+    segments: List[Dict[str, Any]]  # start, end, text, tokens
+    language: str
+    avg_logprob: float
+    no_speech_prob: float
+
+    @property
+    def text(self) -> str:
+        return "".join(segment["text"] for segment in self.segments)
+
+    def is_silent(self) -> bool:
+        return self.no_speech_prob > NO_SPEECH_THRESHOLD and self.avg_logprob < LOGPROB_THRESHOLD
+
+    def needs_fallback(self) -> bool:
+        """transcribe() would have retried this window at a higher temperature."""
+        return compression_ratio(self.text) > COMPRESSION_RATIO_THRESHOLD or self.avg_logprob < LOGPROB_THRESHOLD
+
+
+class BaseSTTEngine(ABC):
+    """
+    A speech-to-text engine. Engines run inside STT worker processes: load()
+    is called once when the process starts, then transcribe() per request.
+    Audio is mono float32 at 16 kHz. Results are dicts with "text",
+    "language" and "segments" (each with "start", "end", "text").
+    """
+
+    # Engine can decode several clips in one forward pass (set by BatchingSTTEngine)
+    supports_batching: bool = False
+
+    # Longest clip (seconds) a batched pass accepts
+    batch_max_seconds: float = 0.0
+
+    # Runs in the API process instead of worker processes (cheap engines only)
+    in_process: bool = False
+
+    # Resident memory relative to an fp32 Whisper model of the same size
+    memory_scale: float = 1.0
+
+    @property
+    @abstractmethod
+    def backend_name(self) -> str:
+        """Return the name of the backend."""
+        pass
+
+    @classmethod
+    def is_installed(cls) -> bool:
+        """Check if the engine's packages are importable."""
+        return True
+
+    @abstractmethod
+    def load(self, model_size: str, threads: int):
+        """Load the model, using at most `threads` CPU threads for inference."""
+        pass
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        """Transcribe one clip."""
+        pass
+
+    def transcribe_batch(self, clips: List[np.ndarray], **options) -> List[Dict[str, Any]]:
+        """Transcribe several clips; this engine runs them one by one (see BatchingSTTEngine)."""
+        return [self.transcribe(clip, **options) for clip in clips]
+
+
+class BatchingSTTEngine(BaseSTTEngine):
+    """
+    An engine that can decode several clips in one forward pass. The STT
+    micro-batcher only groups requests for engines of this kind.
+    """
+
+    supports_batching = True
+
+    @abstractmethod
+    def decode_windows(self, clips: List[np.ndarray], **options) -> List[DecodedWindow]:
+        """Decode clips of up to batch_max_seconds in one forward pass."""
+        pass
+
+    def transcribe_batch(self, clips: List[np.ndarray], **options) -> List[Dict[str, Any]]:
+        """
+        Decode every clip in one pass and return the same result shape as
+        transcribe(): windows transcribe() would have skipped as silence come
+        back empty, and windows it would have retried at a higher temperature
+        are re-run through transcribe().
+        """
+        results = []
+        for clip, window in zip(clips, self.decode_windows(clips, **options)):
+            if window.is_silent():
+                results.append({"text": "", "language": window.language, "segments": []})
+            elif window.needs_fallback():
+                results.append(self.transcribe(clip, **options))
+            else:
+                results.append(self.window_result(window))
+        return results
+
+    def window_result(self, window: DecodedWindow) -> Dict[str, Any]:
+        """A trusted window as a transcribe() result."""
+        return {
+            "text": window.text,
+            "language": window.language,
+            "segments": [
+                {"id": i, "start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                for i, segment in enumerate(window.segments)
+            ],
+        }
@@ -0,0 +1,104 @@
+"""
+STT Micro-Batching
+Collects requests that arrive within a short window and hands them to the
+model as one batch, so concurrent short utterances share a single encoder
+pass instead of queueing for one pass each.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+# (item, future, enqueued_at)
+_Entry = Tuple[Any, asyncio.Future, float]
+
+
+class MicroBatcher:
+    """
+    Groups submit() calls into batches for `run_batch`, which takes a list of
+    items and returns a list of results in the same order. A batch is sent
+    `window` seconds after its first item arrives, or as soon as it holds
+    `max_size` items. If run_batch raises, every caller in the batch gets the
+    exception.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], Awaitable[List[Any]]], window: float, max_size: int):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._pending: List[_Entry] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        # Rolling samples for stats
+        self._sizes: Deque[int] = deque(maxlen=1000)
+        self._added_latency: Deque[float] = deque(maxlen=1000)
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.monotonic()))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # Callers that gave up while waiting for the window don't take a batch slot
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[_Entry]):
+        started = time.monotonic()
+        self.batches += 1
+        self.items += len(batch)
+        self._sizes.append(len(batch))
+        for _, _, enqueued_at in batch:
+            self._added_latency.append(started - enqueued_at)
+        try:
+            results = await self.run_batch([item for item, _, _ in batch])
+        except BaseException as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = list(self._sizes)
+        latency = sorted(self._added_latency)
+
+        def percentile(p: float) -> float:
+            if not latency:
+                return 0.0
+            return round(latency[min(len(latency) - 1, int(p * len(latency)))] * 1000, 2)
+
+        histogram: Dict[int, int] = {}
+        for size in sizes:
+            histogram[size] = histogram.get(size, 0) + 1
+        return {
+            "window_ms": round(self.window * 1000, 1),
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "items": self.items,
+            "pending": len(self._pending),
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "batch_sizes": dict(sorted(histogram.items())),
+            "added_latency_ms_p50": percentile(0.50),
+            "added_latency_ms_p95": percentile(0.95),
+        }
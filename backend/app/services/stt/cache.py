@@ -0,0 +1,195 @@
+"""
+Transcription Cache
+Results keyed by a hash of the decoded audio and everything that affects the
+transcript (backend, model, language hint, options). Byte-identical retries
+and replays cost a hash instead of a model run. An in-memory LRU sits in
+front of an optional on-disk tier of JSON files bounded by a byte budget.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the key layout or stored result format changes so old entries stop matching
+CACHE_KEY_VERSION = "1"
+
+CACHE_FILE_PATTERN = re.compile(r"^([0-9a-f]{64})\.json$")
+
+
+class TranscriptCache:
+    """
+    LRU of transcription results: up to max_entries in memory and, when
+    cache_dir is set, up to disk_max_bytes of `<sha256>.json` files there.
+    Disk recency is mirrored to file mtimes so the LRU order survives a
+    restart. get() returns copies, so callers may modify what they get.
+    """
+
+    def __init__(self, max_entries: int, cache_dir: Optional[Path] = None, disk_max_bytes: int = 0):
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0  # audio seconds answered without a model run
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_existing()
+
+    @staticmethod
+    def make_key(audio: np.ndarray, backend: str, model_size: str, language: Optional[str] = None, **options) -> str:
+        """Hash of the samples plus the settings that change the transcript."""
+        digest = hashlib.sha256()
+        material = "\x1f".join([
+            CACHE_KEY_VERSION,
+            backend,
+            model_size,
+            language or "",
+            json.dumps(options, sort_keys=True, default=str),
+            str(audio.dtype),
+        ])
+        digest.update(material.encode("utf-8"))
+        digest.update(np.ascontiguousarray(audio).data)
+        return digest.hexdigest()
+
+    def _load_existing(self):
+        """Index entries left over from a previous run, oldest first."""
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            match = CACHE_FILE_PATTERN.match(entry.name)
+            if entry.is_file() and match:
+                stat = entry.stat()
+                found.append((stat.st_mtime, match.group(1), stat.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+        logger.info(f"Transcription cache loaded: {len(self._disk)} entries on disk, {self._disk_bytes} bytes")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str, duration: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for key, or None on a miss. duration feeds seconds_saved."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.seconds_saved += duration
+                return copy.deepcopy(result)
+            on_disk = key in self._disk
+        if on_disk:
+            result = self._read(key)
+            if result is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self.seconds_saved += duration
+                    self._remember(key, result)
+                return copy.deepcopy(result)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            # Removed or corrupted behind our back; forget it
+            logger.warning(f"Dropping unreadable transcription cache entry {key}: {e}")
+            with self._lock:
+                if key in self._disk:
+                    self._disk_bytes -= self._disk.pop(key)
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result in memory and, if enabled, atomically on disk."""
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, result)
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+            size = path.stat().st_size
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write transcription cache entry {key}: {e}")
+            if temp_path.exists():
+                os.remove(temp_path)
+            return
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+            self._disk[key] = size
+            self._disk_bytes += size
+            self._evict_disk(keep=key)
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        """Insert into the memory tier, dropping the least recently used. Caller holds the lock."""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self, keep: Optional[str] = None):
+        """Drop least recently used files until under budget. Caller holds the lock."""
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key, size = next(iter(self._disk.items()))
+            if key == keep:
+                break
+            del self._disk[key]
+            self._disk_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict transcription cache entry {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes if self.cache_dir is not None else 0,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 2),
+            }
@@ -0,0 +1,50 @@
+from typing import Dict, Type
+
+from app.core.config import settings
+from app.services.stt.base import BaseSTTEngine
+from app.services.stt.faster_whisper import FasterWhisperEngine
+from app.services.stt.mock import MockSTTEngine
+from app.services.stt.openai_whisper import WhisperEngine
+
+# "auto" picks the first installed backend, fastest first
+AUTO_ORDER = ["faster-whisper", "whisper", "mock"]
+
+
+class STTEngineFactory:
+    # Registered backends double as the whitelist - prevents injection attacks
+    _engines: Dict[str, Type[BaseSTTEngine]] = {
+        "faster-whisper": FasterWhisperEngine,
+        "whisper": WhisperEngine,
+        "mock": MockSTTEngine,
+    }
+
+    @classmethod
+    def get_engine_class(cls, backend: str) -> Type[BaseSTTEngine]:
+        # Sanitize and validate backend
+        backend = backend.lower().strip()
+        engine_class = cls._engines.get(backend)
+        if not engine_class:
+            raise ValueError(f"Invalid STT backend: '{backend}'. Allowed: {sorted(cls._engines)}")
+        if not engine_class.is_installed():
+            raise ValueError(f"STT backend '{backend}' is not installed")
+        return engine_class
+
+    @classmethod
+    def create(cls, backend: str) -> BaseSTTEngine:
+        return cls.get_engine_class(backend)()
+
+    @classmethod
+    def default_backend(cls) -> str:
+        backend = settings.STT_BACKEND.lower().strip()
+        if backend != "auto":
+            return backend
+        return next(name for name in AUTO_ORDER if cls._engines[name].is_installed())
+
+    @classmethod
+    def installed_backends(cls) -> list:
+        return [name for name, engine_class in cls._engines.items() if engine_class.is_installed()]
+
+    @classmethod
+    def register_engine(cls, name: str, engine_class: Type[BaseSTTEngine]):
+        """Add (or replace) a backend; it becomes selectable by name right away."""
+        cls._engines[name.lower().strip()] = engine_class
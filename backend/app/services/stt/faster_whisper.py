@@ -0,0 +1,106 @@
+import importlib.util
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.stt.base import BatchingSTTEngine, DecodedWindow, timestamp_segments
+
+# Model sample rate and the most tokens a 30 s window decodes to
+SAMPLE_RATE = 16000
+MAX_WINDOW_TOKENS = 448
+
+
+class FasterWhisperEngine(BatchingSTTEngine):
+    """
+    Whisper on CTranslate2 (faster-whisper) with int8 weights by default:
+    several times faster than openai-whisper on CPU at a fraction of the
+    memory, with near-identical accuracy.
+    """
+
+    memory_scale = 0.4
+    batch_max_seconds = 30.0  # Whisper's input window
+
+    def __init__(self):
+        self.model = None
+
+    @property
+    def backend_name(self) -> str:
+        return "faster-whisper"
+
+    @classmethod
+    def is_installed(cls) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    def load(self, model_size: str, threads: int):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=settings.STT_COMPUTE_TYPE,
+            cpu_threads=threads,
+            num_workers=1,
+        )
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        options.setdefault("beam_size", settings.STT_BEAM_SIZE)
+        segments, info = self.model.transcribe(audio, **options)
+        # segments is lazy; decoding happens while it is consumed
+        segments = [
+            {"id": segment.id, "start": segment.start, "end": segment.end, "text": segment.text}
+            for segment in segments
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "language": info.language or "unknown",
+            "segments": segments,
+        }
+
+    def decode_windows(self, clips: List[np.ndarray], **options) -> List[DecodedWindow]:
+        """
+        Encode and decode clips of up to 30 s as one CTranslate2 batch, the
+        way faster-whisper's batched pipeline does for the pieces of one file.
+        """
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        features = np.stack([pad_or_trim(self.model.feature_extractor(clip)) for clip in clips])
+        encoder_output = self.model.encode(features)
+        if options.get("language"):
+            languages = [options["language"]] * len(clips)
+        else:
+            # Best guess per clip, as tokens like "<|en|>"
+            languages = [scores[0][0][2:-2] for scores in self.model.model.detect_language(encoder_output)]
+
+        tokenizers = {
+            language: Tokenizer(
+                self.model.hf_tokenizer, self.model.model.is_multilingual, task="transcribe", language=language
+            )
+            for language in set(languages)
+        }
+        prompts = [self.model.get_prompt(tokenizers[language], [], without_timestamps=False) for language in languages]
+        results = self.model.model.generate(
+            encoder_output,
+            prompts,
+            beam_size=options.get("beam_size", settings.STT_BEAM_SIZE),
+            max_length=MAX_WINDOW_TOKENS,
+            return_scores=True,
+            return_no_speech_prob=True,
+            suppress_blank=True,
+            suppress_tokens=[-1],
+        )
+
+        windows = []
+        for clip, language, result in zip(clips, languages, results):
+            tokens = result.sequences_ids[0]
+            tokenizer = tokenizers[language]
+            # Same length normalisation as faster-whisper's own fallback check
+            avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+            windows.append(DecodedWindow(
+                segments=timestamp_segments(tokens, tokenizer.timestamp_begin, tokenizer.decode, len(clip) / SAMPLE_RATE),
+                language=language,
+                avg_logprob=avg_logprob,
+                no_speech_prob=result.no_speech_prob,
+            ))
+        return windows
@@ -0,0 +1,30 @@
+import logging
+from typing import Any, Dict
+
+import numpy as np
+
+from app.services.stt.base import BaseSTTEngine
+
+logger = logging.getLogger(__name__)
+
+
+class MockSTTEngine(BaseSTTEngine):
+    """Canned transcription for tests and for running without any STT engine installed."""
+
+    in_process = True
+
+    @property
+    def backend_name(self) -> str:
+        return "mock"
+
+    def load(self, model_size: str, threads: int):
+        pass
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        logger.warning("No STT engine in use, returning mock transcription.")
+        return {
+            "text": "This is a mock transcription because Whisper is not installed.",
+            "language": "en",
+            "confidence": 0.99,
+            "segments": [],
+        }
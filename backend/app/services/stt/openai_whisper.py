@@ -0,0 +1,86 @@
+import importlib.util
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.stt.base import BatchingSTTEngine, DecodedWindow, compression_ratio, timestamp_segments
+
+
+class WhisperEngine(BatchingSTTEngine):
+    """The reference openai-whisper implementation (PyTorch, fp32 on CPU)."""
+
+    batch_max_seconds = 30.0  # Whisper's input window
+
+    def __init__(self):
+        self.model = None
+
+    @property
+    def backend_name(self) -> str:
+        return "whisper"
+
+    @classmethod
+    def is_installed(cls) -> bool:
+        return importlib.util.find_spec("whisper") is not None
+
+    def load(self, model_size: str, threads: int):
+        import torch
+        import whisper
+
+        # Workers share the cores; don't let each one's intra-op pool claim all of them
+        torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_size)
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        # fp16=False is safer for CPU inference to avoid warnings
+        options.setdefault("fp16", False)
+        result = self.model.transcribe(audio, **options)
+        return {
+            "text": result.get("text", ""),
+            "language": result.get("language", "unknown"),
+            "segments": result.get("segments", []),
+        }
+
+    def decode_windows(self, clips: List[np.ndarray], **options) -> List[DecodedWindow]:
+        """
+        Decode clips of up to 30 s in one batched forward pass. Each clip is
+        padded to Whisper's 30 s window, so the batch costs about as much as a
+        single clip.
+        """
+        import torch
+        import whisper
+        from whisper.tokenizer import get_tokenizer
+
+        options.setdefault("fp16", False)
+        n_mels = getattr(self.model.dims, "n_mels", 80)
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(clip)), n_mels) for clip in clips
+        ]).to(self.model.device)
+        decoding = whisper.DecodingOptions(temperature=0.0, without_timestamps=False, **options)
+        decoded = whisper.decode(self.model, mels, decoding)
+        extra = {"num_languages": self.model.num_languages} if hasattr(self.model, "num_languages") else {}
+        tokenizer = get_tokenizer(self.model.is_multilingual, **extra)
+        return [
+            DecodedWindow(
+                segments=timestamp_segments(
+                    list(result.tokens), tokenizer.timestamp_begin, tokenizer.decode, len(clip) / whisper.audio.SAMPLE_RATE
+                ),
+                language=result.language or "unknown",
+                avg_logprob=result.avg_logprob,
+                no_speech_prob=result.no_speech_prob,
+            )
+            for clip, result in zip(clips, decoded)
+        ]
+
+    def window_result(self, window: DecodedWindow) -> Dict[str, Any]:
+        # Same segment fields as whisper's own transcribe()
+        result = super().window_result(window)
+        for segment, decoded in zip(result["segments"], window.segments):
+            segment.update({
+                "seek": 0,
+                "tokens": decoded["tokens"],
+                "temperature": 0.0,
+                "avg_logprob": window.avg_logprob,
+                "compression_ratio": compression_ratio(window.text),
+                "no_speech_prob": window.no_speech_prob,
+            })
+        return result
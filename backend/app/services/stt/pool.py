@@ -0,0 +1,209 @@
+"""
+STT Worker Pool
+Runs an STT engine in dedicated worker processes. Each process loads the model once
+when it starts, so requests never pay the load cost, and inference never runs
+on (or holds the GIL of) the API process.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Approximate resident memory of one worker process per Whisper model size
+MODEL_MEMORY_BYTES = {
+    "tiny": 400 * 1024 * 1024,
+    "base": 600 * 1024 * 1024,
+    "small": 1200 * 1024 * 1024,
+    "medium": 3 * 1024 * 1024 * 1024,
+    "large": 6 * 1024 * 1024 * 1024,
+}
+DEFAULT_MODEL_MEMORY_BYTES = 1024 * 1024 * 1024
+
+
+def available_memory() -> Optional[int]:
+    """Bytes of memory available for new processes, or None if unknown."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_worker_count(model_size: str, memory_scale: float = 1.0, memory_fraction: float = 0.5) -> int:
+    """
+    One worker per core, capped so the models fit in memory_fraction of
+    available RAM. memory_scale adjusts for the engine (int8 weights are smaller).
+    """
+    cores = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is None:
+        return cores
+    family = model_size.split(".")[0].split("-")[0]
+    per_worker = int(MODEL_MEMORY_BYTES.get(family, DEFAULT_MODEL_MEMORY_BYTES) * memory_scale)
+    return max(1, min(cores, int(memory * memory_fraction) // max(1, per_worker)))
+
+
+# Longest warm() waits for every worker to start and load its model
+WARM_TIMEOUT = 600.0
+
+
+# --- worker process side ---------------------------------------------------
+
+_engine = None
+
+
+def _init_worker(backend: str, model_size: str, threads: int):
+    global _engine
+    from app.services.stt.factory import STTEngineFactory
+
+    _engine = STTEngineFactory.create(backend)
+    _engine.load(model_size, threads)
+
+
+def _transcribe(audio: np.ndarray, options: Dict[str, Any]) -> Dict[str, Any]:
+    return _engine.transcribe(audio, **options)
+
+
+def _transcribe_batch(clips: List[np.ndarray], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _engine.transcribe_batch(clips, **options)
+
+
+_warmed_up = False
+
+
+def _warm_up(barrier, inference: bool) -> int:
+    """
+    Optionally run one short inference so first-request costs (allocations,
+    kernels) are paid now, then hold this process until every worker has
+    got here: no worker can take two of warm()'s tasks, so each one starts.
+    """
+    global _warmed_up
+    if inference and not _warmed_up:
+        _engine.transcribe(np.zeros(16000, dtype=np.float32))
+        _warmed_up = True
+    barrier.wait(WARM_TIMEOUT)
+    return os.getpid()
+
+
+# --- API process side --------------------------------------------------------
+
+class STTWorkerPool:
+    """
+    Fixed-size pool of worker processes running one backend and model size.
+    transcribe() blocks until a worker returns, so call it from a thread
+    (the STT scheduler does). A crashed pool is rebuilt and the request
+    retried once; a job still running after `request_timeout` seconds has
+    its workers killed and the pool rebuilt, and fails with RuntimeError.
+    """
+
+    def __init__(self, backend: str, model_size: str, workers: int, request_timeout: float = 600.0):
+        self.backend = backend
+        self.model_size = model_size
+        self.workers = max(1, workers)
+        self.request_timeout = request_timeout
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        self.restarts = 0
+        self.warmed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting {self.workers} STT worker(s) with {self.backend} '{self.model_size}'")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # spawn: workers must not inherit the API process's threads and sockets
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.backend, self.model_size, self.threads_per_worker),
+                )
+            return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self.restarts += 1
+                self.warmed = 0
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _kill(self, hung: ProcessPoolExecutor):
+        """Stop a pool whose worker no longer responds; shutdown() alone would leave the process running."""
+        for process in list((getattr(hung, "_processes", None) or {}).values()):
+            process.kill()
+        self._reset(hung)
+
+    def _call(self, fn: Callable, *args) -> Any:
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return executor.submit(fn, *args).result(timeout=self.request_timeout)
+            except FutureTimeoutError:
+                logger.error(f"STT worker did not answer within {self.request_timeout:.0f}s; restarting the pool")
+                self._kill(executor)
+                raise RuntimeError(f"STT worker timed out after {self.request_timeout:.0f}s")
+            except BrokenProcessPool as e:
+                logger.warning(f"STT worker pool broke (attempt {attempt + 1}): {e}")
+                self._reset(executor)
+                if attempt == 1:
+                    raise RuntimeError(f"STT worker crashed: {e}")
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        return self._call(_transcribe, audio, options)
+
+    def transcribe_batch(self, clips: List[np.ndarray], **options) -> List[Dict[str, Any]]:
+        """Transcribe several clips in one job on one worker."""
+        return self._call(_transcribe_batch, clips, options)
+
+    def warm(self, inference: bool = False) -> int:
+        """
+        Start every worker and wait until each has loaded its model (and run a
+        warm-up inference). Returns the number of workers ready.
+        """
+        with multiprocessing.get_context("spawn").Manager() as manager:
+            barrier = manager.Barrier(self.workers)
+            executor = self._get_executor()
+            # One task per worker, each blocking until all are running: the executor has to start them all
+            futures = [executor.submit(_warm_up, barrier, inference) for _ in range(self.workers)]
+            try:
+                pids = {future.result() for future in futures}
+            except threading.BrokenBarrierError:
+                raise RuntimeError(f"STT workers did not all start within {WARM_TIMEOUT:.0f}s")
+            except BrokenProcessPool as e:
+                self._reset(executor)
+                raise RuntimeError(f"STT worker crashed while warming up: {e}")
+        self.warmed = len(pids)
+        logger.info(f"STT workers ready: {len(pids)} process(es)")
+        return len(pids)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "model": self.model_size,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "started": self._executor is not None,
+            "warmed": self.warmed,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
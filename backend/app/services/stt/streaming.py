@@ -0,0 +1,223 @@
+"""
+Streaming Transcription
+Turns a live stream of audio into partial and final transcripts.
+
+Audio accumulates in a window that starts at the last committed point.
+Every step decodes only that window, with the committed text as the prompt,
+so earlier audio is never decoded again. Words that two consecutive
+hypotheses agree on (LocalAgreement) become stable and are never revised.
+Once a whole segment is stable, its audio leaves the window. A pause in
+speech finalizes the utterance and empties the window.
+"""
+
+import re
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from app.services.audio.vad import detect_speech
+
+# Committed text passed back to the engine as context (Whisper's prompt is short)
+PROMPT_CHARS = 200
+
+# Segments ending this close to the live edge may still grow; don't cut there
+LIVE_EDGE_SECONDS = 1.0
+
+_WORD = re.compile(r"[\w']+")
+
+
+def _normalize(word: str) -> str:
+    """Compare words without case or punctuation, which Whisper revises freely."""
+    return "".join(_WORD.findall(word.lower()))
+
+
+def _agreed_prefix(a: List[str], b: List[str]) -> int:
+    count = 0
+    for x, y in zip(a, b):
+        if _normalize(x) != _normalize(y):
+            break
+        count += 1
+    return count
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of one audio stream (mono float32 at sample_rate).
+    `decode(audio, prompt)` runs one engine pass and returns its result dict
+    ("text", "segments" with window-relative times).
+
+    Call add_audio() as samples arrive, step() whenever ready() says a new
+    step is due, and finish() at the end of the stream. step() and finish()
+    return the events to send to the client:
+      {"type": "partial", "text", "stable"}  stable is a prefix of text and only ever grows
+      {"type": "final", "text", "start", "end"}  an utterance closed by a pause
+      {"type": "done", "text", "segments", "duration"}  from finish()
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[np.ndarray, str], Awaitable[Dict[str, Any]]],
+        sample_rate: int = 16000,
+        step_seconds: float = 1.0,
+        max_window_seconds: float = 20.0,
+        pause_ms: int = 600,
+        threshold_db: float = -45.0,
+    ):
+        self.decode = decode
+        self.sample_rate = sample_rate
+        self.step_samples = int(step_seconds * sample_rate)
+        self.max_window_samples = int(max_window_seconds * sample_rate)
+        self.pause_ms = pause_ms
+        self.threshold_db = threshold_db
+        self.received = 0  # samples since the start of the stream
+        self.committed: List[str] = []  # words whose audio has left the window
+        self.segments: List[Dict[str, Any]] = []  # with stream-relative times
+        self.decodes = 0
+        self._window = np.zeros(0, dtype=np.float32)
+        self._window_start = 0  # stream sample index of the window's first sample
+        self._stable: List[str] = []  # agreed words whose audio is still in the window
+        self._previous: List[str] = []  # last hypothesis for the window
+        self._previous_segments: List[Dict[str, Any]] = []  # its segments, window-relative
+        self._since_step = 0
+        self._utterance_start = 0.0
+        self._utterance_words = 0  # index into committed where the current utterance begins
+
+    def add_audio(self, samples: np.ndarray):
+        self._window = np.concatenate((self._window, samples.astype(np.float32, copy=False)))
+        self.received += len(samples)
+        self._since_step += len(samples)
+
+    def ready(self) -> bool:
+        return self._since_step >= self.step_samples
+
+    @property
+    def duration(self) -> float:
+        return self.received / self.sample_rate
+
+    def _prompt(self) -> str:
+        return " ".join(self.committed)[-PROMPT_CHARS:]
+
+    def _seconds(self, samples: int) -> float:
+        return round(samples / self.sample_rate, 3)
+
+    def _speech(self, window: np.ndarray):
+        return detect_speech(window, self.sample_rate, threshold_db=self.threshold_db, min_pause_ms=self.pause_ms, pad_ms=0)
+
+    def _drop(self, samples: int):
+        """Remove the first `samples` of the window."""
+        self._window = self._window[samples:]
+        self._window_start += samples
+
+    def _commit_segments(self, segments: List[Dict[str, Any]], words: int):
+        self.committed.extend(self._stable[:words])
+        self._stable = self._stable[words:]
+        offset = self._window_start / self.sample_rate
+        for segment in segments:
+            self.segments.append({
+                "id": len(self.segments),
+                "start": round(segment.get("start", 0.0) + offset, 3),
+                "end": round(segment.get("end", 0.0) + offset, 3),
+                "text": segment.get("text", "").strip(),
+            })
+
+    def _partial(self) -> Dict[str, Any]:
+        stable = self.committed + self._stable
+        return {
+            "type": "partial",
+            "text": " ".join(stable + self._previous[len(self._stable):]),
+            "stable": " ".join(stable),
+        }
+
+    async def step(self) -> List[Dict[str, Any]]:
+        self._since_step = 0
+        window = self._window
+        regions = self._speech(window)
+        if not regions:
+            # Silence: nothing to decode; keep a short tail so the next onset isn't clipped
+            keep = min(len(window), self.step_samples)
+            if self._previous:
+                return [self._finalize(self._previous, self._previous_segments, len(window) - keep)]
+            self._drop(len(window) - keep)
+            self._utterance_start = self._window_start / self.sample_rate
+            return []
+
+        result = await self.decode(window, self._prompt())
+        self.decodes += 1
+        words = result.get("text", "").split()
+        segments = result.get("segments", [])
+
+        # Words two consecutive hypotheses agree on become stable; stable words never change
+        agreed = _agreed_prefix(self._previous, words)
+        if _agreed_prefix(self._stable, words) == len(self._stable) and agreed > len(self._stable):
+            self._stable.extend(words[len(self._stable):agreed])
+        self._previous = words
+        self._previous_segments = segments
+
+        events: List[Dict[str, Any]] = []
+        trailing_silence = len(window) - regions[-1][1]
+        if trailing_silence * 1000 >= self.pause_ms * self.sample_rate and words:
+            # The speaker paused: the whole hypothesis is final
+            events.append(self._finalize(words, segments, len(window)))
+            return events
+
+        # Move whole segments that are stable and clear of the live edge out of the window
+        window_seconds = len(window) / self.sample_rate
+        count, cut = 0, None
+        for segment in segments:
+            n = len(segment.get("text", "").split())
+            if count + n > len(self._stable) or segment.get("end", window_seconds) > window_seconds - LIVE_EDGE_SECONDS:
+                break
+            count += n
+            cut = segment
+        if cut is not None:
+            done = segments[:segments.index(cut) + 1]
+            self._commit_segments(done, count)
+            self._previous = self._previous[count:]
+            self._drop(int(cut["end"] * self.sample_rate))
+            shift = self._seconds(int(cut["end"] * self.sample_rate))
+            self._previous_segments = [
+                {**segment, "start": segment.get("start", 0.0) - shift, "end": segment.get("end", 0.0) - shift}
+                for segment in segments[len(done):]
+            ]
+        elif len(window) >= self.max_window_samples:
+            # No usable boundary in a full window: finalize it as it is
+            events.append(self._finalize(words, segments, len(window)))
+            return events
+
+        events.append(self._partial())
+        return events
+
+    def _finalize(self, words: List[str], segments: List[Dict[str, Any]], samples: int) -> Dict[str, Any]:
+        """Commit the hypothesis for the first `samples` of the window and empty it."""
+        # Stable words stay as they were shown; the rest comes from the latest hypothesis
+        self._stable = self._stable + words[len(self._stable):]
+        self._commit_segments(segments, len(self._stable))
+        self._previous = []
+        self._previous_segments = []
+        self._drop(samples)
+        event = {
+            "type": "final",
+            "text": " ".join(self.committed[self._utterance_words:]),
+            "start": round(self._utterance_start, 3),
+            "end": self._seconds(self._window_start),
+        }
+        self._utterance_start = self._window_start / self.sample_rate
+        self._utterance_words = len(self.committed)
+        return event
+
+    async def finish(self) -> List[Dict[str, Any]]:
+        """Decode whatever is left and close the stream."""
+        events: List[Dict[str, Any]] = []
+        if len(self._window) and self._speech(self._window):
+            result = await self.decode(self._window, self._prompt())
+            self.decodes += 1
+            events.append(self._finalize(result.get("text", "").split(), result.get("segments", []), len(self._window)))
+        elif self._previous:
+            events.append(self._finalize(self._previous, self._previous_segments, len(self._window)))
+        events.append({
+            "type": "done",
+            "text": " ".join(self.committed),
+            "segments": self.segments,
+            "duration": round(self.duration, 3),
+        })
+        return events
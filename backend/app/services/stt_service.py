@@ -1,95 +1,428 @@
-import os
+import asyncio
 import logging
+import math
+import threading
 import time
-import shutil
+from collections import Counter
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Dict, Any
-
-# Note: In a real environment, we would import 'whisper' here.
-# Since we are setting up the structure first, we'll keep the import optional
-# or mock it if 'openai-whisper' isn't installed yet, to ensure the app starts.
-try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.audio.decode import MODEL_SAMPLE_RATE, decode_audio
+from app.services.audio.probe import AudioInfo
+from app.services.audio.vad import detect_speech, plan_chunks
+from app.services.scheduler import AdmissionScheduler, SchedulerSaturatedError
+from app.services.stt.batcher import MicroBatcher
+from app.services.stt.cache import TranscriptCache
+from app.services.stt.base import BaseSTTEngine
+from app.services.stt.factory import STTEngineFactory
+from app.services.stt.pool import STTWorkerPool, default_worker_count
 
 logger = logging.getLogger(__name__)
 
-# Maximum file size: 50MB - prevents DoS attacks from large uploads
-MAX_FILE_SIZE = 50 * 1024 * 1024
+# Maximum file size (50MB by default) - prevents DoS attacks from large uploads
+MAX_FILE_SIZE = settings.STT_MAX_UPLOAD_BYTES
+
+class STTAdmission:
+    """
+    One upload's place in the cost model. check() vets the header and holds
+    the clip's seconds in pending_audio_seconds while the upload is still
+    arriving; release() hands them back once transcription counts the speech
+    it actually sends (or the request fails). Use as a context manager.
+    """
+
+    def __init__(self, service: "STTService"):
+        self._service = service
+        self.seconds = 0.0
+
+    def check(self, info: AudioInfo):
+        self._service.check_admission(info)
+        self.release()
+        self.seconds = info.duration
+        self._service.pending_audio_seconds += self.seconds
+
+    def release(self):
+        if self.seconds:
+            self._service.pending_audio_seconds = max(0.0, self._service.pending_audio_seconds - self.seconds)
+            self.seconds = 0.0
+
+    def __enter__(self) -> "STTAdmission":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
 
 class STTService:
     def __init__(self):
-        self.model_size = "base"
-        self.model = None
-        self.temp_dir = Path("temp_stt_uploads")
-        self.temp_dir.mkdir(exist_ok=True)
-        logger.info(f"STT Service initialized. Whisper available: {WHISPER_AVAILABLE}")
-
-    def load_model(self):
-        """Lazy load the model only when needed to save startup time/memory."""
-        if not WHISPER_AVAILABLE:
-            raise ImportError("openai-whisper is not installed. Please install it.")
-        
-        if self.model is None:
-            logger.info(f"Loading Whisper '{self.model_size}' model...")
-            try:
-                self.model = whisper.load_model(self.model_size)
-                logger.info("Whisper model loaded successfully.")
-            except Exception as e:
-                logger.error(f"Failed to load Whisper model: {e}")
-                raise RuntimeError(f"Could not load STT model: {e}")
-
-    async def transcribe(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        # Engines are imported by the worker processes only, which keeps torch
+        # and CTranslate2 out of the API process
+        self.backend = STTEngineFactory.default_backend()
+        self.model_size = settings.STT_MODEL_SIZE
+        engine_class = STTEngineFactory.get_engine_class(self.backend)
+        self.workers = settings.STT_WORKERS or default_worker_count(self.model_size, engine_class.memory_scale)
+        self.request_models = {m.strip() for m in settings.STT_REQUEST_MODELS.split(",") if m.strip()}
+        self.request_models.add(self.model_size)
+        # One pool (and batcher) per (backend, model size); processes start on first use or warm()
+        self._pools: Dict[Tuple[str, str], STTWorkerPool] = {}
+        self._batchers: Dict[Tuple[str, str], MicroBatcher] = {}
+        self._in_process: Dict[Tuple[str, str], BaseSTTEngine] = {}
+        self._lock = threading.Lock()
+        # Seconds of audio received vs. sent to the model after VAD
+        self.vad_counters = {"requests": 0, "silent": 0, "input_seconds": 0.0, "speech_seconds": 0.0}
+        # Cost model: worker seconds per audio second (moving average of real runs) and
+        # the audio admitted to workers but not finished yet
+        self.rtf = settings.STT_ESTIMATED_RTF
+        self.pending_audio_seconds = 0.0
+        self.rejected_estimate = 0
+        self.cache: Optional[TranscriptCache] = None
+        if settings.STT_CACHE_ENABLED:
+            self.cache = TranscriptCache(
+                settings.STT_CACHE_MAX_ENTRIES,
+                Path(settings.STT_CACHE_DIR) if settings.STT_CACHE_DIR else None,
+                settings.STT_CACHE_DISK_MAX_BYTES,
+            )
+        # Bounded queue in front of all workers: exposes depth/wait and sheds excess load
+        self.scheduler = AdmissionScheduler(
+            name="stt",
+            max_concurrency=self.workers,
+            max_queue_depth=settings.STT_QUEUE_MAX_DEPTH,
+            max_wait=settings.STT_QUEUE_MAX_WAIT,
+        )
+        logger.info(f"STT Service initialized. Backend: {self.backend}, model: {self.model_size}, workers: {self.workers}")
+
+    @property
+    def pool(self) -> Optional[STTWorkerPool]:
+        """Worker pool for the deployment's default backend and model (None for in-process engines)."""
+        if STTEngineFactory.get_engine_class(self.backend).in_process:
+            return None
+        return self._get_pool(self.backend, self.model_size)
+
+    def resolve(self, backend: Optional[str] = None, model_size: Optional[str] = None) -> Tuple[str, str]:
+        """Validate a per-request backend/model choice, falling back to the deployment defaults."""
+        backend = backend.lower().strip() if backend else self.backend
+        STTEngineFactory.get_engine_class(backend)
+        model_size = model_size.strip() if model_size else self.model_size
+        if model_size not in self.request_models:
+            raise ValueError(f"Invalid STT model: '{model_size}'. Allowed: {sorted(self.request_models)}")
+        return backend, model_size
+
+    def _get_pool(self, backend: str, model_size: str) -> STTWorkerPool:
+        key = (backend, model_size)
+        with self._lock:
+            if key not in self._pools:
+                default = key == (self.backend, self.model_size)
+                workers = self.workers if default else settings.STT_EXTRA_POOL_WORKERS
+                self._pools[key] = STTWorkerPool(backend, model_size, workers, settings.STT_REQUEST_TIMEOUT)
+            return self._pools[key]
+
+    def _get_in_process(self, backend: str, model_size: str) -> BaseSTTEngine:
+        key = (backend, model_size)
+        with self._lock:
+            if key not in self._in_process:
+                engine = STTEngineFactory.create(backend)
+                engine.load(model_size, threads=1)
+                self._in_process[key] = engine
+            return self._in_process[key]
+
+    def _get_batcher(self, backend: str, model_size: str) -> MicroBatcher:
+        key = (backend, model_size)
+        pool = self._get_pool(backend, model_size)
+        with self._lock:
+            if key not in self._batchers:
+
+                async def run_batch(clips: List[np.ndarray]) -> List[Dict[str, Any]]:
+                    # One queue slot and one worker for the whole batch
+                    return await self.scheduler.run_with_limit(
+                        f"{backend}:{model_size}", pool.workers, self._timed, pool.transcribe_batch, clips
+                    )
+
+                self._batchers[key] = MicroBatcher(
+                    run_batch,
+                    window=settings.STT_BATCH_WINDOW_MS / 1000,
+                    max_size=settings.STT_BATCH_MAX_SIZE,
+                )
+            return self._batchers[key]
+
+    def _batching_enabled(self) -> bool:
+        return settings.STT_BATCH_WINDOW_MS > 0 and settings.STT_BATCH_MAX_SIZE > 1
+
+    def estimate_cost(self, duration: float) -> float:
+        """Worker seconds that transcribing `duration` seconds of audio is expected to take."""
+        return duration * self.rtf
+
+    def estimated_wait(self) -> float:
+        """Seconds until a new request would start, from the audio already queued or running."""
+        return self.estimate_cost(self.pending_audio_seconds) / self.workers
+
+    def admission(self) -> STTAdmission:
+        """A reservation to pass (as .check) to receive_audio_upload's on_probe and on to transcribe_audio."""
+        return STTAdmission(self)
+
+    def check_admission(self, info: AudioInfo):
+        """
+        Turn a request away from its header alone, before any decode work,
+        when the work ahead of it plus the clip itself wouldn't be through
+        within the queue's max wait. With nothing queued the clip is always
+        taken: its length is already capped by STT_MAX_AUDIO_SECONDS.
+        This runs before the transcript cache is consulted, so under load a
+        clip the cache could answer is turned away too. That is deliberate:
+        the cache key is a hash of the decoded samples, and looking it up
+        first would mean receiving and decoding every upload, the very work
+        shedding from the header avoids.
+        Raises SchedulerSaturatedError (503).
+        """
+        wait = self.estimate_cost(self.pending_audio_seconds + info.duration) / self.workers
+        if self.pending_audio_seconds and wait > self.scheduler.max_wait:
+            self.rejected_estimate += 1
+            logger.warning(f"STT: rejecting {info.duration:.0f}s of audio, estimated queue wait {wait:.0f}s")
+            raise SchedulerSaturatedError(
+                f"STT is busy; about {wait:.0f}s of transcription is queued",
+                status_code=503,
+                retry_after=max(1, math.ceil(wait - self.scheduler.max_wait)),
+            )
+
+    def _timed(self, func, audio, **options) -> Any:
+        """Run a worker call and fold its speed into the cost model. audio is one clip or a list."""
+        started = time.monotonic()
+        result = func(audio, **options)
+        clips = audio if isinstance(audio, list) else [audio]
+        seconds = sum(len(clip) for clip in clips) / MODEL_SAMPLE_RATE
+        if seconds > 0:
+            self.rtf = 0.8 * self.rtf + 0.2 * (time.monotonic() - started) / seconds
+        return result
+
+    async def transcribe(
+        self,
+        file_content: bytes,
+        filename: str,
+        backend: Optional[str] = None,
+        model_size: Optional[str] = None,
+        language: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
-        Transcribes audio content.
+        Transcribes an encoded audio file held in memory.
         """
         # Validate file size to prevent DoS attacks
         if len(file_content) > MAX_FILE_SIZE:
             raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB")
-        
-        if not WHISPER_AVAILABLE:
-            # Fallback/Mock for testing without Whisper installed
-            logger.warning("Whisper not available, using mock transcription.")
-            return {
-                "text": "This is a mock transcription because Whisper is not installed.",
-                "language": "en",
-                "confidence": 0.99,
-                "segments": []
-            }
-
-        self.load_model()
-        
-        # Save bytes to a temporary file
-        temp_path = self.temp_dir / f"{int(time.time())}_{filename}"
-        
+
+        # Decode in memory, off the event loop; the engines take the 16 kHz float32 array directly
+        audio = await asyncio.to_thread(decode_audio, file_content, MODEL_SAMPLE_RATE)
+        return await self.transcribe_audio(audio, filename, backend, model_size, language)
+
+    async def transcribe_audio(
+        self,
+        audio: np.ndarray,
+        filename: str = "audio",
+        backend: Optional[str] = None,
+        model_size: Optional[str] = None,
+        language: Optional[str] = None,
+        admission: Optional[STTAdmission] = None,
+    ) -> Dict[str, Any]:
+        """
+        Transcribes decoded audio: mono float32 samples at 16 kHz.
+        Audio already transcribed with the same settings is answered from the
+        cache ("cached": True). Otherwise silence is trimmed first, and long
+        recordings are split at pauses into chunks transcribed in parallel.
+        backend/model_size override the deployment defaults for this request;
+        language skips language detection. The upload's admission, if given,
+        is released once its speech is queued (or on return).
+        """
+        try:
+            backend, model_size = self.resolve(backend, model_size)
+            language = language.strip().lower() if language else None
+            if not self.cache:
+                result = await self._transcribe_speech(audio, filename, backend, model_size, language, admission)
+                result["cached"] = False
+                return result
+
+            # Hashing tens of MB of samples releases the GIL; keep it off the event loop
+            key = await asyncio.to_thread(
+                self.cache.make_key, audio, backend, model_size, language, vad=self._vad_options()
+            )
+            result = await asyncio.to_thread(self.cache.get, key, len(audio) / MODEL_SAMPLE_RATE)
+            if result is not None:
+                logger.info(f"Transcription of {filename} served from cache")
+                result["cached"] = True
+                return result
+            result = await self._transcribe_speech(audio, filename, backend, model_size, language, admission)
+            await asyncio.to_thread(self.cache.put, key, result)
+            result["cached"] = False
+            return result
+        finally:
+            if admission:
+                admission.release()
+
+    def _vad_options(self) -> Optional[Tuple[Any, ...]]:
+        """The VAD settings that shape what reaches the model (part of the cache key)."""
+        if not settings.STT_VAD_ENABLED:
+            return None
+        return (
+            settings.STT_VAD_THRESHOLD_DB,
+            settings.STT_VAD_MIN_PAUSE_MS,
+            settings.STT_VAD_PAD_MS,
+            settings.STT_VAD_CHUNK_SECONDS,
+        )
+
+    async def _transcribe_speech(
+        self,
+        audio: np.ndarray,
+        filename: str,
+        backend: str,
+        model_size: str,
+        language: Optional[str],
+        admission: Optional[STTAdmission] = None,
+    ) -> Dict[str, Any]:
+        chunks = self._speech_chunks(audio)
+        if not chunks:
+            # Nothing but silence: answer without involving the model
+            logger.info(f"No speech detected in {filename}")
+            return {"text": "", "language": "unknown", "confidence": 0.0, "segments": []}
+
+        speech_seconds = sum(end - start for start, end in chunks) / MODEL_SAMPLE_RATE
+        logger.info(
+            f"Transcribing {filename} ({len(audio) / MODEL_SAMPLE_RATE:.1f}s of audio, "
+            f"{len(chunks)} chunk(s), ~{self.estimate_cost(speech_seconds):.1f}s of work) with {backend} '{model_size}'..."
+        )
+        self.pending_audio_seconds += speech_seconds
+        if admission:
+            # The header's estimate gives way to the speech actually queued
+            admission.release()
+        tasks = [
+            asyncio.ensure_future(self._transcribe_chunk(audio[start:end], backend, model_size, language))
+            for start, end in chunks
+        ]
         try:
-            with open(temp_path, "wb") as f:
-                f.write(file_content)
-            
-            # Run transcription
-            logger.info(f"Transcribing {temp_path}...")
-            # fp16=False is safer for CPU inference to avoid warnings
-            result = self.model.transcribe(str(temp_path), fp16=False)
-            
-            return {
-                "text": result.get("text", "").strip(),
-                "language": result.get("language", "unknown"),
-                "confidence": 1.0, # Whisper doesn't give a single global confidence easily
-                "segments": result.get("segments", [])
-            }
-            
-        except Exception as e:
-            logger.error(f"Transcription failed: {e}")
-            raise e
+            results = await asyncio.gather(*tasks)
+        except BaseException as e:
+            # One chunk failed (or the request was cancelled): the others are wasted work
+            for task in tasks:
+                task.cancel()
+            if isinstance(e, Exception):
+                logger.error(f"Transcription failed: {e}")
+            raise
         finally:
-            # Cleanup temp file
-            if temp_path.exists():
-                try:
-                    os.remove(temp_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to delete temp file {temp_path}: {cleanup_error}")
+            self.pending_audio_seconds = max(0.0, self.pending_audio_seconds - speech_seconds)
+
+        return self._merge(results, [start / MODEL_SAMPLE_RATE for start, _ in chunks])
+
+    def _speech_chunks(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """Sample ranges worth transcribing: speech only, split at pauses into model-sized chunks."""
+        if not settings.STT_VAD_ENABLED:
+            return [(0, len(audio))] if len(audio) else []
+        regions = detect_speech(
+            audio,
+            MODEL_SAMPLE_RATE,
+            threshold_db=settings.STT_VAD_THRESHOLD_DB,
+            min_pause_ms=settings.STT_VAD_MIN_PAUSE_MS,
+            pad_ms=settings.STT_VAD_PAD_MS,
+        )
+        chunks = plan_chunks(audio, regions, MODEL_SAMPLE_RATE, settings.STT_VAD_CHUNK_SECONDS)
+        self.vad_counters["requests"] += 1
+        self.vad_counters["silent"] += not chunks
+        self.vad_counters["input_seconds"] += len(audio) / MODEL_SAMPLE_RATE
+        self.vad_counters["speech_seconds"] += sum(end - start for start, end in chunks) / MODEL_SAMPLE_RATE
+        return chunks
+
+    async def _transcribe_chunk(
+        self,
+        audio: np.ndarray,
+        backend: str,
+        model_size: str,
+        language: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        if language:
+            # Batches share one set of decoding options; a hinted request runs on its own
+            return await self.decode(audio, backend, model_size, language=language)
+        engine_class = STTEngineFactory.get_engine_class(backend)
+        batch_limit = min(settings.STT_BATCH_MAX_SECONDS, engine_class.batch_max_seconds)
+        if (
+            not engine_class.in_process
+            and engine_class.supports_batching
+            and self._batching_enabled()
+            and len(audio) <= batch_limit * MODEL_SAMPLE_RATE
+        ):
+            return await self._get_batcher(backend, model_size).submit(audio)
+        return await self.decode(audio, backend, model_size)
+
+    async def decode(
+        self,
+        audio: np.ndarray,
+        backend: Optional[str] = None,
+        model_size: Optional[str] = None,
+        **options,
+    ) -> Dict[str, Any]:
+        """
+        One engine pass over the audio as given: no VAD, chunking or batching.
+        options go to the engine (e.g. language, initial_prompt). Returns the
+        engine's raw result.
+        """
+        backend, model_size = self.resolve(backend, model_size)
+        engine_class = STTEngineFactory.get_engine_class(backend)
+        if engine_class.in_process:
+            return self._get_in_process(backend, model_size).transcribe(audio, **options)
+
+        # Run transcription on a worker process; waits in the STT queue when all are busy.
+        # A model holds at most as many slots as its pool has processes, so a small
+        # extra pool can't take the slots of the default one
+        pool = self._get_pool(backend, model_size)
+        return await self.scheduler.run_with_limit(
+            f"{backend}:{model_size}", pool.workers, self._timed, pool.transcribe, audio, **options
+        )
+
+    @staticmethod
+    def _merge(results: List[Dict[str, Any]], offsets: List[float]) -> Dict[str, Any]:
+        """Join per-chunk results in order, shifting segment timestamps to the original audio."""
+        segments = []
+        for result, offset in zip(results, offsets):
+            for segment in result.get("segments", []):
+                segment = dict(segment, id=len(segments))
+                if "start" in segment and "end" in segment:
+                    segment["start"] = round(segment["start"] + offset, 3)
+                    segment["end"] = round(segment["end"] + offset, 3)
+                segments.append(segment)
+        languages = Counter(r.get("language") for r in results if r.get("language") not in (None, "unknown"))
+        return {
+            "text": " ".join(r.get("text", "").strip() for r in results if r.get("text", "").strip()),
+            "language": languages.most_common(1)[0][0] if languages else "unknown",
+            # Whisper doesn't give a single global confidence easily
+            "confidence": min(r.get("confidence", 1.0) for r in results),
+            "segments": segments,
+        }
+
+    async def warm(self, inference: bool = True):
+        """Start the default worker pool and load the model in every worker ahead of the first request."""
+        pool = self.pool
+        if pool is None:
+            return  # in-process engine, nothing to load
+        await asyncio.to_thread(pool.warm, inference)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "model": self.model_size,
+            "installed_backends": STTEngineFactory.installed_backends(),
+            "request_models": sorted(self.request_models),
+            "scheduler": self.scheduler.stats(),
+            "pools": {f"{b}:{m}": pool.stats() for (b, m), pool in self._pools.items()},
+            "batching": {f"{b}:{m}": batcher.stats() for (b, m), batcher in self._batchers.items()},
+            "vad": {key: round(value, 2) for key, value in self.vad_counters.items()},
+            "cache": self.cache.stats() if self.cache else None,
+            "cost": {
+                "rtf": round(self.rtf, 4),
+                "pending_audio_seconds": round(self.pending_audio_seconds, 2),
+                "estimated_wait": round(self.estimated_wait(), 2),
+                "rejected_estimate": self.rejected_estimate,
+            },
+        }
+
+    def shutdown(self):
+        """Stop the STT queue and worker processes."""
+        self.scheduler.shutdown()
+        for pool in list(self._pools.values()):
+            pool.shutdown()
 
 stt_service = STTService()
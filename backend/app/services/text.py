@@ -0,0 +1,113 @@
+"""
+Text Utilities
+Normalization and script-aware sentence splitting shared by synthesis
+(streaming, parallel segments, cache keys) and translation (translation
+memory keys, sentence reuse).
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional, Pattern
+
+LATIN_TERMINATORS = ".!?"
+DANDA_TERMINATORS = "\u0964\u0965"  # । and ॥
+
+# Sentence terminators per script, keyed like language_manager.SCRIPTS.
+# Indic scripts end sentences with a danda, or with Latin punctuation in modern text.
+SCRIPT_TERMINATORS = {
+    "hi": LATIN_TERMINATORS + DANDA_TERMINATORS,
+    "ml": LATIN_TERMINATORS + DANDA_TERMINATORS,
+    "bn": LATIN_TERMINATORS + DANDA_TERMINATORS,
+    "ta": LATIN_TERMINATORS + DANDA_TERMINATORS,
+    "te": LATIN_TERMINATORS + DANDA_TERMINATORS,
+    "kn": LATIN_TERMINATORS + DANDA_TERMINATORS,
+    "en": LATIN_TERMINATORS,
+}
+
+# Closing quotes/brackets that stay attached to the sentence they end
+CLOSERS = "\"')\\]\u201d\u2019"
+
+# Fallback break points for sentences that are too long to synthesize as one unit
+CLAUSE_BOUNDARY = re.compile(r"(?<=[,;:])\s+")
+
+DEFAULT_MAX_CHARS = 400
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for keys: NFC, collapsed whitespace, trimmed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+@lru_cache(maxsize=None)
+def _boundary_for(terminators: str) -> Pattern:
+    """
+    Latin punctuation ends a sentence only when whitespace follows (so "3.14"
+    stays whole); a danda always does, since it is often written without a space.
+    """
+    alternatives = []
+    latin = "".join(c for c in terminators if c not in DANDA_TERMINATORS)
+    danda = "".join(c for c in terminators if c in DANDA_TERMINATORS)
+    if latin:
+        alternatives.append(rf"(?:(?<=[{re.escape(latin)}])|(?<=[{re.escape(latin)}][{CLOSERS}]))\s+")
+    if danda:
+        alternatives.append(rf"(?<=[{danda}])(?![{CLOSERS}{danda}])\s*")
+        alternatives.append(rf"(?<=[{danda}][{CLOSERS}])\s*")
+    return re.compile("|".join(alternatives))
+
+
+def sentence_boundary(language: Optional[str] = None) -> Pattern:
+    """Boundary pattern for a language code (e.g. "hi" or "hi_IN"); unknown languages accept every terminator."""
+    code = (language or "").split("_")[0].lower()
+    terminators = SCRIPT_TERMINATORS.get(code)
+    if terminators is None:
+        terminators = LATIN_TERMINATORS + DANDA_TERMINATORS
+    return _boundary_for(terminators)
+
+
+# Default boundary: every script's terminators
+SENTENCE_BOUNDARY = sentence_boundary()
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Break an over-long sentence at clause boundaries, then at whitespace."""
+    pieces: List[str] = []
+    current = ""
+    for clause in CLAUSE_BOUNDARY.split(sentence):
+        candidate = f"{current} {clause}".strip() if current else clause
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        # A single clause can still be too long: hard-wrap on words
+        while len(clause) > max_chars:
+            cut = clause.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        current = clause
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_sentences(text: str, max_chars: int = DEFAULT_MAX_CHARS, language: Optional[str] = None) -> List[str]:
+    """
+    Split text into sentences, in order, with empty pieces dropped.
+    Sentences longer than max_chars are broken further so no piece exceeds it.
+    language selects the script's sentence terminators (see SCRIPT_TERMINATORS).
+    """
+    boundary = sentence_boundary(language)
+    sentences: List[str] = []
+    for paragraph in text.splitlines():
+        for sentence in boundary.split(paragraph.strip()):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if len(sentence) > max_chars:
+                sentences.extend(_split_long(sentence, max_chars))
+            else:
+                sentences.append(sentence)
+    return sentences
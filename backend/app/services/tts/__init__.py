@@ -0,0 +1,3 @@
+from app.services.tts.pool import PiperEnginePool, PiperWorker, PiperWorkerError
+
+__all__ = ["PiperEnginePool", "PiperWorker", "PiperWorkerError"]
@@ -0,0 +1,156 @@
+"""
+Synthesis Cache
+Content-addressed store for rendered audio, bounded by a byte budget with LRU eviction.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the key layout or stored format changes so old entries stop matching
+CACHE_KEY_VERSION = "1"
+
+CACHE_FILE_PATTERN = re.compile(r"^([0-9a-f]{64})\.(wav|flac|ogg)$")
+
+
+class SynthesisCache:
+    """
+    Maps a hash of (text, voice, speed, model version, output variant) to a
+    file in cache_dir.
+
+    Entries are named `<sha256>.<ext>` so they can be served by the regular
+    audio route. Recency is kept in memory and mirrored to file mtimes, so the LRU
+    order survives a restart. A held file is not evicted until it is released.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (size, filename)
+        self._total_bytes = 0
+        self._held: Counter = Counter()  # filename -> holders
+        self._lock = threading.Lock()
+        self._load_existing()
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, speed: float, model_version: str, variant: str = "") -> str:
+        """variant distinguishes derived artifacts (format/sample rate) of the same rendering."""
+        material = "\x1f".join([
+            CACHE_KEY_VERSION,
+            normalize_text(text),
+            voice_id,
+            f"{speed:.3f}",
+            model_version,
+            variant,
+        ])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def filename_for(key: str, ext: str = "wav") -> str:
+        return f"{key}.{ext}"
+
+    def _load_existing(self):
+        """Index entries left over from a previous run, oldest first."""
+        if not self.cache_dir.exists():
+            return
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            match = CACHE_FILE_PATTERN.match(entry.name)
+            if entry.is_file() and match:
+                stat = entry.stat()
+                found.append((stat.st_mtime, match.group(1), stat.st_size, entry.name))
+        for _, key, size, filename in sorted(found):
+            self._entries[key] = (size, filename)
+            self._total_bytes += size
+        self._evict()
+        logger.info(f"Synthesis cache loaded: {len(self._entries)} entries, {self._total_bytes} bytes")
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached file for key and mark it recently used, or None on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self.cache_dir / self._entries[key][1]
+            if not path.exists():
+                # Removed behind our back; forget it
+                self._total_bytes -= self._entries.pop(key)[0]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, source_path: Path, ext: str = "wav") -> Path:
+        """Atomically move a freshly rendered file into the cache and enforce the budget."""
+        filename = self.filename_for(key, ext)
+        path = self.cache_dir / filename
+        os.replace(source_path, path)
+        size = path.stat().st_size
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[0]
+            self._entries[key] = (size, filename)
+            self._total_bytes += size
+            self._evict(keep=key)
+        return path
+
+    def hold(self, path: Path):
+        """Keep a cached file on disk (e.g. while it is being read) until release()."""
+        with self._lock:
+            self._held[path.name] += 1
+
+    def release(self, path: Path):
+        with self._lock:
+            self._held[path.name] -= 1
+            if self._held[path.name] <= 0:
+                del self._held[path.name]
+            self._evict()
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least recently used entries until under budget. Caller holds the lock."""
+        for key, (size, filename) in list(self._entries.items()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                break
+            if filename in self._held:
+                continue
+            del self._entries[key]
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.cache_dir / filename)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict cache entry {key}: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,279 @@
+"""
+Piper Engine Pool
+Keeps long-lived piper processes per voice so the ONNX model is loaded once
+instead of on every synthesis request.
+"""
+
+import json
+import logging
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (model_path, length_scale) - piper fixes length_scale at process start
+PoolKey = Tuple[str, float]
+
+
+class PiperWorkerError(RuntimeError):
+    """Raised when a piper worker dies or stops responding mid-request."""
+
+
+class PiperWorker:
+    """
+    A single piper process running in JSON-input mode.
+
+    Each request is one JSON line on stdin ({"text", "output_file"}); piper
+    writes the WAV and echoes the output path on stdout when it is done.
+    """
+
+    def __init__(self, piper_path: str, model_path: str, length_scale: float, work_dir: Path):
+        self.piper_path = piper_path
+        self.model_path = model_path
+        self.length_scale = length_scale
+        self.work_dir = work_dir
+        self.jobs_completed = 0
+        self.last_used = time.monotonic()
+        self._process: Optional[subprocess.Popen] = None
+        self._stdout_lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._stderr_tail: Deque[str] = deque(maxlen=20)
+
+    def start(self):
+        cmd = [
+            self.piper_path,
+            "--model", self.model_path,
+            "--length_scale", str(self.length_scale),
+            "--output_dir", str(self.work_dir),
+            "--json-input",
+        ]
+        logger.info(f"Starting piper worker: {' '.join(cmd)}")
+        self._process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process else None
+
+    def _read_stdout(self):
+        for line in self._process.stdout:
+            self._stdout_lines.put(line.strip())
+        # EOF: the process exited
+        self._stdout_lines.put(None)
+
+    def _read_stderr(self):
+        # Piper logs progress on stderr; drain it so the pipe never fills up
+        for line in self._process.stderr:
+            self._stderr_tail.append(line.rstrip())
+
+    def synthesize(self, text: str, output_path: Path, timeout: float):
+        """Synthesize one utterance into output_path. Blocks until piper reports completion."""
+        if not self.alive:
+            raise PiperWorkerError("Piper worker is not running")
+
+        request = json.dumps({"text": text, "output_file": str(output_path)}, ensure_ascii=False)
+        try:
+            self._process.stdin.write(request + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise PiperWorkerError(f"Piper worker closed its input: {e}")
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stop()
+                raise PiperWorkerError(f"Piper worker timed out after {timeout:.0f}s")
+            try:
+                line = self._stdout_lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is None:
+                stderr = "\n".join(self._stderr_tail)
+                raise PiperWorkerError(f"Piper worker exited unexpectedly: {stderr}")
+            # Piper may print other lines; the completion marker is the output path
+            if line and Path(line).resolve() == output_path.resolve():
+                break
+
+        self.jobs_completed += 1
+        self.last_used = time.monotonic()
+
+    def stop(self):
+        if self._process is None:
+            return
+        try:
+            if self._process.poll() is None:
+                self._process.stdin.close()
+                try:
+                    self._process.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+                    self._process.wait()
+        except Exception as e:
+            logger.warning(f"Error stopping piper worker {self.pid}: {e}")
+
+
+class PiperEnginePool:
+    """
+    Pool of warm piper workers keyed by (voice model, length_scale).
+
+    Up to `workers_per_voice` processes run per key; callers beyond that wait
+    for a worker to free up, unless they ask for a wider limit (the segments of
+    one long text). Dead workers are replaced transparently and idle ones,
+    including any started beyond workers_per_voice, are reaped after
+    `idle_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        piper_path: str,
+        work_dir: Path,
+        workers_per_voice: int = 2,
+        request_timeout: float = 120.0,
+        idle_timeout: float = 600.0,
+    ):
+        self.piper_path = piper_path
+        self.work_dir = work_dir
+        self.workers_per_voice = max(1, workers_per_voice)
+        self.request_timeout = request_timeout
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._idle: Dict[PoolKey, List[PiperWorker]] = {}
+        self._busy: Dict[PoolKey, int] = {}
+        self._closed = False
+        self.restarts = 0
+
+    def _key(self, model_path: str, length_scale: float) -> PoolKey:
+        return (model_path, round(length_scale, 3))
+
+    def _spawn(self, key: PoolKey) -> PiperWorker:
+        worker = PiperWorker(self.piper_path, key[0], key[1], self.work_dir)
+        worker.start()
+        return worker
+
+    def _reap_idle(self):
+        """Stop workers that have been idle too long. Caller holds the lock."""
+        now = time.monotonic()
+        for key, workers in list(self._idle.items()):
+            keep = []
+            for worker in workers:
+                if not worker.alive or now - worker.last_used > self.idle_timeout:
+                    worker.stop()
+                else:
+                    keep.append(worker)
+            self._idle[key] = keep
+
+    def _acquire(self, key: PoolKey, max_workers: Optional[int] = None) -> PiperWorker:
+        limit = max(self.workers_per_voice, max_workers or 0)
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Piper engine pool is shut down")
+                self._reap_idle()
+                idle = self._idle.get(key, [])
+                if idle:
+                    worker = idle.pop()
+                    self._busy[key] = self._busy.get(key, 0) + 1
+                    return worker
+                if self._busy.get(key, 0) < limit:
+                    # Reserve the slot before spawning outside the lock
+                    self._busy[key] = self._busy.get(key, 0) + 1
+                    break
+                self._cond.wait()
+
+        try:
+            return self._spawn(key)
+        except Exception:
+            self._release(key, None)
+            raise
+
+    def _release(self, key: PoolKey, worker: Optional[PiperWorker]):
+        with self._cond:
+            self._busy[key] = max(0, self._busy.get(key, 0) - 1)
+            if worker is not None and worker.alive and not self._closed:
+                self._idle.setdefault(key, []).append(worker)
+            elif worker is not None:
+                worker.stop()
+            # Waiters differ in key and limit, so any of them may be the one that can proceed
+            self._cond.notify_all()
+
+    def synthesize(
+        self,
+        model_path: str,
+        text: str,
+        output_path: Path,
+        length_scale: float = 1.0,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Synthesize text to output_path on a warm worker. max_workers raises the
+        voice's worker limit for this call (never below workers_per_voice).
+        A worker that crashes mid-request is restarted and the request retried once.
+        """
+        key = self._key(model_path, length_scale)
+        for attempt in range(2):
+            worker = self._acquire(key, max_workers)
+            try:
+                worker.synthesize(text, output_path, self.request_timeout)
+                return
+            except PiperWorkerError as e:
+                worker.stop()
+                with self._cond:
+                    self.restarts += 1
+                logger.warning(f"Piper worker {worker.pid} failed (attempt {attempt + 1}): {e}")
+                if attempt == 1:
+                    raise RuntimeError(f"Piper failed: {e}")
+            finally:
+                self._release(key, worker)
+
+    def warm(self, model_path: str, length_scale: float = 1.0):
+        """Start one worker for a voice ahead of the first request."""
+        key = self._key(model_path, length_scale)
+        worker = self._acquire(key)
+        self._release(key, worker)
+
+    def stop_idle(self) -> int:
+        """Stop all idle workers so the next request per voice starts cold. Returns how many were stopped."""
+        with self._cond:
+            workers = [w for ws in self._idle.values() for w in ws]
+            self._idle.clear()
+        for worker in workers:
+            worker.stop()
+        return len(workers)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "voices": len({key[0] for key in self._idle} | {key[0] for key in self._busy}),
+                "idle_workers": sum(len(workers) for workers in self._idle.values()),
+                "busy_workers": sum(self._busy.values()),
+                "workers_per_voice": self.workers_per_voice,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            workers = [w for ws in self._idle.values() for w in ws]
+            self._idle.clear()
+            self._cond.notify_all()
+        for worker in workers:
+            worker.stop()
+        logger.info(f"Piper engine pool shut down ({len(workers)} workers stopped)")
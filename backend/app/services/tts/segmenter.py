@@ -0,0 +1,32 @@
+"""
+Text Segmenter
+Groups sentences (see app.services.text.split_sentences) into pieces of
+synthesis input that can be rendered in parallel.
+"""
+
+from typing import List
+
+
+def group_sentences(sentences: List[str], count: int) -> List[str]:
+    """
+    Join consecutive sentences into at most `count` segments of similar length,
+    preserving order. Used to spread one long text across parallel workers.
+    """
+    if not sentences:
+        return []
+    count = max(1, min(count, len(sentences)))
+    total = sum(len(sentence) for sentence in sentences)
+    groups: List[str] = []
+    current: List[str] = []
+    consumed = 0
+    for index, sentence in enumerate(sentences):
+        current.append(sentence)
+        consumed += len(sentence)
+        groups_left = count - len(groups) - 1
+        sentences_left = len(sentences) - index - 1
+        if groups_left and (consumed >= total * (len(groups) + 1) / count or sentences_left == groups_left):
+            groups.append(" ".join(current))
+            current = []
+    if current:
+        groups.append(" ".join(current))
+    return groups
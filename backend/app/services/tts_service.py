@@ -1,157 +1,461 @@
+import asyncio
 import os
 import shutil
+import struct
 import subprocess
 import uuid
-import json
 import logging
 import wave
 import contextlib
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable, Tuple
+
+import numpy as np
 
 from app.core.config import settings
+from app.services.audio.delivery import CHUNK_SIZE
+from app.services.audio.encode import FORMATS, available_formats, transcode, write_wav
+from app.services.audio.probe import probe_duration
+from app.services.audio.stitch import stitch_segments
+from app.services.scheduler import AdmissionScheduler, SchedulerSaturatedError
+from app.services.tts.cache import SynthesisCache
+from app.services.tts.pool import PiperEnginePool
+from app.services.text import split_sentences
+from app.services.tts.segmenter import group_sentences
+from app.services.voice_registry import voice_registry
 
 logger = logging.getLogger(__name__)
 
+# Rendered once per warmed voice at startup
+WARMUP_TEXT = "Hello."
+
 class TTSService:
     def __init__(self):
         self.output_dir = Path("outputs")
         self.output_dir.mkdir(exist_ok=True)
         
-        # Resolve model directory
-        self.model_dir = Path(settings.MODEL_DIR)
-        if not self.model_dir.is_absolute():
-            # If relative, make it relative to the backend root or project root
-            # Assuming settings.MODEL_DIR is "../voice_assets" relative to backend/
-            self.model_dir = (Path(__file__).parent.parent.parent / settings.MODEL_DIR).resolve()
+        # Voices (and the model directory) come from the shared registry
+        self.model_dir = voice_registry.root
             
         logger.info(f"TTS Service initialized. Models dir: {self.model_dir}, Outputs dir: {self.output_dir}")
-        self._voice_cache: Dict[str, Dict[str, Any]] = {}
         self.piper_path = shutil.which("piper") or "piper"
+        self.engine_pool = self._new_engine_pool()
+        # Piper runs are blocking; they go through a bounded thread pool, never on the event loop
+        self.scheduler = AdmissionScheduler(
+            name="tts",
+            max_concurrency=settings.TTS_MAX_CONCURRENCY,
+            per_key_concurrency=settings.TTS_VOICE_CONCURRENCY,
+            max_queue_depth=settings.TTS_QUEUE_MAX_DEPTH,
+            max_wait=settings.TTS_QUEUE_MAX_WAIT,
+        )
+        self.cache: Optional[SynthesisCache] = None
+        if settings.TTS_CACHE_ENABLED:
+            self.cache = SynthesisCache(self.output_dir.resolve(), settings.TTS_CACHE_MAX_BYTES)
+
+    def _new_engine_pool(self) -> Optional[PiperEnginePool]:
+        if not settings.PIPER_POOL_ENABLED:
+            return None
+        return PiperEnginePool(
+            piper_path=self.piper_path,
+            work_dir=self.output_dir.resolve(),
+            workers_per_voice=settings.PIPER_WORKERS_PER_VOICE,
+            request_timeout=settings.PIPER_REQUEST_TIMEOUT,
+            idle_timeout=settings.PIPER_WORKER_IDLE_TIMEOUT,
+        )
 
     def _get_audio_duration(self, file_path: str) -> float:
-        """Calculate duration of a WAV file."""
-        try:
-            with contextlib.closing(wave.open(file_path, 'r')) as f:
-                frames = f.getnframes()
-                rate = f.getframerate()
-                return frames / float(rate)
-        except Exception as e:
-            logger.error(f"Error calculating duration for {file_path}: {e}")
-            return 0.0
+        """Calculate duration of an output file (WAV, FLAC or Ogg) from its header."""
+        duration = probe_duration(file_path)
+        if not duration:
+            logger.error(f"Error calculating duration for {file_path}")
+        return duration
+
+    @staticmethod
+    def _voice_view(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape of a voice in the TTS API (language is the full locale, e.g. en_US)."""
+        return {
+            "id": record["id"],
+            "name": record["name"],
+            "language": record["locale"],
+            "quality": record["quality"],
+            "model_path": record["model_path"],
+            "config_path": record["config_path"]
+        }
 
     def get_available_voices(self) -> List[Dict[str, Any]]:
         """
-        Scans the model directory for .onnx files and returns metadata.
+        Lists voices whose model files are installed, from the shared voice registry.
         """
-        voices = []
         if not self.model_dir.exists():
             logger.warning(f"Model directory not found: {self.model_dir}")
-            return voices
-
-        # Walk through the model directory to find .onnx files
-        for root, dirs, files in os.walk(self.model_dir):
-            for file in files:
-                if file.endswith(".onnx"):
-                    model_path = Path(root) / file
-                    config_path = model_path.with_suffix(".onnx.json")
-                    
-                    voice_id = file.replace(".onnx", "")
-                    
-                    voice_data = {
-                        "id": voice_id,
-                        "name": voice_id,
-                        "language": "en_US", # Default
-                        "quality": "medium",
-                        "model_path": str(model_path),
-                        "config_path": str(config_path) if config_path.exists() else None
-                    }
-
-                    # Try to load metadata from JSON
-                    if config_path.exists():
-                        try:
-                            with open(config_path, "r", encoding="utf-8") as f:
-                                config = json.load(f)
-                                # Extract language if available
-                                if "language" in config:
-                                    voice_data["language"] = config["language"].get("code", "en_US")
-                                # Extract simpler name if possible
-                                voice_data["name"] = config.get("dataset", voice_id)
-                        except Exception as e:
-                            logger.error(f"Failed to load config for {voice_id}: {e}")
-
-                    voices.append(voice_data)
-                    self._voice_cache[voice_id] = voice_data
-        
-        return voices
+        return [self._voice_view(record) for record in voice_registry.find(installed_only=True)]
 
     def get_voice_details(self, voice_id: str) -> Optional[Dict[str, Any]]:
-        if not self._voice_cache:
-            self.get_available_voices()
-        return self._voice_cache.get(voice_id)
+        record = voice_registry.get(voice_id)
+        if not record or not record["installed"]:
+            return None
+        return self._voice_view(record)
 
-    async def generate_audio(self, text: str, voice_id: str, speed: float = 1.0) -> Dict[str, Any]:
+    def _resolve_voice(self, voice_id: str) -> Dict[str, Any]:
+        voice = voice_registry.get(voice_id)
+        if not voice or not voice["installed"]:
+            raise ValueError(f"Voice '{voice_id}' not found. Please check available voices.")
+        return voice
+
+    async def warm(self, voice_ids: Optional[List[str]] = None, inference: bool = True) -> List[str]:
+        """
+        Start piper workers for voice_ids (default: the first installed voice)
+        and optionally render a short phrase on each. Returns the voices warmed.
+        """
+        if not voice_ids:
+            voice_ids = [voice["id"] for voice in self.get_available_voices()[:1]]
+        for voice_id in voice_ids:
+            voice = self._resolve_voice(voice_id)
+            if self.engine_pool:
+                await asyncio.to_thread(self.engine_pool.warm, voice["model_path"])
+            if inference:
+                path = (self.output_dir / f"warmup.{uuid.uuid4().hex}.wav").resolve()
+                try:
+                    await asyncio.to_thread(self._synthesize_file, voice["model_path"], WARMUP_TEXT, path, 1.0)
+                finally:
+                    if path.exists():
+                        os.remove(path)
+        return voice_ids
+
+    def _synthesize_file(
+        self,
+        model_path: str,
+        text: str,
+        output_file_path: Path,
+        speed: float,
+        max_workers: Optional[int] = None
+    ):
+        """Run piper for one piece of text, writing a WAV to output_file_path."""
+        length_scale = 1.0 / speed # Piper uses length_scale (inverse of speed)
+        try:
+            if self.engine_pool:
+                self.engine_pool.synthesize(model_path, text, output_file_path, length_scale, max_workers)
+            else:
+                self._run_piper_once(model_path, text, output_file_path, length_scale)
+        except FileNotFoundError:
+             raise RuntimeError("Piper executable not found. Please ensure 'piper' is installed and in PATH.")
+
+        if not output_file_path.exists() or output_file_path.stat().st_size == 0:
+             raise RuntimeError("Piper executed but no audio file was generated.")
+
+    async def generate_audio(
+        self,
+        text: str,
+        voice_id: str,
+        speed: float = 1.0,
+        audio_format: str = "wav",
+        sample_rate: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Synthesizes audio using Piper.
         Returns dictionary with 'path' (relative URL) and 'duration'.
+        Non-default formats/sample rates are derived from the rendered WAV once
+        and cached as their own artifact.
         """
         if not text:
             raise ValueError("Text cannot be empty")
+        if audio_format not in available_formats():
+            raise ValueError(f"Audio format '{audio_format}' is not available. Available: {available_formats()}")
 
-        # Refresh voices if cache is empty or voice not found
-        if not self._voice_cache or voice_id not in self._voice_cache:
-            self.get_available_voices()
+        voice = self._resolve_voice(voice_id)
 
-        voice = self._voice_cache.get(voice_id)
-        if not voice:
-            raise ValueError(f"Voice '{voice_id}' not found. Please check available voices.")
+        variant = None
+        if audio_format != "wav" or sample_rate:
+            variant = f"{audio_format}@{sample_rate or 'native'}"
+            if self.cache:
+                cached_path = self.cache.get(self.cache_key(text, voice, speed, variant))
+                if cached_path:
+                    return self._audio_result(cached_path, cached=True)
+
+        try:
+            base_path, base_cached = await self._render_wav(text, voice, speed)
+            if not variant:
+                return self._audio_result(base_path, cached=base_cached)
+            rendered = await self._render_variant(text, voice, speed, base_path, audio_format, sample_rate, variant)
+            return self._audio_result(rendered)
+        except Exception as e:
+            logger.error(f"Synthesis failed: {e}")
+            raise e
+
+    async def _render_wav(self, text: str, voice: Dict[str, Any], speed: float) -> Tuple[Path, bool]:
+        """Native piper WAV for the text, from the cache when possible. Returns (path, was_cached)."""
+        if not self.cache:
+            # Generate generic filename
+            output_file_path = (self.output_dir / f"{uuid.uuid4()}.wav").resolve()
+            await self._synthesize_text(voice, text, output_file_path, speed)
+            return output_file_path, False
+
+        key = self.cache_key(text, voice, speed)
+        cached_path = self.cache.get(key)
+        if cached_path:
+            return cached_path, True
+
+        # Render to a private temp name, then publish atomically under the content key
+        temp_path = (self.output_dir / f"{key}.{uuid.uuid4().hex}.part").resolve()
+        try:
+            await self._synthesize_text(voice, text, temp_path, speed)
+            return self.cache.put(key, temp_path), False
+        finally:
+            if temp_path.exists():
+                os.remove(temp_path)
+
+    def _plan_segments(self, text: str, voice: Dict[str, Any]) -> List[str]:
+        """
+        Split long text into contiguous, similarly sized segments (at sentence
+        boundaries) that can render in parallel: up to TTS_PARALLEL_SEGMENTS
+        (default: one per core, within the scheduler's global limit), each at
+        least TTS_PARALLEL_MIN_CHARS long. Short text stays a single segment.
+        """
+        limit = settings.TTS_PARALLEL_SEGMENTS or min(os.cpu_count() or 1, self.scheduler.max_concurrency)
+        count = min(limit, len(text) // max(1, settings.TTS_PARALLEL_MIN_CHARS))
+        if count < 2:
+            return [text]
+        return group_sentences(split_sentences(text, language=voice["language"]), count)
+
+    async def _synthesize_text(self, voice: Dict[str, Any], text: str, output_file_path: Path, speed: float):
+        """Render text to one WAV, fanning long text out across workers and stitching the pieces in order."""
+        segments = self._plan_segments(text, voice)
+        if len(segments) < 2:
+            await self.scheduler.run(voice["id"], self._synthesize_file, voice["model_path"], text, output_file_path, speed)
+            return
+
+        # One text's segments may use more slots and workers than the voice's usual limit
+        width = max(len(segments), self.scheduler.per_key_concurrency)
+        tasks = [
+            asyncio.ensure_future(self.scheduler.run_with_limit(
+                voice["id"], width, self._synthesize_pcm, voice["model_path"], segment, speed, width
+            ))
+            for segment in segments
+        ]
+        try:
+            rendered = await asyncio.gather(*tasks)
+        except BaseException:
+            # One segment failed (or the request was cancelled): the others are wasted work
+            for task in tasks:
+                task.cancel()
+            raise
+        logger.info(f"Synthesized {len(text)} chars as {len(segments)} parallel segments")
+        await asyncio.to_thread(self._write_stitched, output_file_path, rendered)
+
+    @staticmethod
+    def _write_stitched(output_file_path: Path, rendered: List[Tuple[Tuple[int, int, int], bytes]]):
+        channels, sample_width, rate = rendered[0][0]
+        if sample_width != 2 or any(params != rendered[0][0] for params, _ in rendered):
+            raise RuntimeError("Piper produced segments in mismatched formats")
+        segments = [np.frombuffer(frames, dtype="<i2").reshape(-1, channels) for _, frames in rendered]
+        write_wav(output_file_path, stitch_segments(segments, rate, settings.TTS_SEGMENT_SILENCE_MS), rate)
+
+    async def _render_variant(
+        self,
+        text: str,
+        voice: Dict[str, Any],
+        speed: float,
+        base_path: Path,
+        audio_format: str,
+        sample_rate: Optional[int],
+        variant: str
+    ) -> Path:
+        """Transcode the native WAV into the requested format/rate (CPU work, so it goes through the scheduler)."""
+        ext = FORMATS[audio_format]["ext"]
+        if not self.cache:
+            output_file_path = (self.output_dir / f"{uuid.uuid4()}.{ext}").resolve()
+            try:
+                await self.scheduler.run(voice["id"], transcode, base_path, output_file_path, audio_format, sample_rate)
+            finally:
+                os.remove(base_path)
+            return output_file_path
+
+        key = self.cache_key(text, voice, speed, variant)
+        temp_path = (self.output_dir / f"{key}.{uuid.uuid4().hex}.part").resolve()
+        try:
+            await self.scheduler.run(voice["id"], transcode, base_path, temp_path, audio_format, sample_rate)
+            return self.cache.put(key, temp_path, ext)
+        finally:
+            if temp_path.exists():
+                os.remove(temp_path)
 
+    def cache_key(self, text: str, voice: Dict[str, Any], speed: float, variant: str = "") -> str:
+        """Content address for a rendering; the registry's model stamp (size + mtime) stands in for its version."""
+        return SynthesisCache.make_key(text, voice["id"], speed, voice.get("model_version") or "unknown", variant)
+
+    def _audio_result(self, output_file_path: Path, cached: bool = False) -> Dict[str, Any]:
+        filename = output_file_path.name
+        return {
+            "filename": filename,
+            "url": f"/outputs/{filename}",
+            "path": str(output_file_path),
+            "duration": self._get_audio_duration(str(output_file_path)),
+            "cached": cached
+        }
+
+    async def generate_batch(
+        self,
+        items: List[Dict[str, Any]],
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Synthesize many items, grouped by voice so each voice's warm workers
+        stay busy on back-to-back jobs. Voices run in parallel; each voice uses
+        as many lanes as its concurrency limit allows. Results come back in
+        input order; a failed item carries an 'error' instead of audio.
+        on_result is called with each result as soon as it is ready, while
+        its file is guaranteed to exist (later items may evict it from the cache).
+        Raises SchedulerSaturatedError if the shared queue turns an item away:
+        the rest of the batch would be shed too, so the caller should back off.
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, item in enumerate(items):
+            groups.setdefault(item["voice_id"], []).append(index)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        # Bound the batch's own footprint so it doesn't flood the shared queue. Slots are
+        # taken per item, so a voice with a long queue doesn't hold one between its items
+        batch_slots = asyncio.Semaphore(self.scheduler.max_concurrency)
+
+        async def lane(queue: List[int]):
+            while queue:
+                index = queue.pop(0)
+                item = items[index]
+                try:
+                    async with batch_slots:
+                        result = await self.generate_audio(
+                            item["text"],
+                            item["voice_id"],
+                            item.get("speed", 1.0),
+                            item.get("format", "wav"),
+                            item.get("sample_rate")
+                        )
+                    results[index] = {"index": index, "voice_id": item["voice_id"], **result}
+                except SchedulerSaturatedError:
+                    raise
+                except Exception as e:
+                    results[index] = {"index": index, "voice_id": item["voice_id"], "error": str(e)}
+                if on_result:
+                    on_result(results[index])
+
+        # Lanes share the voice's work list, so they never exceed its concurrency limit
+        lanes = [
+            asyncio.ensure_future(lane(indices))
+            for indices in groups.values()
+            for _ in range(min(len(indices), self.scheduler.per_key_concurrency))
+        ]
+        try:
+            await asyncio.gather(*lanes)
+        except BaseException:
+            for task in lanes:
+                task.cancel()
+            raise
+
+        logger.info(f"Batch synthesis: {len(items)} items across {len(groups)} voices")
+        return results
+
+    def _synthesize_pcm(
+        self, model_path: str, text: str, speed: float, max_workers: Optional[int] = None
+    ) -> Tuple[Tuple[int, int, int], bytes]:
+        """Synthesize one sentence and return ((channels, sample_width, rate), frames)."""
+        temp_path = (self.output_dir / f"stream_{uuid.uuid4()}.wav").resolve()
+        try:
+            self._synthesize_file(model_path, text, temp_path, speed, max_workers)
+            with contextlib.closing(wave.open(str(temp_path), "rb")) as f:
+                params = (f.getnchannels(), f.getsampwidth(), f.getframerate())
+                return params, f.readframes(f.getnframes())
+        finally:
+            if temp_path.exists():
+                os.remove(temp_path)
+
+    @staticmethod
+    def _wav_stream_header(channels: int, sample_width: int, rate: int) -> bytes:
+        """RIFF header with open-ended sizes, for WAV data whose length isn't known up front."""
+        unknown = 0xFFFFFFFF
+        return (
+            b"RIFF" + struct.pack("<I", unknown) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, rate,
+                                    rate * channels * sample_width, channels * sample_width, sample_width * 8)
+            + b"data" + struct.pack("<I", unknown)
+        )
+
+    async def stream_audio(self, text: str, voice_id: str, speed: float = 1.0) -> AsyncIterator[bytes]:
+        """
+        Synthesize text sentence by sentence, yielding a streamable WAV.
+        The first chunk carries the header plus the first sentence; the next
+        sentence is synthesized while the current one is being sent.
+        """
+        if not text:
+            raise ValueError("Text cannot be empty")
+
+        voice = self._resolve_voice(voice_id)
         model_path = voice["model_path"]
-        
-        # Generate generic filename
-        filename = f"{uuid.uuid4()}.wav"
-        output_file_path = self.output_dir / filename
-        
+
+        cached_path = self.cache.get(self.cache_key(text, voice, speed)) if self.cache else None
+        if cached_path:
+            # File reads go to a thread so a slow disk never stalls the event loop
+            f = await asyncio.to_thread(open, cached_path, "rb")
+            try:
+                while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                    yield chunk
+            finally:
+                f.close()
+            return
+
+        sentences = split_sentences(text, language=voice["language"])
+
+        def synthesize(sentence: str):
+            return asyncio.create_task(self.scheduler.run(voice["id"], self._synthesize_pcm, model_path, sentence, speed))
+
+        pending = synthesize(sentences[0]) if sentences else None
+        header_sent = False
+        try:
+            for index in range(len(sentences)):
+                params, frames = await pending
+                pending = synthesize(sentences[index + 1]) if index + 1 < len(sentences) else None
+                if not header_sent:
+                    header_sent = True
+                    yield self._wav_stream_header(*params) + frames
+                else:
+                    yield frames
+        finally:
+            # Client went away or synthesis failed: don't leave work running
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    def _run_piper_once(self, model_path: str, text: str, output_file_path: Path, length_scale: float):
+        """Cold path: spawn a dedicated piper process for a single synthesis."""
         cmd = [
             self.piper_path,
             "--model", model_path,
             "--output_file", str(output_file_path),
-            "--length_scale", str(1.0 / speed) # Piper uses length_scale (inverse of speed)
+            "--length_scale", str(length_scale)
         ]
 
         logger.info(f"Running synthesis: {' '.join(cmd)}")
+
+        # Piper expects input from stdin
+        process = subprocess.Popen(
+            cmd, 
+            stdin=subprocess.PIPE, 
+            stdout=subprocess.PIPE, 
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        stdout, stderr = process.communicate(input=text)
         
-        try:
-            # Piper expects input from stdin
-            process = subprocess.Popen(
-                cmd, 
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            stdout, stderr = process.communicate(input=text)
-            
-            if process.returncode != 0:
-                logger.error(f"Piper validation error: {stderr}")
-                raise RuntimeError(f"Piper failed: {stderr}")
-                
-            if not output_file_path.exists() or output_file_path.stat().st_size == 0:
-                 raise RuntimeError("Piper executed but no audio file was generated.")
-
-            duration = self._get_audio_duration(str(output_file_path))
-
-            return {
-                "filename": filename,
-                "url": f"/outputs/{filename}",
-                "path": str(output_file_path),
-                "duration": duration
-            }
+        if process.returncode != 0:
+            logger.error(f"Piper validation error: {stderr}")
+            raise RuntimeError(f"Piper failed: {stderr}")
 
-        except FileNotFoundError:
-             raise RuntimeError("Piper executable not found. Please ensure 'piper' is installed and in PATH.")
-        except Exception as e:
-            logger.error(f"Synthesis failed: {e}")
-            raise e
+    def shutdown(self):
+        """
+        Stop the synthesis thread pool and warm piper workers. A new (cold)
+        engine pool replaces the closed one, so the next app startup works.
+        """
+        self.scheduler.shutdown()
+        engine_pool, self.engine_pool = self.engine_pool, self._new_engine_pool()
+        if engine_pool:
+            engine_pool.shutdown()
 
 tts_service = TTSService()
@@ -0,0 +1,354 @@
+"""
+Voice Registry
+Single in-memory index of every voice, merged from the voice manifests and the
+models actually present on disk. Lookups are dictionary hits; the index is
+rebuilt only when a manifest, model or model directory changes on disk.
+Changes are picked up by a background thread, so lookups never scan the disk
+(apart from the first, which builds the index).
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Manifest files, relative to the voice assets root
+MANIFEST_FILES = [
+    "voices.manifest.json",
+    os.path.join("indic", "voices.manifest.json"),
+]
+
+DEFAULT_MANIFEST_VERSION = "v1.0.0"
+
+
+def resolve_model_dir() -> Path:
+    model_dir = Path(settings.MODEL_DIR)
+    if not model_dir.is_absolute():
+        # settings.MODEL_DIR is relative to backend/
+        model_dir = (Path(__file__).parent.parent.parent / settings.MODEL_DIR).resolve()
+    return model_dir
+
+
+def normalize_voice(voice: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize voice data for API response"""
+    return {
+        "id": voice.get("id"),
+        "name": voice.get("name"),
+        "language": voice.get("language", voice.get("locale", "en")[:2]).lower(),
+        "gender": voice.get("gender", "neutral").lower(),
+        "engine": voice.get("engine", "piper").lower(),
+        "accent": voice.get("accent", "").lower(),
+        "style": voice.get("style", "").lower(),
+        "tier": voice.get("tier", "free").lower(),
+        "status": voice.get("status", "ready").lower(),
+        "language_name": voice.get("language_name", voice.get("language", "en").upper())
+    }
+
+
+def validate_no_duplicate_ids(voices: List[Dict]) -> None:
+    """Fail fast if duplicate voice IDs are found"""
+    seen_ids = set()
+    for voice in voices:
+        voice_id = voice.get("id")
+        if voice_id in seen_ids:
+            raise ValueError(f"Duplicate voice ID detected: {voice_id}")
+        seen_ids.add(voice_id)
+
+
+class _Snapshot:
+    """Immutable set of indexes; swapped as a whole on rebuild so readers never see a partial index."""
+
+    def __init__(self):
+        self.version = DEFAULT_MANIFEST_VERSION
+        self.voices: Dict[str, Dict[str, Any]] = {}
+        self.by_id: Dict[str, Dict[str, Any]] = {}  # canonical ids plus model-stem aliases
+        self.by_language: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_locale: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_gender: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_quality: Dict[str, List[Dict[str, Any]]] = {}
+        self.installed: List[Dict[str, Any]] = []
+        self.catalog: List[Dict[str, Any]] = []  # manifest voices marked "ready", normalized
+        self.ready: Dict[str, Dict[str, Any]] = {}  # the catalog by id
+        self.catalog_by_language: Dict[str, List[Dict[str, Any]]] = {}
+        self.languages: List[Dict[str, Any]] = []
+
+
+class VoiceRegistry:
+    """
+    Index of voices keyed by id, language, locale, gender and quality.
+
+    Each record carries both the manifest metadata and what is needed to
+    synthesize (model_path, config_path, sample_rate). Parsed manifests and
+    model configs are cached by mtime so a rebuild only re-reads what changed.
+
+    The first lookup builds the index and starts a daemon thread that checks
+    for changes every refresh_interval seconds (0 disables it; call refresh()
+    instead). A rebuilt index replaces the old one in a single assignment.
+    """
+
+    def __init__(self, root: Path, refresh_interval: float = 5.0):
+        self.root = root.resolve()
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()  # serializes refreshes; lookups never take it
+        self._snapshot: Optional[_Snapshot] = None
+        self._stamps: Optional[Dict[str, int]] = None
+        self._file_cache: Dict[str, Tuple[int, Any]] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.rebuilds = 0
+
+    # --- change detection -------------------------------------------------
+
+    def _collect_stamps(self) -> Dict[str, int]:
+        """mtimes of the manifests, every directory under root, and every model/config file."""
+        stamps: Dict[str, int] = {}
+        for name in MANIFEST_FILES:
+            path = self.root / name
+            try:
+                stamps[str(path)] = path.stat().st_mtime_ns
+            except OSError:
+                stamps[str(path)] = -1
+        if not self.root.exists():
+            return stamps
+        # Directory mtimes catch files being added, removed or renamed
+        for dirpath, _, files in os.walk(self.root):
+            try:
+                stamps[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            for file in files:
+                if file.endswith(".onnx") or file.endswith(".onnx.json"):
+                    path = os.path.join(dirpath, file)
+                    try:
+                        stamps[path] = os.stat(path).st_mtime_ns
+                    except OSError:
+                        pass
+        return stamps
+
+    def refresh(self) -> bool:
+        """Rebuild the index if anything changed on disk. Returns whether it did."""
+        with self._lock:
+            stamps = self._collect_stamps()
+            if stamps == self._stamps:
+                return False
+            self._snapshot = self._build(stamps)
+            self._stamps = stamps
+            self.rebuilds += 1
+            return True
+
+    def invalidate(self):
+        """Check for changes now instead of waiting for the refresher."""
+        self.refresh()
+
+    def _refresh_loop(self):
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good index
+                logger.error(f"Voice registry refresh failed: {e}")
+
+    def _start(self):
+        with self._lock:
+            if self._refresher is not None or self.refresh_interval <= 0 or self._stopped.is_set():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="voice-registry", daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        """Stop the background refresher."""
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+
+    # --- building ---------------------------------------------------------
+
+    def _read_json(self, path: str, mtime_ns: int) -> Any:
+        cached = self._file_cache.get(path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._file_cache[path] = (mtime_ns, data)
+        return data
+
+    def _model_info(self, model_path: Path, stamps: Dict[str, int]) -> Dict[str, Any]:
+        """On-disk facts about a model: presence, version stamp and piper config."""
+        info: Dict[str, Any] = {"installed": False, "model_version": None, "config": None}
+        mtime = stamps.get(str(model_path))
+        if mtime is None:
+            return info
+        info["installed"] = True
+        try:
+            info["model_version"] = f"{model_path.stat().st_size}-{mtime}"
+        except OSError:
+            info["model_version"] = str(mtime)
+        config_path = model_path.with_suffix(".onnx.json")
+        config_mtime = stamps.get(str(config_path))
+        if config_mtime is not None:
+            try:
+                info["config"] = self._read_json(str(config_path), config_mtime)
+                info["config_path"] = str(config_path)
+            except Exception as e:
+                logger.error(f"Failed to load config for {model_path.name}: {e}")
+        return info
+
+    def _build(self, stamps: Dict[str, int]) -> _Snapshot:
+        snapshot = _Snapshot()
+        manifest_voices: List[Dict[str, Any]] = []
+        version_found = False
+
+        for name in MANIFEST_FILES:
+            path = self.root / name
+            mtime = stamps.get(str(path), -1)
+            if mtime < 0:
+                continue
+            try:
+                manifest = self._read_json(str(path), mtime)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse manifest {path}: {e}")
+                continue
+            except Exception as e:
+                logger.warning(f"Error loading manifest {path}: {e}")
+                continue
+            if "version" in manifest and not version_found:
+                snapshot.version = manifest["version"]
+                version_found = True
+            manifest_voices.extend(manifest.get("voices", []))
+
+        # Fail fast on conflicting manifests
+        validate_no_duplicate_ids(manifest_voices)
+
+        referenced_models = set()
+        for entry in manifest_voices:
+            record = normalize_voice(entry)
+            record["locale"] = entry.get("locale", record["language"])
+            record["quality"] = entry.get("quality", "medium").lower()
+            record["model_path"] = None
+            record["config_path"] = None
+            record["installed"] = False
+            record["model_version"] = None
+            record["sample_rate"] = None
+            record["aliases"] = []
+            model_file = entry.get("model_file")
+            if model_file:
+                model_path = (self.root / model_file).resolve()
+                referenced_models.add(str(model_path))
+                info = self._model_info(model_path, stamps)
+                record["model_path"] = str(model_path)
+                record["config_path"] = info.get("config_path")
+                record["installed"] = info["installed"]
+                record["model_version"] = info["model_version"]
+                if info["config"]:
+                    record["sample_rate"] = info["config"].get("audio", {}).get("sample_rate")
+                # Older clients address voices by model file stem
+                record["aliases"].append(model_path.name[:-len(".onnx")])
+            snapshot.voices[record["id"]] = record
+            # Only voices a manifest explicitly marks ready are offered
+            if str(entry.get("status", "")).lower() == "ready":
+                normalized = normalize_voice(entry)
+                snapshot.catalog.append(normalized)
+                snapshot.ready[normalized["id"]] = normalized
+                snapshot.catalog_by_language.setdefault(normalized["language"], []).append(normalized)
+
+        # Models on disk that no manifest describes
+        for path in sorted(stamps):
+            if not path.endswith(".onnx") or path in referenced_models:
+                continue
+            model_path = Path(path)
+            voice_id = model_path.name[:-len(".onnx")]
+            if voice_id in snapshot.voices:
+                continue
+            info = self._model_info(model_path, stamps)
+            config = info["config"] or {}
+            locale = config.get("language", {}).get("code", "en_US")
+            record = normalize_voice({
+                "id": voice_id,
+                "name": config.get("dataset", voice_id),
+                "locale": locale,
+                "language": locale.split("_")[0],
+            })
+            record.update({
+                "locale": locale,
+                "quality": config.get("audio", {}).get("quality", "medium"),
+                "model_path": str(model_path),
+                "config_path": info.get("config_path"),
+                "installed": True,
+                "model_version": info["model_version"],
+                "sample_rate": config.get("audio", {}).get("sample_rate"),
+                "aliases": [],
+            })
+            snapshot.voices[voice_id] = record
+
+        for record in snapshot.voices.values():
+            snapshot.by_id[record["id"]] = record
+            for alias in record["aliases"]:
+                snapshot.by_id.setdefault(alias, record)
+            snapshot.by_language.setdefault(record["language"], []).append(record)
+            snapshot.by_locale.setdefault(record["locale"].lower(), []).append(record)
+            snapshot.by_gender.setdefault(record["gender"], []).append(record)
+            snapshot.by_quality.setdefault(record["quality"], []).append(record)
+            if record["installed"]:
+                snapshot.installed.append(record)
+
+        languages: Dict[str, Dict[str, Any]] = {}
+        for voice in snapshot.catalog:
+            code, name = voice.get("language"), voice.get("language_name")
+            if not code or not name:
+                continue
+            languages.setdefault(code, {"code": code, "name": name, "voices_count": 0})
+            languages[code]["voices_count"] += 1
+        snapshot.languages = sorted(languages.values(), key=lambda x: x["name"])
+
+        logger.info(
+            f"Voice registry built: {len(snapshot.voices)} voices, "
+            f"{len(snapshot.installed)} installed, root={self.root}"
+        )
+        return snapshot
+
+    # --- lookups ----------------------------------------------------------
+
+    def snapshot(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            self._start()
+            snapshot = self._snapshot
+        return snapshot
+
+    def get(self, voice_id: str) -> Optional[Dict[str, Any]]:
+        """Full record by id or model-stem alias."""
+        return self.snapshot().by_id.get(voice_id)
+
+    def find(
+        self,
+        language: Optional[str] = None,
+        locale: Optional[str] = None,
+        gender: Optional[str] = None,
+        quality: Optional[str] = None,
+        installed_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Voices matching every given attribute, in registry order."""
+        snap = self.snapshot()
+        candidates = snap.installed if installed_only else list(snap.voices.values())
+        filters = [
+            (snap.by_language, language),
+            (snap.by_locale, locale.lower() if locale else None),
+            (snap.by_gender, gender.lower() if gender else None),
+            (snap.by_quality, quality.lower() if quality else None),
+        ]
+        for index, value in filters:
+            if value is None:
+                continue
+            allowed = {id(r) for r in index.get(value.lower(), [])}
+            candidates = [r for r in candidates if id(r) in allowed]
+        return candidates
+
+
+voice_registry = VoiceRegistry(resolve_model_dir(), refresh_interval=settings.VOICE_REGISTRY_REFRESH_INTERVAL)
@@ -0,0 +1,92 @@
+"""
+Startup Warm-up
+Loads the configured models before the replica reports ready, so the first
+real request doesn't pay for process start, model load and first-inference
+allocations. Liveness is unaffected: the server answers /health/live while
+this runs and /health/ready flips once every engine has loaded. A replica
+whose engine failed to load stays unready unless WARMUP_ALLOW_DEGRADED is set.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.stt_service import stt_service
+from app.services.tts_service import tts_service
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Whether this replica should receive traffic, with the outcome of each warm-up step."""
+
+    def __init__(self):
+        self.ready = False
+        self.finished = False
+        self.checks: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def failed(self) -> List[str]:
+        return [name for name, check in self.checks.items() if check.startswith("failed")]
+
+    def status(self) -> Dict[str, Any]:
+        if not self.finished:
+            status = "ready" if self.ready else "warming_up"
+        elif self.failed():
+            status = "degraded" if self.ready else "failed"
+        else:
+            status = "ready" if self.ready else "stopping"
+        return {
+            "status": status,
+            "checks": dict(self.checks),
+            "warmup_seconds": self.warmup_seconds,
+        }
+
+
+readiness = Readiness()
+
+
+def _preload_voices() -> Optional[List[str]]:
+    """Voice ids from PRELOAD_VOICES; None means the first installed voice."""
+    value = settings.PRELOAD_VOICES.strip()
+    if value == "*":
+        return [voice["id"] for voice in tts_service.get_available_voices()]
+    return [v.strip() for v in value.split(",") if v.strip()] or None
+
+
+async def warm_up(state: Readiness = readiness):
+    """
+    Preload the default STT model and the configured TTS voices, then mark
+    the replica ready. A failing step is logged and reported in the checks
+    and keeps the replica unready, unless WARMUP_ALLOW_DEGRADED lets the
+    engines that did load serve on their own.
+    """
+    state.started_at = time.monotonic()
+    inference = settings.WARMUP_INFERENCE
+
+    state.checks["stt"] = "warming_up"
+    try:
+        await stt_service.warm(inference=inference)
+        state.checks["stt"] = "ready"
+    except Exception as e:
+        logger.error(f"STT warm-up failed: {e}")
+        state.checks["stt"] = f"failed: {e}"
+
+    state.checks["tts"] = "warming_up"
+    try:
+        voices = await tts_service.warm(_preload_voices(), inference=inference)
+        state.checks["tts"] = "ready" if voices else "no voices installed"
+    except Exception as e:
+        logger.error(f"TTS warm-up failed: {e}")
+        state.checks["tts"] = f"failed: {e}"
+
+    state.warmup_seconds = round(time.monotonic() - state.started_at, 2)
+    state.finished = True
+    failed = state.failed()
+    state.ready = not failed or settings.WARMUP_ALLOW_DEGRADED
+    if failed and not state.ready:
+        logger.error(f"Warm-up failed for {', '.join(failed)}; staying unready: {state.checks}")
+    else:
+        logger.info(f"Warm-up finished in {state.warmup_seconds}s: {state.checks}")
@@ -0,0 +1,71 @@
+"""
+Stub Piper
+Offline stand-in for the piper binary, for benchmarks and tests. Speaks both
+the one-shot mode (--output_file, text on stdin) and the JSON-input mode used
+by the engine pool, and writes a 22.05 kHz mono WAV whose length tracks the
+input text.
+
+Timing is simulated so latency scales like the real engine:
+  STUB_PIPER_LOAD_SECONDS  model load time at process start (default 0.5)
+  STUB_PIPER_RTF           synthesis seconds per second of audio (default 0.05)
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import wave
+
+SAMPLE_RATE = 22050
+
+# Roughly the speaking rate of the medium-quality voices
+SECONDS_PER_CHAR = 0.065
+
+EDGE_SILENCE_SECONDS = 0.2
+
+
+def _tone(frames: int) -> bytes:
+    period = [int(6000 * math.sin(2 * math.pi * i / 100)).to_bytes(2, "little", signed=True) for i in range(100)]
+    cycle = b"".join(period)
+    return (cycle * (frames // 100 + 1))[:frames * 2]
+
+
+def write_wav(path: str, text: str, length_scale: float):
+    speech_seconds = max(0.1, len(text) * SECONDS_PER_CHAR * length_scale)
+    rtf = float(os.environ.get("STUB_PIPER_RTF", "0.05"))
+    time.sleep(speech_seconds * rtf)
+    silence = b"\0\0" * int(SAMPLE_RATE * EDGE_SILENCE_SECONDS)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(silence + _tone(int(SAMPLE_RATE * speech_seconds)) + silence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub piper for offline benchmarks")
+    parser.add_argument("--model", "-m")
+    parser.add_argument("--output_file", "-f")
+    parser.add_argument("--output_dir", "-d")
+    parser.add_argument("--length_scale", type=float, default=1.0)
+    parser.add_argument("--json-input", action="store_true")
+    args, _ = parser.parse_known_args()
+
+    if args.model and not os.path.exists(args.model):
+        print(f"Model not found: {args.model}", file=sys.stderr)
+        sys.exit(1)
+    time.sleep(float(os.environ.get("STUB_PIPER_LOAD_SECONDS", "0.5")))
+
+    if args.json_input:
+        for line in sys.stdin:
+            request = json.loads(line)
+            write_wav(request["output_file"], request["text"], args.length_scale)
+            print(request["output_file"], flush=True)
+    else:
+        write_wav(args.output_file, sys.stdin.read(), args.length_scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+TTS Benchmark
+Runs the docs/PERFORMANCE.md test matrix (11 to 5000 characters) against
+TTSService directly or through the /tts/synthesize endpoint, for one or more
+voices, and reports cold/warm latency percentiles, real-time factor and
+throughput as JSON. Results can be compared against a stored baseline.
+
+Run from backend/:
+    python -m benchmarks.tts_benchmark --stub
+    python -m benchmarks.tts_benchmark --target api --voices en_US-lessac-medium -o results.json
+    python -m benchmarks.tts_benchmark --target api --base-url http://localhost:8000
+    python -m benchmarks.tts_benchmark --stub --baseline benchmarks/baseline.json
+
+Exits with status 1 when a metric regresses beyond --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+STUB_PIPER = BENCHMARK_DIR / "stub_piper.py"
+
+# Test matrix from docs/PERFORMANCE.md: case name -> characters
+CASES = {
+    "short": 11,
+    "medium": 100,
+    "target": 500,
+    "long": 1000,
+    "max": 5000,
+}
+
+# p95 goals (seconds) from docs/PERFORMANCE.md; anything slower than ALERT_SECONDS is flagged
+GOALS = {"target": 3.0}
+ALERT_SECONDS = 5.0
+
+PASSAGE = (
+    "The quick brown fox jumps over the lazy dog. Speech synthesis turns written "
+    "text into natural sounding audio, one sentence at a time. Good voices keep a "
+    "steady rhythm, pause at commas, and lift their pitch at the end of a question? "
+    "Long passages are split into sentences, rendered, and joined back together. "
+)
+
+# (metric path, higher_is_worse)
+COMPARED_METRICS = [
+    ("warm.p95", True),
+    ("warm.p50", True),
+    ("cold_s", True),
+    ("rtf_p50", True),
+    ("throughput.requests_per_s", False),
+]
+
+STUB_VOICE_CONFIG = {
+    "audio": {"sample_rate": 22050, "quality": "medium"},
+    "language": {"code": "en_US"},
+}
+
+
+def make_text(chars: int) -> str:
+    """Deterministic benchmark text of exactly `chars` characters."""
+    if chars == 11:
+        return "Hello world"
+    text = PASSAGE * (chars // len(PASSAGE) + 1)
+    return text[:chars].rstrip().ljust(chars, ".")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(sum(values) / len(values), 4),
+        "min": round(min(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def prepare_stub(work_dir: Path, voices: List[str]) -> Tuple[Path, Path]:
+    """Create a `piper` launcher for the stub plus a model directory with placeholder voices."""
+    bin_dir = work_dir / "bin"
+    model_dir = work_dir / "models"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    if os.name == "nt":
+        (bin_dir / "piper.bat").write_text(f'@"{sys.executable}" "{STUB_PIPER}" %*\n')
+    else:
+        launcher = bin_dir / "piper"
+        launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{STUB_PIPER}" "$@"\n')
+        launcher.chmod(0o755)
+    for voice in voices:
+        (model_dir / f"{voice}.onnx").write_bytes(b"stub")
+        (model_dir / f"{voice}.onnx.json").write_text(json.dumps(STUB_VOICE_CONFIG))
+    return bin_dir, model_dir
+
+
+class ServiceTarget:
+    """Calls TTSService in-process."""
+
+    name = "service"
+
+    def __init__(self, service):
+        self.service = service
+
+    def reset(self) -> bool:
+        """Drop warm engines so the next request is cold. Returns False if that isn't possible."""
+        if self.service.engine_pool:
+            self.service.engine_pool.stop_idle()
+        return True
+
+    def voices(self) -> List[str]:
+        return [voice["id"] for voice in self.service.get_available_voices()]
+
+    async def synthesize(self, text: str, voice_id: str) -> float:
+        result = await self.service.generate_audio(text, voice_id)
+        if not result.get("cached"):
+            Path(result["path"]).unlink(missing_ok=True)
+        return result["duration"]
+
+    async def close(self):
+        self.service.shutdown()
+
+
+class ApiTarget:
+    """Calls POST /tts/synthesize, in-process over ASGI or against a running server."""
+
+    name = "api"
+
+    def __init__(self, base_url: Optional[str], api_prefix: str):
+        import httpx
+
+        self.service = None
+        if base_url:
+            self.client = httpx.AsyncClient(base_url=base_url, timeout=300)
+        else:
+            from app.main import app
+            from app.services.tts_service import tts_service
+
+            self.service = tts_service
+            self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300)
+        self.prefix = f"{api_prefix}/tts"
+
+    def reset(self) -> bool:
+        if self.service is None:
+            return False
+        if self.service.engine_pool:
+            self.service.engine_pool.stop_idle()
+        return True
+
+    async def fetch_voices(self) -> List[str]:
+        response = await self.client.get(f"{self.prefix}/voices")
+        response.raise_for_status()
+        return [voice["id"] for voice in response.json()]
+
+    async def synthesize(self, text: str, voice_id: str) -> float:
+        response = await self.client.post(f"{self.prefix}/synthesize", json={"text": text, "voice_id": voice_id})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        body = response.json()
+        if self.service is not None and not body.get("cached"):
+            (self.service.output_dir / Path(body["audio_url"]).name).unlink(missing_ok=True)
+        return body["duration"]
+
+    async def close(self):
+        await self.client.aclose()
+        if self.service is not None:
+            self.service.shutdown()
+
+
+async def timed(target, text: str, voice_id: str) -> Tuple[float, float]:
+    """(latency seconds, audio seconds) for one request."""
+    start = time.perf_counter()
+    audio_seconds = await target.synthesize(text, voice_id)
+    return time.perf_counter() - start, audio_seconds
+
+
+async def run_case(target, voice_id: str, case: str, chars: int, args) -> Dict[str, Any]:
+    text = make_text(chars)
+    result: Dict[str, Any] = {"target": target.name, "voice": voice_id, "case": case, "chars": chars, "errors": 0}
+
+    try:
+        cold_reset = target.reset()
+        cold_latency, _ = await timed(target, text, voice_id)
+        for _ in range(args.warmup):
+            await timed(target, text, voice_id)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    result["cold_s"] = round(cold_latency, 4)
+    result["cold_reset"] = cold_reset
+
+    latencies, rtfs, audio = [], [], []
+    for _ in range(args.iterations):
+        try:
+            latency, audio_seconds = await timed(target, text, voice_id)
+        except Exception:
+            result["errors"] += 1
+            continue
+        latencies.append(latency)
+        audio.append(audio_seconds)
+        if audio_seconds:
+            rtfs.append(latency / audio_seconds)
+    if not latencies:
+        result["error"] = "all warm requests failed"
+        return result
+
+    result["iterations"] = len(latencies)
+    result["warm"] = summarize(latencies)
+    result["audio_seconds"] = round(sum(audio) / len(audio), 4)
+    result["rtf_p50"] = round(percentile(rtfs, 50), 4) if rtfs else None
+
+    if args.concurrency > 0:
+        result["throughput"] = await run_throughput(target, text, voice_id, args.concurrency, args.iterations)
+        result["errors"] += result["throughput"].pop("errors")
+
+    goal = GOALS.get(case)
+    result["goal_p95_s"] = goal
+    result["meets_goal"] = result["warm"]["p95"] <= goal if goal else None
+    result["alert"] = result["warm"]["max"] > ALERT_SECONDS
+    return result
+
+
+async def run_throughput(target, text: str, voice_id: str, concurrency: int, rounds: int) -> Dict[str, Any]:
+    """Keep `concurrency` requests in flight for concurrency * rounds requests."""
+    total = concurrency * rounds
+    slots = asyncio.Semaphore(concurrency)
+    completed: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with slots:
+            try:
+                completed.append(await target.synthesize(text, voice_id))
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(completed),
+        "wall_s": round(wall, 4),
+        "requests_per_s": round(len(completed) / wall, 4),
+        "audio_seconds_per_s": round(sum(completed) / wall, 4),
+        "chars_per_s": round(len(completed) * len(text) / wall, 1),
+        "errors": errors,
+    }
+
+
+def _metric(result: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = result
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare matching (target, voice, case) results. A metric regresses when it is
+    worse than the baseline by more than `tolerance` (a fraction, 0.2 = 20%).
+    """
+    def keyed(report):
+        return {(r["target"], r["voice"], r["case"]): r for r in report.get("results", [])}
+
+    previous = keyed(baseline)
+    rows = []
+    for key, result in keyed(current).items():
+        if key not in previous:
+            continue
+        for path, higher_is_worse in COMPARED_METRICS:
+            new, old = _metric(result, path), _metric(previous[key], path)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            worse = change if higher_is_worse else -change
+            status = "regression" if worse > tolerance else "improved" if worse < -tolerance else "ok"
+            rows.append({
+                "target": key[0], "voice": key[1], "case": key[2], "metric": path,
+                "baseline": old, "current": new, "change": round(change, 4), "status": status,
+            })
+    return rows
+
+
+def print_report(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]]):
+    out = sys.stderr
+    print(
+        f"{'voice':<28} {'case':<7} {'chars':>5} {'cold':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'rtf':>6} {'req/s':>7}",
+        file=out,
+    )
+    for r in report["results"]:
+        if "error" in r:
+            print(f"{r['voice']:<28} {r['case']:<7} {r['chars']:>5}  ERROR: {r['error']}", file=out)
+            continue
+        rps = r.get("throughput", {}).get("requests_per_s", "-")
+        flag = " FAILS GOAL" if r["meets_goal"] is False else ""
+        flag += " SLOW" if r["alert"] else ""
+        print(
+            f"{r['voice']:<28} {r['case']:<7} {r['chars']:>5} {r['cold_s']:>7.3f} {r['warm']['p50']:>7.3f} "
+            f"{r['warm']['p95']:>7.3f} {r['warm']['p99']:>7.3f} {r['rtf_p50'] or 0:>6.3f} {rps:>7}{flag}",
+            file=out,
+        )
+    if comparison is not None:
+        regressions = [row for row in comparison if row["status"] == "regression"]
+        print(f"\nBaseline comparison: {len(comparison)} metrics, {len(regressions)} regressions", file=out)
+        for row in regressions:
+            print(
+                f"  REGRESSION {row['voice']}/{row['case']} {row['metric']}: "
+                f"{row['baseline']} -> {row['current']} ({row['change']:+.0%})",
+                file=out,
+            )
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark TTS synthesis across the PERFORMANCE.md matrix")
+    parser.add_argument("--target", choices=["service", "api"], default="service",
+                        help="Call TTSService directly or go through POST /tts/synthesize")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of an in-process app (api target)")
+    parser.add_argument("--voices", help="Comma-separated voice ids (default: every installed voice)")
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help="Comma-separated case names or character counts")
+    parser.add_argument("--iterations", type=int, default=5, help="Measured warm requests per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests after the cold one")
+    parser.add_argument("--concurrency", type=int, default=4, help="In-flight requests for throughput (0 to skip)")
+    parser.add_argument("--stub", action="store_true", help="Use the stub piper and placeholder voices (offline)")
+    parser.add_argument("--stub-voices", type=int, default=1, help="Placeholder voices to create with --stub")
+    parser.add_argument("--stub-load-seconds", type=float, default=0.5, help="Simulated model load time")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="Simulated real-time factor")
+    parser.add_argument("--with-cache", action="store_true", help="Leave the synthesis cache on (measures hits)")
+    parser.add_argument("--output", "-o", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (fraction)")
+    return parser.parse_args(argv)
+
+
+def resolve_cases(spec: str) -> Dict[str, int]:
+    cases = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        if item in CASES:
+            cases[item] = CASES[item]
+        elif item.isdigit():
+            cases[f"{item}c"] = int(item)
+        else:
+            raise SystemExit(f"Unknown case '{item}'. Use one of {list(CASES)} or a character count.")
+    return cases
+
+
+async def run(args, stub_voices: List[str]) -> Dict[str, Any]:
+    if args.target == "service":
+        from app.services.tts_service import tts_service
+
+        target = ServiceTarget(tts_service)
+        available = target.voices()
+    else:
+        from app.core.config import settings
+
+        target = ApiTarget(args.base_url, settings.API_V1_STR)
+        available = await target.fetch_voices()
+
+    try:
+        voices = [v.strip() for v in args.voices.split(",")] if args.voices else (stub_voices or available)
+        missing = [v for v in voices if v not in available]
+        if missing:
+            raise SystemExit(f"Voices not installed: {missing}. Available: {available}")
+        if not voices:
+            raise SystemExit("No voices installed. Use --stub to benchmark offline.")
+
+        results = []
+        for voice_id in voices:
+            for case, chars in resolve_cases(args.cases).items():
+                results.append(await run_case(target, voice_id, case, chars, args))
+    finally:
+        await target.close()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "target": args.target,
+            "base_url": args.base_url,
+            "stub": args.stub,
+            "cache": args.with_cache,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    resolve_cases(args.cases)
+
+    # Settings are read at import time, so the environment must be ready before app modules load
+    stub_voices: List[str] = []
+    work_dir = None
+    if args.stub:
+        work_dir = tempfile.TemporaryDirectory(prefix="tts-bench-")
+        stub_voices = [f"stub_voice_{i}" for i in range(args.stub_voices)]
+        bin_dir, model_dir = prepare_stub(Path(work_dir.name), stub_voices)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+        os.environ["MODEL_DIR"] = str(model_dir)
+        os.environ["STUB_PIPER_LOAD_SECONDS"] = str(args.stub_load_seconds)
+        os.environ["STUB_PIPER_RTF"] = str(args.stub_rtf)
+    if not args.with_cache:
+        os.environ["TTS_CACHE_ENABLED"] = "false"
+
+    try:
+        report = asyncio.run(run(args, stub_voices))
+    finally:
+        if work_dir is not None:
+            work_dir.cleanup()
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            comparison = compare(report, json.load(f), args.tolerance)
+        report["comparison"] = comparison
+
+    print_report(report, comparison)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+    if comparison and any(row["status"] == "regression" for row in comparison):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
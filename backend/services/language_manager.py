@@ -1,5 +1,9 @@
 import re
-from typing import Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional
+from app.core.config import settings
+from app.services.llm.base import is_error_reply
+from app.services.text import split_sentences
+from .translation_memory import TranslationMemory, get_translation_memory
 from .voice_loader import get_voice_by_id
 
 # Regex patterns for different scripts
@@ -114,13 +118,16 @@ Rules:
 Return only the translated text.
 """
 
-def get_strict_translation(llm_service, text: str, source_lang: str, target_lang: str) -> str:
-    """
-    Call LLM with strict translation prompt.
-    """
-    if not llm_service:
-        return text
-        
+NUMBERED_TRANSLATION_PROMPT = STRICT_TRANSLATION_PROMPT.replace(
+    "Return only the translated text.",
+    "- Each numbered line is one sentence; translate it on its own\n"
+    "Return one line per sentence as [number] translation, in the same order, and nothing else."
+)
+
+# A line of the numbered reply: "[3] translated sentence"
+NUMBERED_LINE = re.compile(r"^\s*\[(\d+)\]\s*(.*?)\s*$")
+
+def _translate(llm_service, text: str, source_lang: str, target_lang: str) -> str:
     prompt = STRICT_TRANSLATION_PROMPT.format(
         source_language=source_lang,
         target_language=target_lang
@@ -131,3 +138,113 @@ def get_strict_translation(llm_service, text: str, source_lang: str, target_lang
     
     translated = llm_service.generate(full_prompt).strip()
     return translated
+
+def _translate_numbered(llm_service, sentences: List[str], source_lang: str, target_lang: str) -> Optional[List[str]]:
+    """
+    Translate several sentences in one request. Returns the translations in
+    order, the provider's error as a one-item list, or None when the reply
+    doesn't map back onto the sentences one to one.
+    """
+    prompt = NUMBERED_TRANSLATION_PROMPT.format(
+        source_language=source_lang,
+        target_language=target_lang
+    )
+    numbered = "\n".join(f"[{i}] {sentence}" for i, sentence in enumerate(sentences, 1))
+    reply = llm_service.generate(f"{prompt}\n\nTEXT TO TRANSLATE:\n{numbered}").strip()
+    if not _rememberable(reply):
+        return [reply]
+
+    translations: Dict[int, str] = {}
+    for line in reply.splitlines():
+        if not line.strip():
+            continue
+        match = NUMBERED_LINE.match(line)
+        if not match or not match.group(2) or int(match.group(1)) in translations:
+            return None
+        translations[int(match.group(1))] = match.group(2)
+    if sorted(translations) != list(range(1, len(sentences) + 1)):
+        return None
+    return [translations[i] for i in range(1, len(sentences) + 1)]
+
+def _model_id(llm_service) -> str:
+    """Which model translated: translations from different models are remembered separately."""
+    provider = getattr(llm_service, "provider_name", None) or type(llm_service).__name__
+    model = getattr(llm_service, "model", None)
+    return f"{provider}:{model}" if model else str(provider)
+
+def _rememberable(translation: str) -> bool:
+    # Providers report failures as text; never store those as translations
+    return bool(translation) and not is_error_reply(translation)
+
+def _translate_by_sentence(
+    llm_service,
+    memory: TranslationMemory,
+    text: str,
+    source_lang: str,
+    target_lang: str,
+    model: str
+) -> Optional[str]:
+    """
+    Reuse remembered sentences of a partly known text and send only the new
+    ones to the LLM, together in one request. None when no sentence is known,
+    or when the reply can't be split back into sentences or comes back empty:
+    the caller then translates the whole text in one call.
+    If the request fails, the provider's error is returned on its own, so
+    it is neither stored nor mixed into a joined translation.
+    """
+    lines: List[List[str]] = [
+        split_sentences(line, max_chars=max(1, len(line)), language=source_lang)
+        for line in text.splitlines()
+    ]
+    sentences = list(dict.fromkeys(sentence for line in lines for sentence in line))
+    if len(sentences) < 2:
+        return None
+
+    known = {sentence: memory.get(sentence, source_lang, target_lang, model) for sentence in sentences}
+    if all(translation is None for translation in known.values()):
+        return None
+    unknown = [sentence for sentence in sentences if known[sentence] is None]
+    if len(unknown) == 1:
+        translations = [_translate(llm_service, unknown[0], source_lang, target_lang)]
+    elif unknown:
+        translations = _translate_numbered(llm_service, unknown, source_lang, target_lang)
+        if translations is None:
+            return None
+    else:
+        translations = []
+    if len(translations) != len(unknown) or not all(_rememberable(t) for t in translations):
+        # The provider's error (a failed request answers with a single error text);
+        # an empty reply is no error, so fall back to translating the whole text
+        return next((t for t in translations if t and is_error_reply(t)), None)
+    for sentence, translation in zip(unknown, translations):
+        memory.put(sentence, source_lang, target_lang, model, translation)
+        known[sentence] = translation
+    return "\n".join(" ".join(known[sentence] for sentence in line) for line in lines if line)
+
+def get_strict_translation(llm_service, text: str, source_lang: str, target_lang: str) -> str:
+    """
+    Call LLM with strict translation prompt.
+    Translations are remembered per (text, languages, model); a text seen
+    before is answered from the translation memory without calling the LLM,
+    and a partly known one only sends its new sentences.
+    """
+    if not llm_service:
+        return text
+
+    memory = get_translation_memory()
+    if memory is None:
+        return _translate(llm_service, text, source_lang, target_lang)
+
+    model = _model_id(llm_service)
+    remembered = memory.get(text, source_lang, target_lang, model)
+    if remembered is not None:
+        return remembered
+
+    translated = None
+    if settings.TRANSLATION_MEMORY_SENTENCES:
+        translated = _translate_by_sentence(llm_service, memory, text, source_lang, target_lang, model)
+    if translated is None:
+        translated = _translate(llm_service, text, source_lang, target_lang)
+    if _rememberable(translated):
+        memory.put(text, source_lang, target_lang, model, translated)
+    return translated
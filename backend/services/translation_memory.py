@@ -0,0 +1,143 @@
+"""
+Translation Memory
+Stores strict translations keyed by (normalized text, source language, target
+language, model) so repeated strings never go back to the LLM. An in-process
+LRU sits in front of a local SQLite table that survives restarts and is
+shared by every worker on the host.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.services.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the key layout changes so old rows stop matching
+MEMORY_KEY_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    model TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class TranslationMemory:
+    """
+    LRU of up to max_entries translations in memory over a SQLite store at
+    db_path (":memory:" or "" for a memory-only store). Safe to share
+    between threads.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 4096):
+        self.db_path = db_path or ":memory:"
+        self.max_entries = max(1, max_entries)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        if self.db_path != ":memory:":
+            # Readers don't block the writer; several processes may share the file
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    @staticmethod
+    def make_key(text: str, source_lang: str, target_lang: str, model: str) -> str:
+        material = "\x1f".join([
+            MEMORY_KEY_VERSION,
+            normalize_text(text),
+            source_lang.lower(),
+            target_lang.lower(),
+            model,
+        ])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, source_lang: str, target_lang: str, model: str) -> Optional[str]:
+        key = self.make_key(text, source_lang, target_lang, model)
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return translation
+            row = self._db.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE translations SET used_at = ?, uses = uses + 1 WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.db_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, text: str, source_lang: str, target_lang: str, model: str, translation: str):
+        key = self.make_key(text, source_lang, target_lang, model)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations "
+                "(key, source_lang, target_lang, model, source_text, translation, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source_lang.lower(), target_lang.lower(), model, normalize_text(text), translation, now, now),
+            )
+            self._db.commit()
+            self._remember(key, translation)
+
+    def _remember(self, key: str, translation: str):
+        """Insert into the LRU, dropping the least recently used. Caller holds the lock."""
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "stored": stored,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_memory: Optional[TranslationMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> Optional[TranslationMemory]:
+    """Process-wide translation memory, opened on first use (None when disabled)."""
+    global _memory
+    if not settings.TRANSLATION_MEMORY_ENABLED:
+        return None
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemory(settings.TRANSLATION_MEMORY_DB, settings.TRANSLATION_MEMORY_MAX_ENTRIES)
+            logger.info(f"Translation memory opened at {_memory.db_path}")
+        return _memory
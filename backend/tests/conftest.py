@@ -0,0 +1,39 @@
+"""
+Shared fixtures.
+"""
+import pytest
+
+from app.services.scheduler import AdmissionScheduler
+from app.services.tts_service import tts_service
+
+
+@pytest.fixture
+def fake_piper(monkeypatch, tmp_path):
+    """
+    Runs tts_service without piper or installed voices. Call the returned
+    function with the voices to accept (id -> language), a render(model_path,
+    text, output_file_path) that stands in for piper, the scheduler limits and
+    an optional cache. Output goes to tmp_path.
+    """
+    schedulers = []
+
+    def install(voices, render, max_concurrency, per_voice, cache=None):
+        def resolve(voice_id):
+            if voice_id not in voices:
+                raise ValueError(f"Voice '{voice_id}' not found. Please check available voices.")
+            return {"id": voice_id, "model_path": voice_id, "language": voices[voice_id], "model_version": "1"}
+
+        def synthesize(model_path, text, output_file_path, speed, max_workers=None):
+            render(model_path, text, output_file_path)
+
+        scheduler = AdmissionScheduler("tts", max_concurrency=max_concurrency, per_key_concurrency=per_voice)
+        schedulers.append(scheduler)
+        monkeypatch.setattr(tts_service, "output_dir", tmp_path)
+        monkeypatch.setattr(tts_service, "cache", cache)
+        monkeypatch.setattr(tts_service, "scheduler", scheduler)
+        monkeypatch.setattr(tts_service, "_resolve_voice", resolve)
+        monkeypatch.setattr(tts_service, "_synthesize_file", synthesize)
+
+    yield install
+    for scheduler in schedulers:
+        scheduler.shutdown()
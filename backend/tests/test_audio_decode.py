@@ -0,0 +1,50 @@
+"""
+Tests for in-memory decoding of uploads to 16 kHz mono float32.
+"""
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from app.services.audio.decode import SOUNDFILE_AVAILABLE, AudioDecodeError, decode_audio
+
+
+def _wav_bytes(samples: np.ndarray, rate: int, width: int = 2) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(width)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def test_stereo_wav_is_downmixed_and_resampled():
+    t = np.arange(44100) / 44100
+    tone = (np.sin(2 * np.pi * 440 * t) * 16000).astype("<i2")
+    audio = decode_audio(_wav_bytes(np.stack([tone, tone], axis=1), 44100))
+    assert audio.dtype == np.float32
+    assert len(audio) == 16000
+    assert 0.45 < np.abs(audio).max() < 0.55
+
+
+def test_8_bit_wav():
+    samples = np.full((800, 1), 192, dtype=np.uint8)  # +0.5 in unsigned 8-bit
+    audio = decode_audio(_wav_bytes(samples, 8000, width=1))
+    assert len(audio) == 1600
+    assert np.allclose(audio[100:-100], 0.5, atol=0.01)
+
+
+@pytest.mark.skipif(not SOUNDFILE_AVAILABLE, reason="soundfile not installed")
+def test_flac_decodes_natively():
+    import soundfile
+
+    buffer = io.BytesIO()
+    soundfile.write(buffer, np.zeros(16000, dtype=np.float32), 16000, format="FLAC")
+    assert len(decode_audio(buffer.getvalue())) == 16000
+
+
+def test_empty_upload_is_rejected():
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"")
@@ -0,0 +1,56 @@
+"""
+Tests for generated-audio delivery: ranges, validators and caching headers.
+"""
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services.audio.delivery import AudioDelivery, parse_range
+
+PAYLOAD = bytes(range(256)) * 8  # 2048 bytes
+
+
+def _client(tmp_path, memory_file_limit):
+    path = tmp_path / "clip.wav"
+    path.write_bytes(PAYLOAD)
+    delivery = AudioDelivery(memory_budget=1 << 20, memory_file_limit=memory_file_limit, max_age=60)
+    app = FastAPI()
+
+    @app.api_route("/clip", methods=["GET", "HEAD"])
+    def clip(request: Request):
+        return delivery.response(request, path, "audio/wav", "clip.wav")
+
+    return TestClient(app), delivery
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("bytes=1000-", 1000) == (-1, -1)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+
+
+def test_full_range_and_conditional_requests(tmp_path):
+    """Same behaviour whether the clip is served from memory or streamed from disk"""
+    for memory_file_limit in (4096, 0):
+        client, delivery = _client(tmp_path, memory_file_limit)
+
+        full = client.get("/clip")
+        assert full.status_code == 200 and full.content == PAYLOAD
+        etag = full.headers["etag"]
+        assert "immutable" in full.headers["cache-control"]
+
+        partial = client.get("/clip", headers={"Range": "bytes=100-199"})
+        assert partial.status_code == 206
+        assert partial.content == PAYLOAD[100:200]
+        assert partial.headers["content-range"] == f"bytes 100-199/{len(PAYLOAD)}"
+
+        assert client.get("/clip", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/clip", headers={"Range": "bytes=5000-"}).status_code == 416
+        # Range is ignored when If-Range doesn't match the current ETag
+        assert client.get("/clip", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
+
+        head = client.head("/clip")
+        assert head.headers["content-length"] == str(len(PAYLOAD)) and head.content == b""
+        assert (delivery.stats()["memory_hits"] > 0) == (memory_file_limit > 0)
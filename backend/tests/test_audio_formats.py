@@ -0,0 +1,107 @@
+"""
+Tests for output format conversion and header probing.
+"""
+import struct
+
+import numpy as np
+import pytest
+
+from app.services.audio.encode import mulaw_encode, transcode, write_wav
+from app.services.audio.probe import probe_audio, probe_audio_bytes
+
+
+def _tone(tmp_path, rate=22050, seconds=1.0):
+    t = np.arange(int(rate * seconds)) / rate
+    samples = (np.sin(2 * np.pi * 440 * t) * 12000).astype(np.int16).reshape(-1, 1)
+    path = tmp_path / "tone.wav"
+    write_wav(path, samples, rate)
+    return path
+
+
+def test_mulaw_reference_points():
+    """Silence and full scale map to the standard G.711 codes"""
+    codes = mulaw_encode(np.array([0, 32767, -32768, -1], dtype=np.int16))
+    assert codes.tolist() == [0xFF, 0x80, 0x00, 0x7E]
+
+
+def test_transcode_to_8k_mulaw_keeps_duration(tmp_path):
+    """8 kHz mu-law is several times smaller and probes to the same duration"""
+    source = _tone(tmp_path)
+    target = tmp_path / "tone_mulaw.wav"
+    transcode(source, target, "mulaw", 8000)
+
+    info = probe_audio(target)
+    assert info.codec == "mulaw"
+    assert info.sample_rate == 8000
+    assert abs(info.duration - 1.0) < 0.01
+    assert source.stat().st_size / target.stat().st_size > 5
+
+
+def test_resampled_wav(tmp_path):
+    """Resampling to 16 kHz produces 16-bit PCM of the same length"""
+    target = tmp_path / "tone_16k.wav"
+    transcode(_tone(tmp_path), target, "wav", 16000)
+    info = probe_audio(target)
+    assert (info.codec, info.sample_rate, info.channels) == ("pcm", 16000, 1)
+    assert abs(info.duration - 1.0) < 0.01
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _m4a(seconds: float, rate: int = 44100, moov_first: bool = True) -> bytes:
+    mvhd = _box(b"mvhd", struct.pack(">IIIII", 0, 0, 0, 1000, int(seconds * 1000)) + bytes(80))
+    hdlr = _box(b"hdlr", bytes(8) + b"soun" + bytes(13))
+    mp4a = _box(b"mp4a", bytes(6) + struct.pack(">H", 1) + bytes(8) + struct.pack(">HHHHI", 2, 16, 0, 0, rate << 16))
+    stsd = _box(b"stsd", struct.pack(">II", 0, 1) + mp4a)
+    trak = _box(b"trak", _box(b"mdia", hdlr + _box(b"minf", _box(b"stbl", stsd))))
+    moov = _box(b"moov", mvhd + trak)
+    ftyp = _box(b"ftyp", b"M4A " + bytes(4))
+    mdat = _box(b"mdat", bytes(200_000))
+    return ftyp + moov + mdat if moov_first else ftyp + mdat + moov
+
+
+def test_probe_m4a(tmp_path):
+    path = tmp_path / "clip.m4a"
+    path.write_bytes(_m4a(12.5))
+    info = probe_audio(path)
+    assert (info.format, info.codec, info.sample_rate, info.channels) == ("mp4", "aac", 44100, 2)
+    assert info.duration == 12.5
+
+
+def test_probe_m4a_index_at_end_needs_whole_file(tmp_path):
+    data = _m4a(3.0, moov_first=False)
+    assert probe_audio_bytes(data[:65536], len(data)) is None
+    path = tmp_path / "clip.m4a"
+    path.write_bytes(data)
+    assert probe_audio(path).duration == 3.0
+
+
+def test_probe_mp3(tmp_path):
+    soundfile = pytest.importorskip("soundfile")
+    if "MP3" not in soundfile.available_formats():
+        pytest.skip("libsndfile without MP3 support")
+    path = tmp_path / "clip.mp3"
+    soundfile.write(path, np.zeros(16000 * 3, dtype=np.float32), 16000, format="MP3")
+    info = probe_audio(path)
+    assert (info.format, info.sample_rate, info.channels) == ("mp3", 16000, 1)
+    assert abs(info.duration - 3.0) < 0.15
+
+
+def test_probe_cbr_mp3_needs_size():
+    # MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo; no Xing header
+    frame = bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)
+    data = frame * 100
+    info = probe_audio_bytes(data[:4096], len(data))
+    assert (info.sample_rate, info.channels) == (44100, 2)
+    assert abs(info.duration - len(data) * 8 / 128000) < 0.01
+    assert info.size_based
+    assert probe_audio_bytes(data[:4096]).duration == 0.0
+
+
+def test_probe_wav_prefix(tmp_path):
+    data = _tone(tmp_path, seconds=2.0).read_bytes()
+    assert abs(probe_audio_bytes(data[:64]).duration - 2.0) < 0.01
+    assert not probe_audio_bytes(data[:64], len(data)).size_based
+    assert probe_audio_bytes(data[:20]) is None
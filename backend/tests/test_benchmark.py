@@ -0,0 +1,30 @@
+"""
+Tests for the TTS benchmark helpers (text matrix, statistics, baseline comparison).
+"""
+from benchmarks.tts_benchmark import CASES, compare, make_text, percentile
+
+
+def test_matrix_texts_have_exact_lengths():
+    for chars in CASES.values():
+        assert len(make_text(chars)) == chars
+    assert make_text(11) == "Hello world"
+
+
+def test_percentile_interpolates():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert round(percentile(values, 95), 2) == 95.05
+    assert percentile([2.0], 99) == 2.0
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    def report(p95, rps):
+        return {"results": [{
+            "target": "service", "voice": "v", "case": "target",
+            "warm": {"p95": p95}, "throughput": {"requests_per_s": rps},
+        }]}
+
+    rows = {row["metric"]: row["status"] for row in compare(report(1.3, 10.0), report(1.0, 10.0), tolerance=0.2)}
+    assert rows == {"warm.p95": "regression", "throughput.requests_per_s": "ok"}
+    rows = {row["metric"]: row["status"] for row in compare(report(1.1, 7.0), report(1.0, 10.0), tolerance=0.2)}
+    assert rows == {"warm.p95": "ok", "throughput.requests_per_s": "regression"}
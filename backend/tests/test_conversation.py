@@ -0,0 +1,183 @@
+"""
+Tests for server-side conversation sessions and Ollama context reuse.
+"""
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.conversation import ConversationStore
+from app.services.llm import BaseLLM, OllamaLLM
+
+
+class EchoLLM(BaseLLM):
+    """Replies with the prompt it was sent, so tests can see what reached the model."""
+
+    provider_name = "echo"
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if prompt.lstrip().startswith("Summarize"):
+            return "They talked about cats."
+        return f"ok {len(self.prompts)}"
+
+    async def is_available(self):
+        return True
+
+
+def _store(**overrides):
+    options = {"ttl": 60.0, "max_sessions": 10, "max_history_tokens": 1000, "summarize": False}
+    options.update(overrides)
+    return ConversationStore(**options)
+
+
+def test_ollama_context_is_reused_between_turns():
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        payloads.append(payload)
+        context = payload.get("context", []) + [len(payloads)] * 10
+        return httpx.Response(200, json={"response": f"reply {len(payloads)}", "context": context, "done": True})
+
+    async def scenario():
+        llm = OllamaLLM()
+        # Answer locally on this loop's client
+        await llm.client.aclose()
+        llm._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+            base_url=llm.base_url, transport=httpx.MockTransport(handler)
+        )
+        store = _store()
+        session = store.get_or_create()
+        replies = [await store.reply(session, llm, text) for text in ("Hi there", "How are you?")]
+        await llm.aclose()
+        return replies, session
+
+    replies, session = asyncio.run(scenario())
+    assert replies == ["reply 1", "reply 2"]
+    assert "context" not in payloads[0]
+    # The second turn sends only the new prompt plus the context of the first
+    assert payloads[1]["prompt"] == "How are you?"
+    assert payloads[1]["context"] == [1] * 10
+    assert session.state == [1] * 10 + [2] * 10
+    assert [m.role for m in session.turns] == ["user", "assistant", "user", "assistant"]
+
+
+def test_history_without_provider_state_is_sent_as_text():
+    llm = EchoLLM()
+    store = _store()
+
+    async def scenario():
+        session = store.get_or_create()
+        await store.reply(session, llm, "My cat is called Tom.")
+        await store.reply(session, llm, "What is my cat called?")
+
+    asyncio.run(scenario())
+    assert llm.prompts[0] == "My cat is called Tom."
+    assert llm.prompts[1].splitlines() == [
+        "User: My cat is called Tom.",
+        "Assistant: ok 1",
+        "User: What is my cat called?",
+        "Assistant:",
+    ]
+
+
+def test_over_budget_history_is_trimmed_and_summarized():
+    llm = EchoLLM()
+    store = _store(max_history_tokens=40, summarize=True)
+
+    async def scenario():
+        session = store.get_or_create()
+        session.state, session.state_provider = [1, 2, 3], "echo"
+        for i in range(4):
+            await store.reply(session, llm, f"Tell me more about cats, part {i} " + "x" * 40)
+        await session.summarizing
+        return session
+
+    session = asyncio.run(scenario())
+    assert store.compactions >= 1
+    assert session.summary == "They talked about cats."
+    assert session.tokens() <= 40
+    assert session.state is None
+    assert session.history()[0].role == "system"
+
+
+def test_reply_does_not_wait_for_the_summary():
+    release = asyncio.Event()
+
+    class SlowSummaryLLM(EchoLLM):
+        async def generate(self, prompt, **kwargs):
+            if prompt.lstrip().startswith("Summarize"):
+                await release.wait()
+            return await super().generate(prompt, **kwargs)
+
+    llm = SlowSummaryLLM()
+    store = _store(max_history_tokens=30, summarize=True)
+
+    async def scenario():
+        session = store.get_or_create()
+        session.state, session.state_provider = [1, 2, 3], "echo"
+        for i in range(2):
+            await asyncio.wait_for(store.reply(session, llm, f"Part {i} " + "x" * 60), timeout=1.0)
+        # Trimmed and reset already; only the summary is outstanding
+        trimmed = (session.state, len(session.turns), len(session.unsummarized), store.stats()["summaries_pending"])
+        release.set()
+        await session.summarizing
+        return trimmed, session
+
+    trimmed, session = asyncio.run(scenario())
+    assert trimmed == (None, 2, 2, 1)
+    assert session.summary == "They talked about cats."
+    assert session.unsummarized == []
+
+
+def test_failed_summary_keeps_the_trimmed_turns():
+    class NoSummaryLLM(EchoLLM):
+        async def generate(self, prompt, **kwargs):
+            if prompt.lstrip().startswith("Summarize"):
+                raise asyncio.CancelledError()
+            return await super().generate(prompt, **kwargs)
+
+    store = _store(max_history_tokens=30, summarize=True)
+
+    async def scenario():
+        session = store.get_or_create()
+        for i in range(3):
+            await store.reply(session, NoSummaryLLM(), f"Part {i} " + "x" * 60)
+        # A later summary still gets everything that was trimmed
+        await store.reply(session, EchoLLM(), "Part 3 " + "x" * 60)
+        await session.summarizing
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.summary == "They talked about cats."
+    assert session.unsummarized == []
+    assert session.state is None
+
+
+def test_sessions_expire_and_errors_are_not_recorded():
+    class FailingLLM(EchoLLM):
+        async def generate(self, prompt, **kwargs):
+            return "Error using Echo: down"
+
+    store = _store(ttl=0.0)
+    session = store.get_or_create()
+    assert asyncio.run(store.reply(session, FailingLLM(), "hello")).startswith("Error using")
+    assert session.turns == []
+    # ttl=0: the next request can't find it any more
+    assert store.get_or_create(session.id).id != session.id
+    assert store.expired == 1
+
+
+def test_session_endpoints():
+    with TestClient(app) as client:
+        assert client.delete("/api/v1/voice-chat/sessions/unknown").status_code == 404
+        response = client.get("/api/v1/voice-chat/sessions/stats")
+    assert response.status_code == 200
+    assert "sessions" in response.json()
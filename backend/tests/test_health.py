@@ -23,3 +23,96 @@ def test_llm_factory_import():
     """Verify LLM factory can be imported"""
     from app.services.llm.factory import LLMFactory
     assert LLMFactory is not None
+
+
+def test_gemini_sdk_is_imported_lazily():
+    """Importing the LLM services must not pull in the Gemini SDK"""
+    import subprocess
+    import sys
+    code = "import sys, app.services.llm_service; print('google.generativeai' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_liveness_and_readiness():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_readiness_waits_for_warm_up(monkeypatch):
+    import asyncio
+    from app.services import warmup
+    from app.services.stt_service import stt_service
+    from app.services.tts_service import tts_service
+
+    calls = []
+
+    async def stt_warm(inference=True):
+        calls.append(("stt", inference))
+
+    async def tts_warm(voice_ids=None, inference=True):
+        raise RuntimeError("piper missing")
+
+    monkeypatch.setattr(stt_service, "warm", stt_warm)
+    monkeypatch.setattr(tts_service, "warm", tts_warm)
+    state = warmup.Readiness()
+    assert state.status()["status"] == "warming_up"
+
+    asyncio.run(warmup.warm_up(state))
+    assert calls == [("stt", True)]
+    # A failed engine keeps the replica out of rotation
+    assert not state.ready
+    assert state.status()["status"] == "failed"
+    assert state.checks["stt"] == "ready"
+    assert state.checks["tts"].startswith("failed")
+
+    monkeypatch.setattr(warmup.settings, "WARMUP_ALLOW_DEGRADED", True)
+    state = warmup.Readiness()
+    asyncio.run(warmup.warm_up(state))
+    assert state.ready
+    assert state.status()["status"] == "degraded"
+
+
+def test_ready_endpoint_is_503_after_a_failed_warm_up(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services import warmup
+
+    state = warmup.Readiness()
+    state.checks = {"stt": "failed: model missing", "tts": "ready"}
+    state.finished = True
+    monkeypatch.setattr(warmup.readiness, "status", state.status)
+    with TestClient(app) as client:
+        warmup.readiness.ready = False
+        response = client.get("/health/ready")
+        warmup.readiness.ready = True
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+
+
+def test_app_can_start_again_after_shutdown(fake_piper, monkeypatch):
+    """A second lifespan (another server start in the same process) still synthesizes"""
+    import numpy as np
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.audio.encode import write_wav
+    from app.services.tts.pool import PiperEnginePool
+    from app.services.tts_service import tts_service
+
+    def render(model_path, text, output_file_path):
+        write_wav(output_file_path, np.zeros((200, 1), dtype=np.int16), 16000)
+
+    fake_piper({"voice_a": "en_US"}, render, max_concurrency=1, per_voice=1)
+    monkeypatch.setattr(tts_service, "engine_pool", PiperEnginePool("piper", tts_service.output_dir))
+    closed = tts_service.engine_pool
+    for text in ("first start", "second start"):
+        with TestClient(app) as client:
+            response = client.post("/api/v1/tts/synthesize", json={"text": text, "voice_id": "voice_a"})
+        assert response.status_code == 200
+    assert closed._closed
+    assert tts_service.engine_pool is not closed and not tts_service.engine_pool._closed
@@ -0,0 +1,314 @@
+"""
+Tests for LLM provider reuse, the shared Ollama HTTP client, token streaming
+and non-blocking Gemini calls.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.llm import BaseLLM, LLMFactory, OllamaLLM
+from app.services.scheduler import AdmissionScheduler, SchedulerSaturatedError
+
+
+def test_factory_reuses_provider_instances():
+    assert LLMFactory.get_llm("ollama") is LLMFactory.get_llm(" Ollama ")
+    assert LLMFactory.get_llm("gemini") is LLMFactory.get_llm("gemini")
+
+
+def test_replaced_provider_is_closed_at_shutdown(monkeypatch):
+    monkeypatch.setattr(LLMFactory, "_providers", dict(LLMFactory._providers))
+    monkeypatch.setattr(LLMFactory, "_instances", {})
+    monkeypatch.setattr(LLMFactory, "_retired", [])
+    closed = []
+
+    class ClosingOllama(OllamaLLM):
+        async def aclose(self):
+            closed.append(self)
+            await super().aclose()
+
+    LLMFactory.register_provider("ollama", ClosingOllama)
+    replaced = LLMFactory.get_llm("ollama")
+    LLMFactory.register_provider("ollama", ClosingOllama)
+    current = LLMFactory.get_llm("ollama")
+    assert current is not replaced
+
+    asyncio.run(LLMFactory.aclose_all())
+    assert closed == [current, replaced]
+
+
+def test_ollama_shares_one_keep_alive_client():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": []})
+        return httpx.Response(200, json={"response": json.loads(request.content)["prompt"].upper()})
+
+    async def scenario():
+        llm = OllamaLLM()
+        client = llm.client
+        assert client.timeout.connect == settings.LLM_CONNECT_TIMEOUT
+        assert client.timeout.read == settings.LLM_REQUEST_TIMEOUT
+        # Swap in a transport that answers locally; the client object stays the same
+        llm._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+            base_url=llm.base_url, transport=httpx.MockTransport(handler)
+        )
+        shared = llm.client
+        await client.aclose()
+
+        assert await llm.is_available()
+        assert await llm.generate("hi") == "HI"
+        assert await llm.generate("again") == "AGAIN"
+        assert llm.client is shared
+
+        await llm.aclose()
+        assert shared.is_closed
+        return len(requests)
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_ollama_client_follows_the_event_loop():
+    llm = OllamaLLM()
+
+    async def client():
+        return llm.client
+
+    first = asyncio.run(client())
+    second = asyncio.run(client())
+    assert first is not second
+    assert list(llm._clients.values()) == [second]  # the ended loop's client is let go
+
+
+def test_ollama_aclose_closes_the_clients_of_other_loops():
+    llm = OllamaLLM()
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+
+    async def client():
+        return llm.client
+
+    async def close_here():
+        ours = llm.client
+        await llm.aclose()
+        return ours
+
+    try:
+        theirs = asyncio.run_coroutine_threadsafe(client(), other).result(timeout=5)
+        ours = asyncio.run(close_here())
+        deadline = time.monotonic() + 5
+        while not theirs.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert ours.is_closed and theirs.is_closed
+        assert not llm._clients
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(timeout=5)
+        other.close()
+
+
+async def _answer_locally(llm, handler):
+    """Replace the client bound to the running loop with one whose transport answers locally."""
+    await llm.client.aclose()
+    llm._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+        base_url=llm.base_url, transport=httpx.MockTransport(handler)
+    )
+
+
+def test_ollama_streams_ndjson_chunks():
+    lines = [
+        {"response": "Hel", "done": False},
+        {"response": "lo", "done": False},
+        {"response": "!", "done": False},
+        {"response": "", "done": True, "context": [1, 2, 3]},
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        body = "".join(json.dumps(line) + "\n" for line in lines)
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "application/x-ndjson"})
+
+    async def scenario():
+        llm = OllamaLLM()
+        await _answer_locally(llm, handler)
+        chunks = [chunk async for chunk in llm.generate_stream("hi")]
+        await llm.aclose()
+        return chunks, llm.stream_stats()
+
+    chunks, stats = asyncio.run(scenario())
+    assert chunks == ["Hel", "lo", "!"]
+    assert stats["streams"] == 1
+    assert stats["ttft_ms_p50"] is not None
+
+
+def _ollama_stream(lines):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = "".join(json.dumps(line) + "\n" for line in lines)
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "application/x-ndjson"})
+
+    async def scenario():
+        llm = OllamaLLM()
+        await _answer_locally(llm, handler)
+        chunks = []
+        try:
+            async for chunk in llm.generate_stream("hi"):
+                chunks.append(chunk)
+        finally:
+            await llm.aclose()
+        return chunks
+
+    return scenario
+
+
+def test_ollama_stream_error_after_partial_output_raises():
+    scenario = _ollama_stream([{"response": "Hel", "done": False}, {"error": "model unloaded"}])
+    with pytest.raises(RuntimeError, match="after partial output"):
+        asyncio.run(scenario())
+
+
+def test_ollama_stream_error_before_output_is_reported_as_text():
+    chunks = asyncio.run(_ollama_stream([{"error": "model not found"}])())
+    assert chunks == ["Error using Ollama: model not found"]
+
+
+def test_providers_without_native_streaming_yield_one_chunk():
+    class EchoLLM(BaseLLM):
+        provider_name = "echo"
+
+        async def generate(self, prompt, **kwargs):
+            return prompt[::-1]
+
+        async def is_available(self):
+            return True
+
+    async def scenario():
+        return [chunk async for chunk in EchoLLM().generate_stream("abc")]
+
+    assert asyncio.run(scenario()) == ["cba"]
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _SlowModel:
+    """Stands in for genai.GenerativeModel: blocking calls, like the real SDK."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.timeouts = []
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.timeouts.append(request_options["timeout"])
+        time.sleep(self.delay)
+        if stream:
+            return iter([_Chunk("Hel"), _Chunk("lo")])
+        return _Chunk(prompt.upper())
+
+
+def _gemini(monkeypatch, delay):
+    from app.services.llm.gemini import GeminiLLM
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(GeminiLLM, "_setup", lambda self: None)
+    llm = GeminiLLM()
+    llm._model_instance = _SlowModel(delay)
+    return llm
+
+
+def test_gemini_calls_do_not_block_the_event_loop(monkeypatch):
+    llm = _gemini(monkeypatch, delay=0.3)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        text = await llm.generate("hi")
+        task.cancel()
+        return text, ticks
+
+    text, ticks = asyncio.run(scenario())
+    assert text == "HI"
+    assert ticks >= 10
+    assert llm._model_instance.timeouts == [settings.GEMINI_REQUEST_TIMEOUT]
+    asyncio.run(llm.aclose())
+
+
+def test_gemini_deadline_and_in_flight_cap(monkeypatch):
+    llm = _gemini(monkeypatch, delay=0.5)
+    llm.scheduler = AdmissionScheduler("gemini", max_concurrency=1, max_queue_depth=0)
+
+    async def scenario():
+        started = time.monotonic()
+        first = asyncio.ensure_future(llm.generate("slow", timeout=0.1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SchedulerSaturatedError):
+            await llm.generate("second")
+        return await first, time.monotonic() - started
+
+    text, elapsed = asyncio.run(scenario())
+    assert text.startswith("Error using Gemini: no response within")
+    assert elapsed < 0.4
+    asyncio.run(llm.aclose())
+
+
+def test_gemini_streams_from_the_worker_pool(monkeypatch):
+    llm = _gemini(monkeypatch, delay=0.0)
+
+    async def scenario():
+        return [chunk async for chunk in llm.generate_stream("hi")]
+
+    assert asyncio.run(scenario()) == ["Hel", "lo"]
+    asyncio.run(llm.aclose())
+
+
+def test_gemini_stream_error_after_partial_output_raises(monkeypatch):
+    llm = _gemini(monkeypatch, delay=0.0)
+
+    def broken_stream():
+        yield _Chunk("Hel")
+        raise ConnectionError("stream reset")
+
+    llm._model_instance.generate_content = lambda prompt, stream=False, request_options=None: broken_stream()
+
+    async def scenario():
+        return [chunk async for chunk in llm.generate_stream("hi")]
+
+    with pytest.raises(RuntimeError, match="after partial output: stream reset"):
+        asyncio.run(scenario())
+    asyncio.run(llm.aclose())
+
+
+def test_work_is_cancelled_when_the_client_disconnects(monkeypatch):
+    from fastapi import HTTPException
+    from app.api.v1 import errors
+
+    monkeypatch.setattr(errors, "DISCONNECT_POLL_SECONDS", 0.01)
+
+    class _Request:
+        url = httpx.URL("http://test/api/v1/voice-chat")
+
+        async def is_disconnected(self):
+            return True
+
+    async def scenario():
+        work = asyncio.ensure_future(asyncio.sleep(10))
+        with pytest.raises(HTTPException) as raised:
+            await errors.cancel_on_disconnect(_Request(), work)
+        await asyncio.sleep(0)
+        return raised.value.status_code, work.cancelled()
+
+    assert asyncio.run(scenario()) == (499, True)
@@ -0,0 +1,75 @@
+"""
+Tests for the warm piper engine pool.
+Uses a small stand-in script that speaks piper's JSON-input protocol.
+"""
+import os
+import stat
+import sys
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.tts.pool import PiperEnginePool
+
+STUB_PIPER = '''#!{python}
+import json, sys, time, wave
+for line in sys.stdin:
+    request = json.loads(line)
+    if request["text"] == "crash":
+        sys.exit(3)
+    if request["text"] == "slow":
+        time.sleep(0.5)
+    with wave.open(request["output_file"], "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\\0\\0" * 1600)
+    print(request["output_file"], flush=True)
+'''
+
+
+@pytest.fixture
+def pool(tmp_path):
+    if os.name == "nt":
+        pytest.skip("stub piper relies on a shebang script")
+    piper = tmp_path / "piper"
+    piper.write_text(STUB_PIPER.format(python=sys.executable))
+    piper.chmod(piper.stat().st_mode | stat.S_IEXEC)
+    engine_pool = PiperEnginePool(str(piper), tmp_path, workers_per_voice=1, request_timeout=10)
+    yield engine_pool
+    engine_pool.shutdown()
+
+
+def test_worker_is_reused_between_requests(pool, tmp_path):
+    """Consecutive requests for one voice run on the same process"""
+    for i in range(3):
+        out = tmp_path / f"{i}.wav"
+        pool.synthesize("model.onnx", "hello", out)
+        with wave.open(str(out)) as f:
+            assert f.getnframes() == 1600
+    assert pool.stats()["idle_workers"] == 1
+    assert pool.stats()["restarts"] == 0
+
+
+def test_crashed_worker_is_replaced(pool, tmp_path):
+    """A crash surfaces as RuntimeError and the next request gets a fresh worker"""
+    with pytest.raises(RuntimeError):
+        pool.synthesize("model.onnx", "crash", tmp_path / "crash.wav")
+    assert pool.stats()["restarts"] == 2
+
+    pool.synthesize("model.onnx", "hello", tmp_path / "ok.wav")
+    assert (tmp_path / "ok.wav").exists()
+
+
+def test_wider_limit_starts_extra_workers(pool, tmp_path):
+    """One caller's max_workers lets it run past workers_per_voice; the extra workers stay idle for reaping"""
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(
+            lambda i: pool.synthesize("model.onnx", "slow", tmp_path / f"{i}.wav", max_workers=3), range(3)
+        ))
+    assert pool.stats()["idle_workers"] == 3
+
+    pool.idle_timeout = 0
+    pool.synthesize("model.onnx", "hello", tmp_path / "after.wav")
+    assert pool.stats()["idle_workers"] == 1
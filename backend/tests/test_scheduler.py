@@ -0,0 +1,104 @@
+"""
+Tests for the admission scheduler used to keep blocking work off the event loop.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.scheduler import AdmissionScheduler, SchedulerSaturatedError
+
+
+def test_per_key_limit_serializes_and_queue_sheds_load():
+    """One slot per key: a second caller waits, a third is rejected with 429"""
+    scheduler = AdmissionScheduler("test", max_concurrency=4, per_key_concurrency=1, max_queue_depth=1)
+    release = threading.Event()
+
+    async def main():
+        first = asyncio.ensure_future(scheduler.run("voice", release.wait))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(scheduler.run("voice", lambda: "second"))
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["queue_depth"] == 1
+
+        with pytest.raises(SchedulerSaturatedError) as busy:
+            await scheduler.run("voice", lambda: None)
+        assert busy.value.status_code == 429
+        assert busy.value.retry_after >= 1
+
+        # Other keys are not blocked by the busy one
+        assert await scheduler.run("other", lambda: "other") == "other"
+
+        release.set()
+        assert await first is True
+        assert await second == "second"
+
+    asyncio.run(main())
+    stats = scheduler.stats()
+    assert stats["active"] == 0
+    assert stats["completed"] == 3
+    assert stats["rejected_queue_full"] == 1
+    scheduler.shutdown()
+
+
+def test_wait_deadline_rejects_with_503():
+    """A request that cannot start within max_wait is dropped from the queue"""
+    scheduler = AdmissionScheduler("test", max_concurrency=1, max_queue_depth=4, max_wait=0.05)
+
+    async def main():
+        blocker = asyncio.ensure_future(scheduler.run("a", time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SchedulerSaturatedError) as busy:
+            await scheduler.run("b", lambda: None)
+        assert busy.value.status_code == 503
+        await blocker
+
+    asyncio.run(main())
+    assert scheduler.stats()["queue_depth"] == 0
+    assert scheduler.stats()["rejected_timeout"] == 1
+    scheduler.shutdown()
+
+
+def test_cancelling_a_job_queued_in_the_executor_restores_capacity():
+    scheduler = AdmissionScheduler("test", max_concurrency=2, per_key_concurrency=2)
+    release = threading.Event()
+
+    async def main():
+        # One worker thread is tied up outside the scheduler, so the next admitted job sits in the executor queue
+        scheduler._executor.submit(release.wait)
+        running = asyncio.ensure_future(scheduler.run("voice", release.wait))
+        queued = asyncio.ensure_future(scheduler.run("voice", lambda: "never"))
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["active"] == 2
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["active"] == 1
+        release.set()
+        await running
+        # Both slots are usable again
+        return await asyncio.gather(*(scheduler.run("voice", lambda: "ok") for _ in range(2)))
+
+    assert asyncio.run(main()) == ["ok", "ok"]
+    assert scheduler.stats()["active"] == 0
+    scheduler.shutdown()
+
+
+def test_shutdown_releases_slots_of_queued_jobs():
+    scheduler = AdmissionScheduler("test", max_concurrency=1)
+    release = threading.Event()
+
+    async def main():
+        scheduler._executor.submit(release.wait)
+        queued = asyncio.ensure_future(scheduler.run("voice", lambda: "never"))
+        await asyncio.sleep(0.05)
+        scheduler.shutdown()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(main())
+    release.set()
+    assert scheduler.stats()["active"] == 0
+    # A shut-down scheduler takes new work on fresh threads (the app may start again)
+    assert asyncio.run(scheduler.run("voice", lambda: "again")) == "again"
+    scheduler.shutdown()
@@ -0,0 +1,97 @@
+"""
+Tests for script-aware sentence segmentation and segment stitching.
+"""
+import asyncio
+import os
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.audio.stitch import stitch_segments
+from app.services.scheduler import AdmissionScheduler
+from app.services.text import SCRIPT_TERMINATORS, split_sentences
+from app.services.tts.segmenter import group_sentences
+from app.services.tts_service import tts_service
+from services.language_manager import SCRIPTS
+
+
+def test_terminators_cover_every_detected_script():
+    assert set(SCRIPT_TERMINATORS) == set(SCRIPTS)
+
+
+def test_latin_and_danda_boundaries():
+    """Latin punctuation needs trailing whitespace; a danda splits even without it"""
+    assert split_sentences('Pi is 3.14. Done! "Quoted." Next', language="en") == ["Pi is 3.14.", "Done!", '"Quoted."', "Next"]
+    assert split_sentences("नमस्ते।आप कैसे हैं? ठीक हूँ॥ \"अच्छा।\" हाँ", language="hi") == [
+        "नमस्ते।", "आप कैसे हैं?", "ठीक हूँ॥", "\"अच्छा।\"", "हाँ",
+    ]
+    # English text never splits on a danda
+    assert split_sentences("a। b", language="en_US") == ["a। b"]
+
+
+def test_group_sentences_balances_and_keeps_order():
+    sentences = [f"s{i}" + "x" * 8 for i in range(7)]
+    groups = group_sentences(sentences, 3)
+    assert len(groups) == 3
+    assert " ".join(groups) == " ".join(sentences)
+    assert group_sentences(sentences[:2], 5) == sentences[:2]
+
+
+def test_stitch_uses_fixed_gap_at_joints():
+    """Edge silence at joints is replaced by exactly gap_ms; outer edges are kept"""
+    rate = 1000
+    voiced = np.full((100, 1), 5000, dtype=np.int16)
+    quiet = np.zeros((300, 1), dtype=np.int16)
+    first = np.concatenate([quiet[:50], voiced, quiet])
+    second = np.concatenate([quiet, voiced, quiet[:80]])
+    out = stitch_segments([first, second], rate, gap_ms=200)
+    # lead-in 50 + voice 100 + pad 15 | gap 200 | pad 15 + voice 100 + tail 80
+    assert len(out) == 50 + 100 + 15 + 200 + 15 + 100 + 80
+    assert np.array_equal(out[:50], quiet[:50])
+    assert not out[165:365].any()
+
+
+def test_segment_count_has_its_own_limit(monkeypatch):
+    monkeypatch.setattr(tts_service, "scheduler", AdmissionScheduler("tts", max_concurrency=4, per_key_concurrency=2))
+    monkeypatch.setattr(settings, "TTS_PARALLEL_MIN_CHARS", 10)
+    text = " ".join(f"Sentence number {i} is here." for i in range(8))
+    voice = {"language": "en_US"}
+
+    monkeypatch.setattr(settings, "TTS_PARALLEL_SEGMENTS", 3)
+    segments = tts_service._plan_segments(text, voice)
+    assert len(segments) == 3 and " ".join(segments) == text
+    tts_service.scheduler.shutdown()
+
+
+def test_long_text_fans_out_past_the_voice_limit(monkeypatch, tmp_path):
+    """By default a long text gets one segment per core, and runs them all at once despite a per-voice limit of 2"""
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+    monkeypatch.setattr(tts_service, "scheduler", AdmissionScheduler("tts", max_concurrency=8, per_key_concurrency=2))
+    monkeypatch.setattr(settings, "TTS_PARALLEL_SEGMENTS", 0)
+    monkeypatch.setattr(settings, "TTS_PARALLEL_MIN_CHARS", 10)
+    text = " ".join(f"Sentence number {i} is here." for i in range(12))
+    voice = {"id": "v", "model_path": "v", "language": "en_US"}
+    assert len(tts_service._plan_segments(text, voice)) == 6
+
+    running, peak, widths = [0], [0], []
+    lock = threading.Lock()
+    all_started = threading.Barrier(6, timeout=5)
+
+    def synthesize_pcm(model_path, segment, speed, max_workers=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            widths.append(max_workers)
+        all_started.wait()
+        with lock:
+            running[0] -= 1
+        return (1, 2, 16000), np.full(160, 1000, dtype="<i2").tobytes()
+
+    monkeypatch.setattr(tts_service, "_synthesize_pcm", synthesize_pcm)
+    asyncio.run(tts_service._synthesize_text(voice, text, tmp_path / "out.wav", 1.0))
+    tts_service.scheduler.shutdown()
+    assert peak[0] == 6
+    # Each segment may start its own piper worker beyond PIPER_WORKERS_PER_VOICE
+    assert widths == [6] * 6
+    assert (tmp_path / "out.wav").exists()
@@ -0,0 +1,243 @@
+"""
+Tests for STT backend selection.
+"""
+import io
+import sys
+import types
+import wave
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.stt import (
+    FasterWhisperEngine, MockSTTEngine, STTEngineFactory, WhisperEngine, default_worker_count, pool
+)
+from app.services.stt.base import BaseSTTEngine, BatchingSTTEngine, DecodedWindow, timestamp_segments
+
+# Toy vocabulary: ids below TIMESTAMP_BEGIN are words, the rest are timestamps
+WORDS = [" Hello", " there.", " General", " Kenobi."]
+TIMESTAMP_BEGIN = 100
+
+
+def _decode(tokens):
+    return "".join(WORDS[token] for token in tokens)
+
+
+def _ts(seconds):
+    return TIMESTAMP_BEGIN + round(seconds / 0.02)
+
+
+class _BatchingEngine(BatchingSTTEngine):
+    """Decodes with the toy vocabulary; transcribe() is the unbatched reference."""
+
+    batch_max_seconds = 30.0
+
+    def __init__(self, windows):
+        self.windows = windows
+        self.transcribed = []
+
+    @property
+    def backend_name(self):
+        return "toy"
+
+    def load(self, model_size, threads):
+        pass
+
+    def transcribe(self, audio, **options):
+        self.transcribed.append(len(audio))
+        return self.window_result(self.windows[len(audio)])
+
+    def decode_windows(self, clips, **options):
+        return [self.windows[len(clip)] for clip in clips]
+
+
+def _wav_bytes(seconds: float = 0.5, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(np.zeros(int(rate * seconds), dtype="<i2").tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_factory_validates_backend():
+    assert STTEngineFactory.get_engine_class(" Mock ") is MockSTTEngine
+    with pytest.raises(ValueError, match="Invalid STT backend"):
+        STTEngineFactory.get_engine_class("../../bin/sh")
+
+
+def test_registered_engine_can_be_selected(monkeypatch, client):
+    monkeypatch.setattr(STTEngineFactory, "_engines", dict(STTEngineFactory._engines))
+
+    class ToyEngine(MockSTTEngine):
+        pass
+
+    STTEngineFactory.register_engine("Toy", ToyEngine)
+    assert STTEngineFactory.get_engine_class("toy") is ToyEngine
+    assert "toy" in STTEngineFactory.installed_backends()
+    response = client.post(
+        "/api/v1/stt/transcribe?backend=toy", content=_wav_bytes(), headers={"Content-Type": "audio/wav"}
+    )
+    assert response.status_code == 200
+
+
+def test_auto_prefers_fastest_installed(monkeypatch):
+    monkeypatch.setattr(settings, "STT_BACKEND", "auto")
+    installed = {"faster-whisper": True, "whisper": True}
+    for name in installed:
+        engine_class = STTEngineFactory._engines[name]
+        monkeypatch.setattr(engine_class, "is_installed", classmethod(lambda cls, n=name: installed[n]))
+    assert STTEngineFactory.default_backend() == "faster-whisper"
+    installed["faster-whisper"] = False
+    assert STTEngineFactory.default_backend() == "whisper"
+    installed["whisper"] = False
+    assert STTEngineFactory.default_backend() == "mock"
+
+
+def test_int8_engine_fits_more_workers(monkeypatch):
+    monkeypatch.setattr(pool.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(pool, "available_memory", lambda: 4 * 600 * 1024 * 1024)
+    assert default_worker_count("base") == 2
+    assert default_worker_count("base", memory_scale=0.4) == 5
+
+
+def test_request_selects_backend(client):
+    data = _wav_bytes()
+    response = client.post(
+        "/api/v1/stt/transcribe?backend=mock", content=data, headers={"Content-Type": "audio/wav"}
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/api/v1/stt/transcribe",
+        files={"file": ("clip.wav", data, "audio/wav")},
+        data={"backend": "mock", "model": "tiny"},
+    )
+    assert response.status_code == 200
+
+
+def test_request_rejects_unknown_backend_and_model(client):
+    data = _wav_bytes()
+    for query in ("backend=nope", "backend=mock&model=/etc/passwd"):
+        response = client.post(
+            f"/api/v1/stt/transcribe?{query}", content=data, headers={"Content-Type": "audio/wav"}
+        )
+        assert response.status_code == 400
+
+
+def test_timestamp_tokens_split_segments():
+    tokens = [_ts(0.0), 0, 1, _ts(1.2), _ts(1.2), 2, 3, _ts(2.5)]
+    segments = timestamp_segments(tokens, TIMESTAMP_BEGIN, _decode, duration=3.0)
+    assert [(s["start"], s["end"], s["text"]) for s in segments] == [
+        (0.0, 1.2, " Hello there."),
+        (1.2, 2.5, " General Kenobi."),
+    ]
+    # No closing timestamp: the text runs to the end of the clip
+    assert timestamp_segments([_ts(0.5), 0], TIMESTAMP_BEGIN, _decode, duration=3.0)[0]["end"] == 3.0
+
+
+def test_batched_results_match_unbatched_shape():
+    tokens = [_ts(0.0), 0, 1, _ts(1.2), _ts(1.2), 2, 3, _ts(2.5)]
+    good = DecodedWindow(timestamp_segments(tokens, TIMESTAMP_BEGIN, _decode, 3.0), "en", -0.2, 0.01)
+    silent = DecodedWindow([], "en", -1.5, 0.9)
+    repetitive = DecodedWindow([{"start": 0.0, "end": 3.0, "text": " Hello" * 40, "tokens": [0] * 40}], "en", -0.3, 0.01)
+    engine = _BatchingEngine({1: good, 2: silent, 3: repetitive})
+    clips = [np.zeros(n, dtype=np.float32) for n in (1, 2, 3)]
+
+    batched = engine.transcribe_batch(clips)
+    assert batched[0] == engine.transcribe(clips[0])
+    assert batched[0]["text"] == " Hello there. General Kenobi."
+    assert [s["id"] for s in batched[0]["segments"]] == [0, 1]
+    assert batched[1] == {"text": "", "language": "en", "segments": []}
+    # The repeating window would have hit transcribe()'s temperature fallback, so it is re-run there
+    assert engine.transcribed == [3, 1]
+    assert set(batched[2]) == set(batched[0])
+
+
+def test_whisper_batched_segments_have_transcribe_fields():
+    window = DecodedWindow([{"start": 0.0, "end": 1.0, "text": " Hi", "tokens": [0]}], "en", -0.2, 0.01)
+    segment = WhisperEngine().window_result(window)["segments"][0]
+    assert set(segment) == {
+        "id", "seek", "start", "end", "text", "tokens", "temperature", "avg_logprob", "compression_ratio", "no_speech_prob"
+    }
+
+
+class _FakeTokenizer:
+    timestamp_begin = TIMESTAMP_BEGIN
+
+    def __init__(self, hf_tokenizer, multilingual, task, language):
+        self.language = language
+
+    def decode(self, tokens):
+        return _decode(tokens)
+
+
+class _FakeCT2Whisper:
+    """Stands in for ctranslate2.models.Whisper: records the batch it is given."""
+
+    is_multilingual = True
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_language(self, encoded):
+        return [[("<|en|>", 0.9), ("<|de|>", 0.1)] for _ in encoded]
+
+    def generate(self, encoded, prompts, **options):
+        self.batches.append(prompts)
+        tokens = [_ts(0.0), 0, 1, _ts(1.0)]
+        result = types.SimpleNamespace(sequences_ids=[tokens], scores=[-0.1], no_speech_prob=0.01)
+        return [result for _ in prompts]
+
+
+def test_faster_whisper_decodes_clips_as_one_batch(monkeypatch):
+    audio = types.ModuleType("faster_whisper.audio")
+    audio.pad_or_trim = lambda features: features
+    tokenizer = types.ModuleType("faster_whisper.tokenizer")
+    tokenizer.Tokenizer = _FakeTokenizer
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.ModuleType("faster_whisper"))
+    monkeypatch.setitem(sys.modules, "faster_whisper.audio", audio)
+    monkeypatch.setitem(sys.modules, "faster_whisper.tokenizer", tokenizer)
+
+    engine = FasterWhisperEngine()
+    engine.model = types.SimpleNamespace(
+        model=_FakeCT2Whisper(),
+        hf_tokenizer=None,
+        feature_extractor=lambda clip: np.zeros((80, 3000), dtype=np.float32),
+        encode=lambda features: list(features),
+        get_prompt=lambda tokenizer, previous, without_timestamps: [tokenizer.language],
+    )
+    clips = [np.zeros(16000 * 2, dtype=np.float32) for _ in range(3)]
+    results = engine.transcribe_batch(clips)
+
+    assert engine.model.model.batches == [[["en"]] * 3]
+    assert results[0] == {
+        "text": " Hello there.", "language": "en", "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": " Hello there."}]
+    }
+
+
+def test_auto_backend_batches():
+    assert FasterWhisperEngine.supports_batching and WhisperEngine.supports_batching
+
+
+def test_batching_engines_must_decode_windows():
+    class Incomplete(BatchingSTTEngine):
+        backend_name = "incomplete"
+
+        def load(self, model_size, threads):
+            pass
+
+        def transcribe(self, audio, **options):
+            return {"text": "", "language": "en", "segments": []}
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert not BaseSTTEngine.supports_batching and BatchingSTTEngine.supports_batching
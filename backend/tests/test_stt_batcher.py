@@ -0,0 +1,87 @@
+"""
+Tests for STT micro-batching.
+"""
+import asyncio
+
+import pytest
+
+from app.services.stt.batcher import MicroBatcher
+
+
+class _Recorder:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [item * 10 for item in items]
+
+
+def test_requests_within_window_share_a_batch():
+    run = _Recorder()
+    batcher = MicroBatcher(run, window=0.05, max_size=8)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+
+    assert asyncio.run(main()) == [0, 10, 20]
+    assert run.batches == [[0, 1, 2]]
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["batch_sizes"] == {3: 1}
+    assert stats["added_latency_ms_p95"] >= 40
+
+
+def test_full_batch_is_sent_without_waiting():
+    run = _Recorder()
+    batcher = MicroBatcher(run, window=10.0, max_size=2)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1.0)
+
+    assert asyncio.run(main()) == [0, 10, 20, 30]
+    assert run.batches == [[0, 1], [2, 3]]
+
+
+def test_late_request_starts_a_new_batch():
+    run = _Recorder()
+    batcher = MicroBatcher(run, window=0.02, max_size=8)
+
+    async def main():
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.1)
+        return [await first, await batcher.submit(2)]
+
+    assert asyncio.run(main()) == [10, 20]
+    assert run.batches == [[1], [2]]
+
+
+def test_batch_failure_reaches_every_caller():
+    batcher = MicroBatcher(_Recorder(fail=True), window=0.01, max_size=8)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(2)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_caller_is_dropped_from_batch():
+    run = _Recorder()
+    batcher = MicroBatcher(run, window=0.05, max_size=8)
+
+    async def main():
+        gone = asyncio.ensure_future(batcher.submit(1))
+        kept = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        gone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        return await kept
+
+    assert asyncio.run(main()) == 20
+    assert run.batches == [[2]]
@@ -0,0 +1,98 @@
+"""
+Tests for the STT transcription result cache.
+"""
+import asyncio
+
+import numpy as np
+
+from app.services.stt.cache import TranscriptCache
+from app.services.stt_service import STTService
+
+RATE = 16000
+
+
+def _tone(seconds: float, frequency: float = 220.0) -> np.ndarray:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (0.3 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def _result(text: str):
+    return {"text": text, "language": "en", "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": text}]}
+
+
+def test_key_covers_audio_model_language_and_options():
+    audio = _tone(1.0)
+    key = TranscriptCache.make_key(audio, "whisper", "base")
+    assert key == TranscriptCache.make_key(audio.copy(), "whisper", "base")
+    assert key != TranscriptCache.make_key(_tone(1.0, 440.0), "whisper", "base")
+    assert key != TranscriptCache.make_key(audio, "whisper", "small")
+    assert key != TranscriptCache.make_key(audio, "faster-whisper", "base")
+    assert key != TranscriptCache.make_key(audio, "whisper", "base", "de")
+    assert key != TranscriptCache.make_key(audio, "whisper", "base", vad=(-45.0, 300))
+
+
+def test_memory_tier_is_lru_and_returns_copies():
+    cache = TranscriptCache(max_entries=2)
+    cache.put("a", _result("one"))
+    cache.put("b", _result("two"))
+    cached = cache.get("a")
+    cached["segments"].clear()
+    assert cache.get("a")["segments"]
+    cache.put("c", _result("three"))  # evicts b, the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c")["text"] == "three"
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    cache = TranscriptCache(max_entries=1, cache_dir=tmp_path, disk_max_bytes=1024 * 1024)
+    cache.put("a" * 64, _result("one"))
+    cache.put("b" * 64, _result("two"))
+    # "a" left memory but is still on disk
+    assert cache.get("a" * 64)["text"] == "one"
+    assert cache.stats()["disk_hits"] == 1
+
+    reopened = TranscriptCache(max_entries=1, cache_dir=tmp_path, disk_max_bytes=1024 * 1024)
+    assert reopened.stats()["disk_entries"] == 2
+    assert reopened.get("b" * 64)["text"] == "two"
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = TranscriptCache(max_entries=1, cache_dir=tmp_path, disk_max_bytes=300)
+    for name in "abcd":
+        cache.put(name * 64, _result(name * 50))
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 300
+    assert stats["disk_entries"] < 4
+    assert len(list(tmp_path.glob("*.json"))) == stats["disk_entries"]
+
+
+def test_repeated_audio_skips_inference(monkeypatch):
+    service = STTService()
+    calls = []
+
+    async def decode(audio, backend=None, model_size=None, **options):
+        calls.append(options)
+        return _result("hello")
+
+    monkeypatch.setattr(service, "decode", decode)
+    monkeypatch.setattr(service, "_batching_enabled", lambda: False)
+    audio = _tone(2.0)
+
+    first = asyncio.run(service.transcribe_audio(audio, "a.wav"))
+    second = asyncio.run(service.transcribe_audio(audio.copy(), "retry.wav"))
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["text"] == first["text"] == "hello"
+    assert len(calls) == 1
+
+    # A language hint is part of the key and reaches the engine
+    hinted = asyncio.run(service.transcribe_audio(audio, "a.wav", language="EN"))
+    assert not hinted["cached"]
+    assert calls[-1] == {"language": "en"}
+
+    stats = service.stats()["cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["seconds_saved"] == 2.0
@@ -0,0 +1,177 @@
+"""
+Tests for STT worker sizing, the worker pool and the STT admission queue.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.scheduler import AdmissionScheduler
+from app.services.stt import MockSTTEngine, STTEngineFactory, pool
+from app.services.stt_service import stt_service
+from app.services.stt.pool import STTWorkerPool, default_worker_count
+
+
+class _FakeExecutor:
+    """In-process stand-in for ProcessPoolExecutor; the first `crashes` jobs break the pool."""
+
+    created = []
+    crashes = 0
+
+    def __init__(self, **kwargs):
+        self.shut_down = False
+        _FakeExecutor.created.append(self)
+        kwargs["initializer"](*kwargs["initargs"])
+
+    def submit(self, fn, *args):
+        future = Future()
+        if _FakeExecutor.crashes:
+            _FakeExecutor.crashes -= 1
+            future.set_exception(BrokenProcessPool("worker died"))
+        else:
+            future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def fake_executor(monkeypatch):
+    monkeypatch.setattr(pool, "ProcessPoolExecutor", _FakeExecutor)
+    monkeypatch.setattr(_FakeExecutor, "created", [])
+    monkeypatch.setattr(_FakeExecutor, "crashes", 0)
+    return _FakeExecutor
+
+
+def test_worker_count_is_capped_by_memory(monkeypatch):
+    monkeypatch.setattr(pool.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(pool, "available_memory", lambda: 4 * 600 * 1024 * 1024)
+    # Half of memory fits two base models
+    assert default_worker_count("base") == 2
+    assert default_worker_count("base.en") == 2
+
+
+def test_worker_count_is_capped_by_cores(monkeypatch):
+    monkeypatch.setattr(pool.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(pool, "available_memory", lambda: 64 * 1024 * 1024 * 1024)
+    assert default_worker_count("tiny") == 2
+
+
+def test_worker_count_never_drops_to_zero(monkeypatch):
+    monkeypatch.setattr(pool.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(pool, "available_memory", lambda: 100 * 1024 * 1024)
+    assert default_worker_count("large") == 1
+
+
+def test_worker_count_without_memory_info(monkeypatch):
+    monkeypatch.setattr(pool.os, "cpu_count", lambda: 3)
+    monkeypatch.setattr(pool, "available_memory", lambda: None)
+    assert default_worker_count("base") == 3
+
+
+def test_stt_stats_exposes_queue():
+    with TestClient(app) as client:
+        response = client.get("/api/v1/stt/stats")
+    assert response.status_code == 200
+    scheduler = response.json()["scheduler"]
+    assert "queue_depth" in scheduler
+    assert "wait_p95" in scheduler
+
+
+def test_crashed_pool_is_rebuilt_and_the_job_retried(fake_executor):
+    fake_executor.crashes = 1
+    workers = STTWorkerPool("mock", "base", workers=1)
+    result = workers.transcribe(np.zeros(1600, dtype=np.float32))
+    assert result["text"].startswith("This is a mock transcription")
+    assert workers.restarts == 1
+    first, second = fake_executor.created
+    assert first.shut_down and not second.shut_down
+
+
+def test_second_crash_is_reported(fake_executor):
+    fake_executor.crashes = 2
+    workers = STTWorkerPool("mock", "base", workers=1)
+    with pytest.raises(RuntimeError, match="STT worker crashed"):
+        workers.transcribe_batch([np.zeros(1600, dtype=np.float32)])
+    assert workers.stats()["restarts"] == 2
+    assert workers.stats()["started"] is False
+
+
+def test_warm_starts_every_worker():
+    """Each worker process takes exactly one warm-up task, so all of them start"""
+    workers = STTWorkerPool("mock", "base", workers=2)
+    try:
+        assert workers.warm(inference=True) == 2
+        stats = workers.stats()
+        assert stats["started"] and stats["warmed"] == 2
+        assert len(workers._executor._processes) == 2
+    finally:
+        workers.shutdown()
+
+
+def test_extra_model_holds_no_more_slots_than_processes(monkeypatch):
+    """A one-process pool for another model takes one scheduler slot at a time, leaving the rest to the default"""
+
+    class PooledEngine(MockSTTEngine):
+        in_process = False
+
+    class OneProcessPool:
+        workers = 1
+
+        def __init__(self):
+            self.running = self.peak = 0
+            self.lock = threading.Lock()
+
+        def transcribe(self, audio, **options):
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+            return {"text": "", "segments": []}
+
+    extra = OneProcessPool()
+    monkeypatch.setattr(STTEngineFactory, "_engines", {**STTEngineFactory._engines, "pooled": PooledEngine})
+    monkeypatch.setattr(stt_service, "request_models", stt_service.request_models | {"small"})
+    monkeypatch.setattr(stt_service, "_pools", {("pooled", "small"): extra})
+    monkeypatch.setattr(stt_service, "scheduler", AdmissionScheduler("stt", max_concurrency=4))
+
+    async def scenario():
+        audio = np.zeros(1600, dtype=np.float32)
+        jobs = [stt_service.decode(audio, "pooled", "small") for _ in range(3)]
+        running = asyncio.gather(*jobs)
+        await asyncio.sleep(0.02)
+        active = stt_service.scheduler.stats()["active"]
+        await running
+        return active
+
+    assert asyncio.run(scenario()) == 1
+    assert extra.peak == 1
+    stt_service.scheduler.shutdown()
+
+
+def test_hung_worker_is_killed_and_the_pool_rebuilt():
+    workers = STTWorkerPool("mock", "base", workers=1)
+    try:
+        workers.warm()
+        processes = list(workers._executor._processes.values())
+        workers.request_timeout = 0.5
+        with pytest.raises(RuntimeError, match="timed out"):
+            workers._call(time.sleep, 30)
+        assert workers.restarts == 1
+        for process in processes:
+            process.join(timeout=5)
+            assert not process.is_alive()
+
+        workers.request_timeout = 60
+        assert workers.transcribe(np.zeros(1600, dtype=np.float32))["text"]
+    finally:
+        workers.shutdown()
@@ -0,0 +1,176 @@
+"""
+Tests for streaming transcription: stable partials, window reuse and the WebSocket endpoint.
+"""
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.audio.decode import resample_float
+from app.services.stt.streaming import StreamingTranscriber
+
+RATE = 16000
+WORD_SECONDS = 0.5
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+class _FakeEngine:
+    """One word per 0.5 s of speech, named after its position in the stream; the last word is still unsettled."""
+
+    def __init__(self):
+        self.transcriber = None
+        self.decoded_seconds = 0.0
+
+    async def __call__(self, window, prompt):
+        self.decoded_seconds += len(window) / RATE
+        first = int(round(self.transcriber._window_start / RATE / WORD_SECONDS))
+        count = int(len(window) / RATE / WORD_SECONDS)
+        words = [f"w{first + i}" for i in range(count)]
+        if words:
+            words[-1] += "?"  # the live edge: revised on every pass
+        segments = [
+            {"start": i * WORD_SECONDS, "end": min(i + 2, count) * WORD_SECONDS, "text": " ".join(words[i:i + 2])}
+            for i in range(0, count, 2)
+        ]
+        return {"text": " ".join(words), "segments": segments}
+
+
+def _run(chunks):
+    engine = _FakeEngine()
+    transcriber = StreamingTranscriber(engine, sample_rate=RATE, step_seconds=0.5, max_window_seconds=20, pause_ms=600)
+    engine.transcriber = transcriber
+    events = []
+
+    async def main():
+        for chunk in chunks:
+            transcriber.add_audio(chunk)
+            if transcriber.ready():
+                events.extend(await transcriber.step())
+        events.extend(await transcriber.finish())
+
+    asyncio.run(main())
+    return events, engine, transcriber
+
+
+def test_stable_prefix_only_grows():
+    events, _, _ = _run([_tone(0.5) for _ in range(20)])
+    partials = [e for e in events if e["type"] == "partial"]
+    assert partials
+    previous = ""
+    for event in partials:
+        assert event["text"].startswith(event["stable"])
+        assert event["stable"].startswith(previous)
+        previous = event["stable"]
+    assert len(previous.split()) >= 10
+
+
+def test_committed_audio_is_not_decoded_again():
+    events, engine, transcriber = _run([_tone(0.5) for _ in range(40)])
+    # Re-decoding from the start every step would cost ~sum(1..40) * 0.5 s = 410 s of audio
+    assert engine.decoded_seconds < 100
+    assert events[-1]["type"] == "done"
+    assert events[-1]["duration"] == 20.0
+
+
+def test_pause_finalizes_the_utterance():
+    chunks = [_tone(0.5) for _ in range(6)] + [np.zeros(RATE // 2, dtype=np.float32) for _ in range(3)]
+    chunks += [_tone(0.5) for _ in range(4)]
+    events, _, _ = _run(chunks)
+    finals = [e for e in events if e["type"] == "final"]
+    assert len(finals) == 2
+    assert finals[0]["text"].split()[:5] == ["w0", "w1", "w2", "w3", "w4"]
+    assert finals[0]["end"] <= finals[1]["start"]
+    done = events[-1]
+    assert done["text"].split()[:5] == ["w0", "w1", "w2", "w3", "w4"]
+    starts = [s["start"] for s in done["segments"]]
+    assert starts == sorted(starts)
+
+
+def test_utterance_closed_by_silence_keeps_its_segments():
+    """When VAD finds no speech left, the last hypothesis is finalized with its timed segments"""
+    engine = _FakeEngine()
+    transcriber = StreamingTranscriber(engine, sample_rate=RATE, step_seconds=0.5, max_window_seconds=20, pause_ms=600)
+    engine.transcriber = transcriber
+
+    async def main():
+        events = []
+        for _ in range(2):
+            transcriber.add_audio(_tone(0.5))
+            events.extend(await transcriber.step())
+        # The rest of the window no longer counts as speech (e.g. it was only noise)
+        transcriber._speech = lambda window: []
+        transcriber.add_audio(np.zeros(RATE // 2, dtype=np.float32))
+        events.extend(await transcriber.step())
+        events.extend(await transcriber.finish())
+        return events
+
+    events = asyncio.run(main())
+    final = next(e for e in events if e["type"] == "final")
+    done = events[-1]
+    assert final["text"] == done["text"] == "w0 w1?"
+    assert " ".join(segment["text"] for segment in done["segments"]) == done["text"]
+    assert done["segments"][-1]["end"] == 1.0
+
+
+def test_silence_is_never_decoded():
+    events, engine, _ = _run([np.zeros(RATE // 2, dtype=np.float32) for _ in range(10)])
+    assert engine.decoded_seconds == 0
+    assert events == [{"type": "done", "text": "", "segments": [], "duration": 5.0}]
+
+
+def test_websocket_stream():
+    pcm = (_tone(1.0) * 32767).astype("<i2").tobytes()
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/v1/stt/stream?backend=mock") as ws:
+            for _ in range(3):
+                ws.send_bytes(pcm)
+            ws.send_json({"type": "end"})
+            events = []
+            while True:
+                event = ws.receive_json()
+                events.append(event)
+                if event["type"] in ("done", "error"):
+                    break
+    assert events[-1]["type"] == "done"
+    assert events[-1]["duration"] == 3.0
+    assert events[-1]["text"]
+
+
+def test_websocket_resamples_across_frame_boundaries(monkeypatch):
+    src_rate = 48000
+    t = np.arange(src_rate * 2) / src_rate
+    signal = (0.37 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    received = []
+    add_audio = StreamingTranscriber.add_audio
+
+    def record(self, samples):
+        received.append(samples)
+        add_audio(self, samples)
+
+    monkeypatch.setattr(StreamingTranscriber, "add_audio", record)
+    frame = src_rate // 50  # 20 ms frames
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/api/v1/stt/stream?backend=mock&encoding=f32le&sample_rate={src_rate}") as ws:
+            for start in range(0, len(signal), frame):
+                ws.send_bytes(signal[start:start + frame].astype("<f4").tobytes())
+            ws.send_json({"type": "end"})
+            while ws.receive_json()["type"] not in ("done", "error"):
+                pass
+
+    streamed = np.concatenate(received)
+    expected = resample_float(signal, src_rate, RATE)
+    assert len(streamed) == len(expected)
+    assert np.max(np.abs(streamed - expected)) < 1e-4
+
+
+def test_websocket_rejects_bad_parameters():
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/v1/stt/stream?encoding=mp3&backend=mock") as ws:
+            event = ws.receive_json()
+    assert event["type"] == "error"
+    assert "encoding" in event["detail"]
@@ -0,0 +1,184 @@
+"""
+Tests for streamed STT uploads: early size rejection and incremental decoding.
+"""
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.audio.decode import StreamingAudioDecoder, StreamingResampler, decode_audio, resample_float
+
+
+def _wav_bytes(seconds: float = 1.0, rate: int = 22050) -> bytes:
+    t = np.arange(int(rate * seconds)) / rate
+    samples = (np.sin(2 * np.pi * 300 * t) * 12000).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_wav_decodes_incrementally_in_tiny_chunks():
+    """Chunk boundaries (even mid-header, mid-frame) don't change the result"""
+    data = _wav_bytes()
+
+    async def run():
+        decoder = StreamingAudioDecoder()
+        for i in range(0, len(data), 7):
+            await decoder.feed(data[i:i + 7])
+        return await decoder.finish()
+
+    assert np.allclose(asyncio.run(run()), decode_audio(data), atol=1e-6)
+
+
+@pytest.mark.parametrize("src_rate", [44100, 48000, 8000, 16000])
+def test_streaming_resampler_matches_one_shot(src_rate):
+    rng = np.random.default_rng(0)
+    signal = rng.uniform(-1, 1, src_rate).astype(np.float32)
+    resampler = StreamingResampler(src_rate, 16000)
+    pieces = [resampler.feed(signal[i:i + 3001]) for i in range(0, len(signal), 3001)]
+    streamed = np.concatenate(pieces + [resampler.flush()])
+    expected = resample_float(signal, src_rate, 16000)
+    assert len(streamed) == len(expected)
+    assert np.allclose(streamed, expected, atol=1e-5)
+
+
+def test_wav_is_resampled_as_it_arrives():
+    """Only model-rate samples are kept while a 48 kHz upload streams in"""
+    data = _wav_bytes(seconds=2.0, rate=48000)
+
+    async def run():
+        decoder = StreamingAudioDecoder()
+        chunks = [data[i:i + 16384] for i in range(0, len(data), 16384)]
+        half = len(chunks) // 2
+        for chunk in chunks[:half]:
+            await decoder.feed(chunk)
+        fed = (decoder.bytes_fed - 44) // 2
+        held = sum(len(part) for part in decoder._wav._parts)
+        for chunk in chunks[half:]:
+            await decoder.feed(chunk)
+        return fed, held, await decoder.finish()
+
+    fed, held, audio = asyncio.run(run())
+    assert 0 < held <= fed // 3
+    assert np.allclose(audio, decode_audio(data), atol=1e-5)
+
+
+def test_multipart_and_raw_uploads(client):
+    data = _wav_bytes()
+    response = client.post("/api/v1/stt/transcribe", files={"file": ("clip.wav", data, "audio/wav")})
+    assert response.status_code == 200
+    response = client.post("/api/v1/stt/transcribe", content=data, headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 200
+
+
+def test_oversize_upload_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "STT_MAX_UPLOAD_BYTES", 10_000)
+    data = _wav_bytes()
+    # Declared too large: rejected from the header alone
+    response = client.post("/api/v1/stt/transcribe", content=data, headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 413
+
+    # No Content-Length (chunked): rejected once the stream crosses the limit
+    def body():
+        for i in range(0, len(data), 4096):
+            yield data[i:i + 4096]
+
+    response = client.post("/api/v1/stt/transcribe", content=body(), headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 413
+
+
+def test_bad_uploads_get_client_errors(client):
+    response = client.post("/api/v1/stt/transcribe", files={"file": ("notes.txt", b"hello", "text/plain")})
+    assert response.status_code == 400
+    response = client.post("/api/v1/stt/transcribe", files={"file": ("clip.wav", b"RIFF\0\0\0\0WAVEjunk", "audio/wav")})
+    assert response.status_code == 400
+    response = client.post("/api/v1/stt/transcribe", data={"other": "x"}, files={"doc": ("a.wav", b"x")})
+    assert response.status_code == 400
+
+
+def test_response_reports_real_duration(client):
+    response = client.post("/api/v1/stt/transcribe", files={"file": ("clip.wav", _wav_bytes(seconds=1.5), "audio/wav")})
+    assert response.status_code == 200
+    assert abs(response.json()["duration"] - 1.5) < 0.01
+
+
+def test_overlong_audio_is_rejected_from_its_header(client, monkeypatch):
+    monkeypatch.setattr(settings, "STT_MAX_AUDIO_SECONDS", 1.0)
+    fed = []
+    original = StreamingAudioDecoder.feed
+
+    async def feed(self, chunk):
+        fed.append(len(chunk))
+        await original(self, chunk)
+
+    monkeypatch.setattr(StreamingAudioDecoder, "feed", feed)
+    response = client.post("/api/v1/stt/transcribe", content=_wav_bytes(seconds=2.0), headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 413
+    assert "too long" in response.json()["detail"]
+    assert sum(fed) == 0
+
+
+def test_backlog_estimate_sheds_before_decoding(client, monkeypatch):
+    from app.services.stt_service import stt_service
+
+    monkeypatch.setattr(stt_service, "pending_audio_seconds", 1e6)
+    response = client.post("/api/v1/stt/transcribe", content=_wav_bytes(), headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_admission_counts_the_clip_itself_and_hands_its_seconds_back(client, monkeypatch):
+    from app.services.stt_service import stt_service
+
+    monkeypatch.setattr(stt_service, "rtf", 1.0)
+    monkeypatch.setattr(stt_service, "workers", 1)
+    # The queue alone fits in the max wait, the queue plus this clip doesn't
+    monkeypatch.setattr(stt_service, "pending_audio_seconds", stt_service.scheduler.max_wait - 0.5)
+    response = client.post("/api/v1/stt/transcribe", content=_wav_bytes(), headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 503
+
+    monkeypatch.setattr(stt_service, "pending_audio_seconds", 10.0)
+    response = client.post("/api/v1/stt/transcribe", content=_wav_bytes(), headers={"Content-Type": "audio/wav"})
+    assert response.status_code == 200
+    assert stt_service.pending_audio_seconds == 10.0
+
+
+def test_admission_is_released_when_the_request_fails():
+    from app.services.audio.probe import AudioInfo
+    from app.services.stt_service import stt_service
+
+    before = stt_service.pending_audio_seconds
+    with pytest.raises(RuntimeError):
+        with stt_service.admission() as admission:
+            admission.check(AudioInfo("wav", 5.0, 16000, 1))
+            assert stt_service.pending_audio_seconds == before + 5.0
+            raise RuntimeError("upload dropped")
+    assert stt_service.pending_audio_seconds == before
+
+
+def test_form_fields_dont_count_towards_a_size_based_duration(client, monkeypatch):
+    """An unsized WAV's length comes from the file size, which multipart only bounds"""
+    monkeypatch.setattr(settings, "STT_MAX_AUDIO_SECONDS", 1.2)
+    data = bytearray(_wav_bytes(seconds=1.0))
+    data[40:44] = b"\xff\xff\xff\xff"
+    response = client.post(
+        "/api/v1/stt/transcribe",
+        files={"file": ("clip.wav", bytes(data), "audio/wav")},
+        data={"language": "en", "notes": "x" * 15000},
+    )
+    assert response.status_code == 200
+    assert abs(response.json()["duration"] - 1.0) < 0.01
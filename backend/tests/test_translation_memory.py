@@ -0,0 +1,156 @@
+"""
+Tests for the translation memory behind strict translations.
+"""
+import re
+
+import pytest
+
+from services import language_manager, translation_memory
+from services.translation_memory import TranslationMemory
+
+
+class FakeLLM:
+    """Synchronous stand-in that 'translates' by tagging the text."""
+
+    provider_name = "fake"
+    model = "tiny"
+
+    def __init__(self):
+        self.sent = []
+
+    def generate(self, prompt: str) -> str:
+        text = prompt.split("TEXT TO TRANSLATE:\n", 1)[1]
+        self.sent.append(text)
+        numbered = [re.match(r"\[(\d+)\] (.*)", line) for line in text.splitlines()]
+        if all(numbered):
+            return "\n".join(f"[{m.group(1)}] <{m.group(2)}>" for m in numbered)
+        return f"<{text}>"
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    memory = TranslationMemory(":memory:", max_entries=16)
+    monkeypatch.setattr(translation_memory, "_memory", memory)
+    yield memory
+    memory.close()
+
+
+def test_memory_persists_in_sqlite(tmp_path):
+    path = str(tmp_path / "tm.sqlite3")
+    memory = TranslationMemory(path, max_entries=1)
+    memory.put("Save", "en", "hi", "ollama:llama2", "सहेजें")
+    memory.put("Cancel", "en", "hi", "ollama:llama2", "रद्द करें")
+    # "Save" left the LRU but is still in the database
+    assert memory.get("Save", "en", "hi", "ollama:llama2") == "सहेजें"
+    assert memory.get("Save", "en", "ta", "ollama:llama2") is None
+    assert memory.get("Save", "en", "hi", "gemini") is None
+    memory.close()
+
+    reopened = TranslationMemory(path)
+    assert reopened.get("  Save ", "EN", "hi", "ollama:llama2") == "सहेजें"
+    stats = reopened.stats()
+    assert stats["stored"] == 2 and stats["db_hits"] == 1
+    reopened.close()
+
+
+def test_repeated_translation_skips_the_llm(memory):
+    llm = FakeLLM()
+    first = language_manager.get_strict_translation(llm, "Hello there", "en", "hi")
+    again = language_manager.get_strict_translation(llm, "Hello  there ", "en", "hi")
+    other = language_manager.get_strict_translation(llm, "Hello there", "en", "ta")
+    assert first == again == "<Hello there>"
+    assert other == "<Hello there>"
+    assert llm.sent == ["Hello there", "Hello there"]
+    assert memory.stats()["memory_hits"] == 1
+
+
+def test_only_new_sentences_are_sent(memory):
+    llm = FakeLLM()
+    language_manager.get_strict_translation(llm, "Welcome back.", "en", "hi")
+    result = language_manager.get_strict_translation(llm, "Welcome back. Your order has shipped.", "en", "hi")
+    assert llm.sent == ["Welcome back.", "Your order has shipped."]
+    assert result == "<Welcome back.> <Your order has shipped.>"
+
+
+def test_unknown_paragraph_is_translated_in_one_request(memory):
+    llm = FakeLLM()
+    text = "First sentence. Second sentence."
+    assert language_manager.get_strict_translation(llm, text, "en", "hi") == f"<{text}>"
+    assert llm.sent == [text]
+
+
+def test_provider_errors_are_not_remembered(memory):
+    class FailingLLM(FakeLLM):
+        def generate(self, prompt: str) -> str:
+            self.sent.append(prompt)
+            return "Error using Ollama: connection refused"
+
+    llm = FailingLLM()
+    language_manager.get_strict_translation(llm, "Hello", "en", "hi")
+    language_manager.get_strict_translation(llm, "Hello", "en", "hi")
+    assert len(llm.sent) == 2
+    assert memory.stats()["stored"] == 0
+
+
+def test_failed_sentence_does_not_store_the_paragraph(memory):
+    class FlakyLLM(FakeLLM):
+        def generate(self, prompt: str) -> str:
+            text = prompt.split("TEXT TO TRANSLATE:\n", 1)[1]
+            if text == "Second one.":
+                self.sent.append(text)
+                return "Error using Ollama: timeout"
+            return super().generate(prompt)
+
+    llm = FlakyLLM()
+    language_manager.get_strict_translation(llm, "First one.", "en", "hi")
+    language_manager.get_strict_translation(llm, "Third one.", "en", "hi")
+    text = "First one. Second one. Third one."
+    result = language_manager.get_strict_translation(llm, text, "en", "hi")
+    assert result == "Error using Ollama: timeout"
+    assert memory.get(text, "en", "hi", "fake:tiny") is None
+    assert memory.get("Second one.", "en", "hi", "fake:tiny") is None
+    assert memory.stats()["stored"] == 2
+
+
+def test_new_sentences_share_one_request(memory):
+    llm = FakeLLM()
+    language_manager.get_strict_translation(llm, "Welcome back.", "en", "hi")
+    text = "Welcome back. Your order has shipped. It arrives Monday."
+    result = language_manager.get_strict_translation(llm, text, "en", "hi")
+    assert llm.sent == ["Welcome back.", "[1] Your order has shipped.\n[2] It arrives Monday."]
+    assert result == "<Welcome back.> <Your order has shipped.> <It arrives Monday.>"
+    assert memory.get("It arrives Monday.", "en", "hi", "fake:tiny") == "<It arrives Monday.>"
+
+
+def test_unsplittable_reply_falls_back_to_the_whole_text(memory):
+    class MergingLLM(FakeLLM):
+        def generate(self, prompt: str) -> str:
+            text = prompt.split("TEXT TO TRANSLATE:\n", 1)[1]
+            self.sent.append(text)
+            if text.startswith("[1]"):
+                return "[1] <both sentences in one line>"
+            return f"<{text}>"
+
+    llm = MergingLLM()
+    language_manager.get_strict_translation(llm, "Welcome back.", "en", "hi")
+    text = "Welcome back. Your order has shipped. It arrives Monday."
+    assert language_manager.get_strict_translation(llm, text, "en", "hi") == f"<{text}>"
+    assert llm.sent[-1] == text
+    assert memory.get("Your order has shipped.", "en", "hi", "fake:tiny") is None
+
+
+def test_empty_sentence_reply_falls_back_to_the_whole_text(memory):
+    class BlankLLM(FakeLLM):
+        def generate(self, prompt: str) -> str:
+            text = prompt.split("TEXT TO TRANSLATE:\n", 1)[1]
+            if text == "Your order has shipped.":
+                self.sent.append(text)
+                return ""
+            return super().generate(prompt)
+
+    llm = BlankLLM()
+    language_manager.get_strict_translation(llm, "Welcome back.", "en", "hi")
+    text = "Welcome back. Your order has shipped."
+    assert language_manager.get_strict_translation(llm, text, "en", "hi") == f"<{text}>"
+    assert llm.sent == ["Welcome back.", "Your order has shipped.", text]
+    assert memory.get("Your order has shipped.", "en", "hi", "fake:tiny") is None
@@ -0,0 +1,154 @@
+"""
+Tests for batch synthesis: grouping by voice, result order, per-item errors
+and the ZIP archive.
+"""
+import asyncio
+import io
+import json
+import threading
+import zipfile
+
+import numpy as np
+import pytest
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.tts import synthesize_speech_batch
+from app.main import app
+from app.schemas.tts import TTSBatchRequest
+from app.services.audio.encode import write_wav
+from app.services.scheduler import SchedulerSaturatedError
+from app.services.tts.cache import SynthesisCache
+from app.services.tts_service import tts_service
+
+VOICES = ("voice_a", "voice_b")
+
+
+@pytest.fixture
+def rendered(fake_piper, tmp_path):
+    """Fake piper on a one-slot scheduler and a cache that holds a single file; returns the render log."""
+    renders = []
+    lock = threading.Lock()
+
+    def render(model_path, text, output_file_path):
+        if text == "boom":
+            raise RuntimeError("Piper crashed")
+        with lock:
+            renders.append((model_path, text))
+        write_wav(output_file_path, np.full((200, 1), len(renders), dtype=np.int16), 16000)
+
+    fake_piper(
+        {voice: "en_US" for voice in VOICES}, render,
+        max_concurrency=1, per_voice=1, cache=SynthesisCache(tmp_path, max_bytes=500),
+    )
+    return renders
+
+
+def _batch(client, items, archive=False):
+    return client.post("/api/v1/tts/synthesize-batch", json={"items": items, "archive": archive})
+
+
+def test_items_render_grouped_by_voice_and_return_in_order(rendered):
+    items = [{"text": f"item {i}", "voice_id": VOICES[i % 2]} for i in range(4)]
+    with TestClient(app) as client:
+        response = _batch(client, items)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["index"] for r in body["results"]] == [0, 1, 2, 3]
+    assert [r["voice_id"] for r in body["results"]] == ["voice_a", "voice_b", "voice_a", "voice_b"]
+    # Each voice renders its own items in order; with one slot the voices take turns
+    # rather than one voice holding it for its whole queue
+    assert rendered == [("voice_a", "item 0"), ("voice_b", "item 1"), ("voice_a", "item 2"), ("voice_b", "item 3")]
+    assert body["succeeded"] == 4 and body["failed"] == 0
+
+
+def test_failed_items_are_reported_per_item(rendered):
+    items = [
+        {"text": "fine", "voice_id": "voice_a"},
+        {"text": "fine", "voice_id": "missing"},
+        {"text": "boom", "voice_id": "voice_a"},
+    ]
+    with TestClient(app) as client:
+        body = _batch(client, items).json()
+
+    ok, unknown, crashed = body["results"]
+    assert ok["audio_url"] and ok["error"] is None
+    assert "not found" in unknown["error"] and unknown["audio_url"] is None
+    assert "Piper crashed" in crashed["error"]
+    assert body["succeeded"] == 1 and body["failed"] == 2
+    assert "2 failed" in body["message"]
+
+
+def test_archive_keeps_items_the_cache_evicted(rendered):
+    items = [{"text": f"item {i}", "voice_id": "voice_a"} for i in range(3)] + [{"text": "boom", "voice_id": "voice_a"}]
+    with TestClient(app) as client:
+        response = _batch(client, items, archive=True)
+    assert tts_service.cache.stats()["evictions"] >= 2
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ["0000.wav", "0001.wav", "0002.wav", "manifest.json"]
+        manifest = json.loads(archive.read("manifest.json"))
+        assert archive.read("0000.wav")[:4] == b"RIFF"
+        assert archive.read("0000.wav") != archive.read("0001.wav")
+    assert [r["index"] for r in manifest] == [0, 1, 2, 3]
+    assert "Piper crashed" in manifest[3]["error"]
+    assert not list(tts_service.output_dir.glob("batch_*.zip"))
+
+
+def test_archive_of_only_failures_is_an_error(rendered):
+    with TestClient(app) as client:
+        response = _batch(client, [{"text": "boom", "voice_id": "voice_a"}], archive=True)
+    assert response.status_code == 500
+    assert not list(tts_service.output_dir.glob("batch_*.zip"))
+
+
+def test_cancelled_archive_batch_cleans_up(rendered, monkeypatch):
+    generate = tts_service.generate_audio
+    first_done = asyncio.Event()
+
+    async def stall(text, voice_id, *args):
+        if text == "stuck":
+            await first_done.wait()
+            await asyncio.Event().wait()  # until cancelled
+        result = await generate(text, voice_id, *args)
+        first_done.set()
+        return result
+
+    monkeypatch.setattr(tts_service, "generate_audio", stall)
+    request = TTSBatchRequest(
+        items=[{"text": "fine", "voice_id": "voice_a"}, {"text": "stuck", "voice_id": "voice_b"}], archive=True
+    )
+
+    async def scenario():
+        task = asyncio.ensure_future(synthesize_speech_batch(request, BackgroundTasks()))
+        await first_done.wait()
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert not list(tts_service.output_dir.glob("batch_*.zip"))
+    assert not tts_service.cache._held
+
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_full_queue_fails_the_whole_batch_with_retry_after(rendered, monkeypatch, archive):
+    generate = tts_service.generate_audio
+
+    async def shed(text, voice_id, *args):
+        if text == "late":
+            raise SchedulerSaturatedError("TTS queue is full", status_code=429, retry_after=3)
+        return await generate(text, voice_id, *args)
+
+    monkeypatch.setattr(tts_service, "generate_audio", shed)
+    items = [{"text": "early", "voice_id": "voice_a"}, {"text": "late", "voice_id": "voice_b"}]
+    with TestClient(app) as client:
+        response = _batch(client, items, archive=archive)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert not list(tts_service.output_dir.glob("batch_*.zip"))
@@ -0,0 +1,61 @@
+"""
+Tests for the content-addressed synthesis cache.
+"""
+from app.services.tts.cache import SynthesisCache
+
+
+def _render(tmp_path, name: str, size: int):
+    path = tmp_path / f"{name}.part"
+    path.write_bytes(b"\0" * size)
+    return path
+
+
+def test_key_ignores_whitespace_but_not_voice_or_speed():
+    """Equivalent text maps to one key; any other parameter changes it"""
+    key = SynthesisCache.make_key("Hello  world ", "voice_a", 1.0, "v1")
+    assert key == SynthesisCache.make_key("Hello world", "voice_a", 1.0, "v1")
+    assert key != SynthesisCache.make_key("Hello world", "voice_b", 1.0, "v1")
+    assert key != SynthesisCache.make_key("Hello world", "voice_a", 1.5, "v1")
+    assert key != SynthesisCache.make_key("Hello world", "voice_a", 1.0, "v2")
+
+
+def test_hit_miss_and_lru_eviction(tmp_path):
+    """Entries beyond the byte budget are evicted least recently used first"""
+    cache = SynthesisCache(tmp_path, max_bytes=250)
+    keys = [SynthesisCache.make_key(str(i), "v", 1.0, "m") for i in range(3)]
+
+    assert cache.get(keys[0]) is None
+    cache.put(keys[0], _render(tmp_path, "a", 100))
+    cache.put(keys[1], _render(tmp_path, "b", 100))
+    assert cache.get(keys[0]) is not None  # keys[1] is now least recently used
+
+    cache.put(keys[2], _render(tmp_path, "c", 100))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 200
+    assert stats["hits"] == 3 and stats["misses"] == 2
+
+
+def test_entries_survive_restart(tmp_path):
+    """A new cache instance indexes files left by the previous one"""
+    key = SynthesisCache.make_key("persist", "v", 1.0, "m")
+    SynthesisCache(tmp_path, max_bytes=1000).put(key, _render(tmp_path, "p", 10))
+    assert SynthesisCache(tmp_path, max_bytes=1000).get(key) == tmp_path / f"{key}.wav"
+
+
+def test_held_entry_outlives_eviction_until_released(tmp_path):
+    cache = SynthesisCache(tmp_path, max_bytes=150)
+    keys = [SynthesisCache.make_key(str(i), "v", 1.0, "m") for i in range(2)]
+    held = cache.put(keys[0], _render(tmp_path, "a", 100))
+    cache.hold(held)
+    cache.put(keys[1], _render(tmp_path, "b", 100))
+    assert held.exists()
+
+    cache.release(held)
+    assert not held.exists()
+    assert cache.get(keys[1]) is not None
+    assert cache.stats()["bytes"] == 100
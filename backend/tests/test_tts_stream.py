@@ -0,0 +1,105 @@
+"""
+Tests for sentence-by-sentence streaming synthesis.
+"""
+import asyncio
+import io
+import struct
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.audio.encode import write_wav
+from app.services import tts_service as tts_module
+from app.services.text import split_sentences
+from app.services.tts.cache import SynthesisCache
+from app.services.tts_service import tts_service
+
+RATE = 16000
+SAMPLES = 100
+
+
+@pytest.fixture
+def sentences(fake_piper):
+    """Fake piper: each sentence renders as SAMPLES copies of its position; earlier sentences are slower."""
+    order = {}
+
+    def render(model_path, text, output_file_path):
+        position = order[text]
+        time.sleep(0.05 / (position + 1))
+        write_wav(output_file_path, np.full((SAMPLES, 1), position + 1, dtype=np.int16), RATE)
+
+    def use(text):
+        order.update({sentence: i for i, sentence in enumerate(split_sentences(text, language="hi_IN"))})
+        return len(order)
+
+    fake_piper({"hindi": "hi_IN"}, render, max_concurrency=4, per_voice=4)
+    return use
+
+
+TEXT = "नमस्ते।आप कैसे हैं? ठीक हूँ॥"
+
+
+def _samples(frames: bytes):
+    return list(np.frombuffer(frames, dtype="<i2"))
+
+
+def test_split_sentences_on_danda():
+    assert split_sentences(TEXT, language="hi_IN") == ["नमस्ते।", "आप कैसे हैं?", "ठीक हूँ॥"]
+
+
+def test_stream_yields_header_then_sentences_in_order(sentences):
+    count = sentences(TEXT)
+
+    async def collect():
+        return [chunk async for chunk in tts_service.stream_audio(TEXT, "hindi")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == count == 3
+    header, first = chunks[0][:44], chunks[0][44:]
+    assert header[:4] == b"RIFF" and header[8:16] == b"WAVEfmt "
+    assert struct.unpack("<HHI", header[20:28]) == (1, 1, RATE)
+    assert [set(_samples(chunk)) for chunk in [first] + chunks[1:]] == [{1}, {2}, {3}]
+
+
+def test_stream_endpoint_body_and_headers(sentences):
+    sentences(TEXT)
+    with TestClient(app) as client:
+        response = client.post("/api/v1/tts/synthesize-stream", json={"text": TEXT, "voice_id": "hindi"})
+        missing = client.post("/api/v1/tts/synthesize-stream", json={"text": TEXT, "voice_id": "nope"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/wav"
+    assert "content-length" not in response.headers
+    assert response.content[:4] == b"RIFF"
+    assert _samples(response.content[44:]) == [1] * SAMPLES + [2] * SAMPLES + [3] * SAMPLES
+    assert missing.status_code == 400
+
+
+def test_cache_hit_is_read_off_the_event_loop(sentences, monkeypatch, tmp_path):
+    sentences(TEXT)
+    cache = SynthesisCache(tmp_path, max_bytes=10 ** 6)
+    rendered = tmp_path / "rendered.part"
+    rendered.write_bytes(b"RIFF" + bytes(range(256)) * 600)
+    cache.put(tts_service.cache_key(TEXT, tts_service._resolve_voice("hindi"), 1.0), rendered)
+    monkeypatch.setattr(tts_service, "cache", cache)
+
+    read_threads = set()
+
+    class _File(io.BytesIO):
+        def read(self, size=-1):
+            read_threads.add(threading.get_ident())
+            return super().read(size)
+
+    monkeypatch.setattr(tts_module, "open", lambda path, mode: _File(open(path, mode).read()), raising=False)
+
+    async def collect():
+        return threading.get_ident(), [chunk async for chunk in tts_service.stream_audio(TEXT, "hindi")]
+
+    loop_thread, chunks = asyncio.run(collect())
+    assert b"".join(chunks) == b"RIFF" + bytes(range(256)) * 600
+    assert len(chunks) > 1
+    assert read_threads and loop_thread not in read_threads
@@ -0,0 +1,85 @@
+"""
+Tests for voice activity detection ahead of STT.
+"""
+import io
+import wave
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.audio.vad import detect_speech, plan_chunks
+from app.services.stt_service import STTService
+
+RATE = 16000
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return (np.random.default_rng(0).standard_normal(int(RATE * seconds)) * 0.001).astype(np.float32)
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    audio = np.concatenate([_silence(1.0), _tone(2.0), _silence(1.0)])
+    [(start, end)] = detect_speech(audio, RATE, pad_ms=100)
+    assert abs(start - int(0.9 * RATE)) < 0.05 * RATE
+    assert abs(end - int(3.1 * RATE)) < 0.05 * RATE
+
+
+def test_silence_and_empty_audio_have_no_speech():
+    assert detect_speech(_silence(3.0), RATE) == []
+    assert detect_speech(np.zeros(0, dtype=np.float32), RATE) == []
+
+
+def test_short_pauses_stay_inside_a_region():
+    audio = np.concatenate([_tone(1.0), _silence(0.1), _tone(1.0), _silence(1.0), _tone(1.0)])
+    regions = detect_speech(audio, RATE, min_pause_ms=300, pad_ms=0)
+    assert len(regions) == 2
+
+
+def test_long_audio_is_chunked_at_pauses():
+    audio = np.concatenate([_tone(20.0), _silence(1.0), _tone(15.0), _silence(1.0), _tone(5.0)])
+    regions = detect_speech(audio, RATE, pad_ms=0)
+    chunks = plan_chunks(audio, regions, RATE, max_seconds=30)
+    assert len(chunks) == 2
+    # The cut falls in the pause after the first 20 s
+    assert abs(chunks[1][0] - 21 * RATE) < 0.05 * RATE
+    assert all(end - start <= 30 * RATE for start, end in chunks)
+
+
+def test_unbroken_speech_is_cut_to_the_chunk_limit():
+    audio = _tone(70.0)
+    chunks = plan_chunks(audio, [(0, len(audio))], RATE, max_seconds=30)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(audio)
+    assert all(end - start <= 30 * RATE for start, end in chunks)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_chunk_results_merge_with_shifted_timestamps():
+    merged = STTService._merge(
+        [
+            {"text": " Hello.", "language": "en", "segments": [{"id": 0, "start": 0.5, "end": 1.0, "text": "Hello."}]},
+            {"text": " World.", "language": "en", "segments": [{"id": 0, "start": 0.0, "end": 0.8, "text": "World."}]},
+        ],
+        [2.0, 30.0],
+    )
+    assert merged["text"] == "Hello. World."
+    assert merged["language"] == "en"
+    assert [(s["id"], s["start"], s["end"]) for s in merged["segments"]] == [(0, 2.5, 3.0), (1, 30.0, 30.8)]
+
+
+def test_silent_voice_chat_skips_the_pipeline():
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(np.zeros(RATE, dtype="<i2").tobytes())
+    with TestClient(app) as client:
+        response = client.post("/api/v1/voice-chat", files={"file": ("blob", buffer.getvalue(), "audio/wav")})
+    assert response.status_code == 200
+    assert response.json()["ai_text"] == "I didn't hear anything."
@@ -0,0 +1,107 @@
+"""
+Tests for the shared voice registry.
+"""
+import json
+import os
+import time
+
+from app.services.voice_registry import VoiceRegistry
+
+
+def _write_manifest(root, voices):
+    (root / "voices.manifest.json").write_text(json.dumps({"version": "2.0.0", "voices": voices}))
+
+
+def _manifest_voice(voice_id, model_file, **extra):
+    voice = {
+        "id": voice_id,
+        "name": voice_id.title(),
+        "language": "en",
+        "locale": "en_US",
+        "gender": "Female",
+        "quality": "medium",
+        "model_file": model_file,
+        "status": "ready",
+        "language_name": "English",
+    }
+    voice.update(extra)
+    return voice
+
+
+def test_merges_manifest_and_disk_models(tmp_path):
+    """Manifest voices get model details; unlisted models on disk are added by file stem"""
+    (tmp_path / "en").mkdir()
+    (tmp_path / "en" / "en_US-amy-medium.onnx").write_bytes(b"model")
+    (tmp_path / "en" / "de_DE-extra-low.onnx").write_bytes(b"model")
+    (tmp_path / "en" / "de_DE-extra-low.onnx.json").write_text(
+        json.dumps({"language": {"code": "de_DE"}, "audio": {"sample_rate": 16000, "quality": "low"}})
+    )
+    _write_manifest(tmp_path, [
+        _manifest_voice("amy", "en/en_US-amy-medium.onnx"),
+        _manifest_voice("missing", "en/en_US-missing.onnx", gender="Male", language="hi", locale="hi_IN"),
+    ])
+    registry = VoiceRegistry(tmp_path, refresh_interval=0)
+
+    amy = registry.get("amy")
+    assert amy["installed"] and amy["model_path"].endswith("en_US-amy-medium.onnx")
+    assert registry.get("en_US-amy-medium") is amy  # model-stem alias
+    assert registry.get("missing")["installed"] is False
+
+    extra = registry.get("de_DE-extra-low")
+    assert extra["locale"] == "de_DE" and extra["language"] == "de"
+    assert extra["sample_rate"] == 16000 and extra["quality"] == "low"
+
+    assert [v["id"] for v in registry.find(language="hi")] == ["missing"]
+    assert [v["id"] for v in registry.find(gender="female", installed_only=True)] == ["amy"]
+    assert {v["id"] for v in registry.find(installed_only=True)} == {"amy", "de_DE-extra-low"}
+    assert registry.snapshot().version == "2.0.0"
+
+
+def test_rebuilds_only_on_change(tmp_path):
+    """Lookups reuse the index until a model or manifest changes on disk"""
+    _write_manifest(tmp_path, [_manifest_voice("amy", "amy.onnx")])
+    registry = VoiceRegistry(tmp_path, refresh_interval=0)
+
+    assert registry.get("amy")["installed"] is False
+    registry.get("amy")
+    assert not registry.refresh()
+    assert registry.rebuilds == 1
+
+    (tmp_path / "amy.onnx").write_bytes(b"model")
+    os.utime(tmp_path, ns=(0, 1))  # make the directory change visible regardless of timestamp resolution
+    assert registry.get("amy")["installed"] is False  # lookups don't scan the disk
+    assert registry.refresh()
+    assert registry.get("amy")["installed"] is True
+    assert registry.rebuilds == 2
+
+
+def test_background_refresh_swaps_in_the_new_index(tmp_path):
+    _write_manifest(tmp_path, [_manifest_voice("amy", "amy.onnx")])
+    registry = VoiceRegistry(tmp_path, refresh_interval=0.02)
+    try:
+        before = registry.snapshot()
+        (tmp_path / "amy.onnx").write_bytes(b"model")
+        os.utime(tmp_path, ns=(0, 1))
+        deadline = time.monotonic() + 5
+        while registry.snapshot() is before and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert registry.get("amy")["installed"] is True
+        assert before.by_id["amy"]["installed"] is False  # readers holding the old index are unaffected
+    finally:
+        registry.stop()
+
+
+def test_only_voices_marked_ready_are_offered(tmp_path):
+    unmarked = _manifest_voice("bob", "bob.onnx")
+    del unmarked["status"]
+    _write_manifest(tmp_path, [
+        _manifest_voice("amy", "amy.onnx"),
+        unmarked,
+        _manifest_voice("cat", "cat.onnx", status="beta"),
+    ])
+    registry = VoiceRegistry(tmp_path, refresh_interval=0)
+
+    snapshot = registry.snapshot()
+    assert [v["id"] for v in snapshot.catalog] == ["amy"]
+    assert list(snapshot.ready) == ["amy"]
+    assert registry.get("bob") is not None  # still resolvable for synthesis